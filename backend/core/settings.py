@@ -12,6 +12,14 @@ def read_list(env_key: str, default: str = "") -> list[str]:
     return [item.strip() for item in os.getenv(env_key, default).split(",") if item.strip()]
 
 
+def read_rates(env_key: str, default: str = "") -> dict[str, float]:
+    rates = {}
+    for item in read_list(env_key, default):
+        name, _, rate = item.partition("=")
+        rates[name.strip()] = float(rate or 0)
+    return rates
+
+
 SECRET_KEY = os.getenv("DJANGO_SECRET_KEY", "unsafe-secret")
 DEBUG = os.getenv("DJANGO_DEBUG", "False") == "True"
 ALLOWED_HOSTS = read_list("DJANGO_ALLOWED_HOSTS", "localhost,127.0.0.1")
@@ -39,6 +47,7 @@ MIDDLEWARE = [
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "monitoring.audit.AuditBufferMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -119,6 +128,90 @@ REST_FRAMEWORK = {
     "PAGE_SIZE": 25,
 }
 
+INGEST_BATCH_MAX_SIZE = int(os.getenv("INGEST_BATCH_MAX_SIZE", 500))
+# A repeated client `sequence` is a retry only within INGEST_SEQUENCE_WINDOW_HOURS
+# of the stored reading; further apart, the device's counter was reset (e.g. by
+# a reboot) and the old reading gives the number up (0 never expires them).
+INGEST_SEQUENCE_WINDOW_HOURS = float(os.getenv("INGEST_SEQUENCE_WINDOW_HOURS", 24))
+SENSOR_CACHE_MAX_SIZE = int(os.getenv("SENSOR_CACHE_MAX_SIZE", 10000))
+SENSOR_CACHE_TTL_SECONDS = float(os.getenv("SENSOR_CACHE_TTL_SECONDS", 60))
+RULE_INDEX_TTL_SECONDS = float(os.getenv("RULE_INDEX_TTL_SECONDS", 300))
+ALERT_INCIDENT_MODE = os.getenv("ALERT_INCIDENT_MODE", "True") == "True"
+EXCURSION_STATE_TTL_SECONDS = float(os.getenv("EXCURSION_STATE_TTL_SECONDS", 30))
+
+# "direct" stores readings in the request; "spool" appends them to the ingest
+# spool and answers 202, leaving the database work to `load_spool`.
+INGEST_MODE = os.getenv("INGEST_MODE", "direct")
+INGEST_SPOOL_DIR = Path(os.getenv("INGEST_SPOOL_DIR", BASE_DIR / "spool"))
+INGEST_SPOOL_SEGMENT_BYTES = int(os.getenv("INGEST_SPOOL_SEGMENT_BYTES", 16 * 1024 * 1024))
+INGEST_SPOOL_SEGMENT_SECONDS = float(os.getenv("INGEST_SPOOL_SEGMENT_SECONDS", 30))
+INGEST_SPOOL_SYNC_RECORDS = int(os.getenv("INGEST_SPOOL_SYNC_RECORDS", 256))
+INGEST_SPOOL_SYNC_INTERVAL_MS = float(os.getenv("INGEST_SPOOL_SYNC_INTERVAL_MS", 50))
+INGEST_SPOOL_BATCH_SIZE = int(os.getenv("INGEST_SPOOL_BATCH_SIZE", 1000))
+
+# Token bucket per sensor token: INGEST_RATE_LIMIT_BURST requests, refilled at
+# INGEST_RATE_LIMIT_PER_MINUTE (0 disables). "cache" shares the buckets between
+# workers through the INGEST_RATE_LIMIT_CACHE cache alias.
+INGEST_RATE_LIMIT_BURST = float(os.getenv("INGEST_RATE_LIMIT_BURST", 10))
+INGEST_RATE_LIMIT_PER_MINUTE = float(os.getenv("INGEST_RATE_LIMIT_PER_MINUTE", 6))
+INGEST_RATE_LIMIT_STORE = os.getenv("INGEST_RATE_LIMIT_STORE", "local")
+INGEST_RATE_LIMIT_CACHE = os.getenv("INGEST_RATE_LIMIT_CACHE", "default")
+# Readings are shed with 503 once INGEST_MAX_DATABASE_ACTIVE sessions are busy
+# in PostgreSQL (pg_stat_activity, sampled every INGEST_DATABASE_LOAD_INTERVAL_MS
+# in each worker), or once INGEST_MAX_INFLIGHT_WRITES ingest writes are in
+# progress or queued in one worker process; the latter only applies to async and
+# threaded workers, a sync worker runs one at a time (0 disables either).
+INGEST_MAX_DATABASE_ACTIVE = int(os.getenv("INGEST_MAX_DATABASE_ACTIVE", 40))
+INGEST_DATABASE_LOAD_INTERVAL_MS = float(
+    os.getenv("INGEST_DATABASE_LOAD_INTERVAL_MS", 500)
+)
+INGEST_MAX_INFLIGHT_WRITES = int(os.getenv("INGEST_MAX_INFLIGHT_WRITES", 32))
+
+# `ingest_listener` stores readings in batches of INGEST_LISTENER_BATCH_SIZE,
+# or after INGEST_LISTENER_FLUSH_MS, and sheds readings once
+# INGEST_LISTENER_MAX_PENDING are waiting for the database.
+INGEST_LISTENER_BATCH_SIZE = int(os.getenv("INGEST_LISTENER_BATCH_SIZE", 500))
+INGEST_LISTENER_FLUSH_MS = float(os.getenv("INGEST_LISTENER_FLUSH_MS", 50))
+INGEST_LISTENER_MAX_PENDING = int(os.getenv("INGEST_LISTENER_MAX_PENDING", 5000))
+
+# Monthly measurement partitions kept ahead of time by `partition_measurements`
+# and kept besides the current month by `prune_measurements`.
+MEASUREMENT_PARTITIONS_AHEAD = int(os.getenv("MEASUREMENT_PARTITIONS_AHEAD", 3))
+MEASUREMENT_RETENTION_MONTHS = int(os.getenv("MEASUREMENT_RETENTION_MONTHS", 24))
+
+# /api/measurements/series/ returns at most SERIES_MAX_POINTS points and only
+# runs LTTB over ranges of up to SERIES_LTTB_MAX_ROWS raw readings.
+SERIES_DEFAULT_POINTS = int(os.getenv("SERIES_DEFAULT_POINTS", 500))
+SERIES_MAX_POINTS = int(os.getenv("SERIES_MAX_POINTS", 5000))
+SERIES_LTTB_MAX_ROWS = int(os.getenv("SERIES_LTTB_MAX_ROWS", 200000))
+
+# Per-process memory cache by default. Point CACHE_BACKEND/CACHE_LOCATION at a
+# shared cache (e.g. django.core.cache.backends.memcached.PyMemcacheCache) so
+# that invalidations reach every worker at once.
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv(
+            "CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.getenv("CACHE_LOCATION", ""),
+    }
+}
+
+# List and detail responses of sensors, alert rules and alerts are cached in
+# the RESPONSE_CACHE alias; model versions expire after
+# RESPONSE_CACHE_TTL_SECONDS.
+RESPONSE_CACHE = os.getenv("RESPONSE_CACHE", "default")
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", 60))
+
+# /api/dashboard/summary/ is cached in the DASHBOARD_CACHE cache alias for
+# DASHBOARD_SUMMARY_TTL_SECONDS and refreshed when readings are stored.
+DASHBOARD_CACHE = os.getenv("DASHBOARD_CACHE", "default")
+DASHBOARD_SUMMARY_TTL_SECONDS = float(os.getenv("DASHBOARD_SUMMARY_TTL_SECONDS", 30))
+
+# Fraction of entries kept per audit action, e.g. "measurement.created=0.1".
+AUDIT_SAMPLE_RATES = read_rates("AUDIT_SAMPLE_RATES")
+AUDIT_BUFFER_MAX_SIZE = int(os.getenv("AUDIT_BUFFER_MAX_SIZE", 200))
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=60),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=7),
@@ -150,6 +243,20 @@ WHATSAPP_TOKEN = os.getenv("WHATSAPP_TOKEN", "")
 WHATSAPP_PHONE_ID = os.getenv("WHATSAPP_PHONE_ID", "")
 WHATSAPP_TO = os.getenv("WHATSAPP_TO", "")
 
+NOTIFICATION_DISPATCH_BATCH_SIZE = int(os.getenv("NOTIFICATION_DISPATCH_BATCH_SIZE", 100))
+NOTIFICATION_DISPATCH_WORKERS = int(os.getenv("NOTIFICATION_DISPATCH_WORKERS", 8))
+NOTIFICATION_CHANNEL_CONCURRENCY = {
+    "email": int(os.getenv("NOTIFICATION_EMAIL_CONCURRENCY", 2)),
+    "telegram": int(os.getenv("NOTIFICATION_TELEGRAM_CONCURRENCY", 4)),
+    "whatsapp": int(os.getenv("NOTIFICATION_WHATSAPP_CONCURRENCY", 4)),
+    "webhook": int(os.getenv("NOTIFICATION_WEBHOOK_CONCURRENCY", 8)),
+}
+NOTIFICATION_HTTP_TIMEOUT_SECONDS = float(os.getenv("NOTIFICATION_HTTP_TIMEOUT_SECONDS", 10))
+NOTIFICATION_MAX_ATTEMPTS = int(os.getenv("NOTIFICATION_MAX_ATTEMPTS", 6))
+NOTIFICATION_BACKOFF_SECONDS = float(os.getenv("NOTIFICATION_BACKOFF_SECONDS", 30))
+NOTIFICATION_BACKOFF_MAX_SECONDS = float(os.getenv("NOTIFICATION_BACKOFF_MAX_SECONDS", 3600))
+NOTIFICATION_LEASE_SECONDS = float(os.getenv("NOTIFICATION_LEASE_SECONDS", 300))
+
 SPECTACULAR_SETTINGS = {
     "TITLE": "Cold Chain Monitoring API",
     "DESCRIPTION": "Monitoring and alerting APIs for medical lab cold chain",
@@ -1,6 +1,18 @@
 from django.contrib import admin
 
-from .models import Alert, AlertRule, AuditLog, Measurement, Sensor, Ticket, User ,Channel
+from .models import (
+    Alert,
+    AlertRule,
+    AuditLog,
+    Channel,
+    Measurement,
+    MeasurementRollup,
+    NotificationOutbox,
+    Sensor,
+    SensorState,
+    Ticket,
+    User,
+)
 
 
 @admin.register(User)
@@ -24,6 +36,18 @@ class MeasurementAdmin(admin.ModelAdmin):
     search_fields = ("sensor__name",)
 
 
+@admin.register(MeasurementRollup)
+class MeasurementRollupAdmin(admin.ModelAdmin):
+    list_display = ("sensor", "resolution", "bucket", "count", "out_of_range_count")
+    list_filter = ("resolution", "sensor")
+
+
+@admin.register(SensorState)
+class SensorStateAdmin(admin.ModelAdmin):
+    list_display = ("sensor", "last_recorded_at", "last_temperature", "last_status")
+    list_filter = ("last_status",)
+
+
 @admin.register(AlertRule)
 class AlertRuleAdmin(admin.ModelAdmin):
     list_display = ("name", "sensor", "min_temp", "max_temp", "is_active")
@@ -45,6 +69,13 @@ class ChannelAdmin(admin.ModelAdmin):
 
 
 
+@admin.register(NotificationOutbox)
+class NotificationOutboxAdmin(admin.ModelAdmin):
+    list_display = ("channel_type", "target", "status", "attempts", "next_attempt_at")
+    list_filter = ("status", "channel_type")
+    search_fields = ("target", "subject")
+
+
 @admin.register(Ticket)
 class TicketAdmin(admin.ModelAdmin):
     list_display = ("title", "status", "priority", "created_at")
@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterable, Optional
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import transaction
+
+from .models import AuditLog
+
+_buffer: ContextVar[Optional[list[AuditLog]]] = ContextVar("audit_buffer", default=None)
+
+
+class AuditPolicy:
+    """Per-action sampling of audit entries.
+
+    ``rates`` maps an action to the fraction of entries kept: ``1`` (the
+    default for unlisted actions) records everything, ``0`` skips the action.
+    Sampled entries carry the rate in their payload so totals can be
+    estimated from the audit table.
+    """
+
+    def __init__(self, rates: dict[str, float]) -> None:
+        self.rates = rates
+
+    def apply(self, entries: Iterable[AuditLog]) -> list[AuditLog]:
+        kept: list[AuditLog] = []
+        for entry in entries:
+            rate = self.rates.get(entry.action, 1.0)
+            if rate >= 1.0:
+                kept.append(entry)
+            elif rate > 0.0 and random.random() < rate:
+                entry.payload = {**entry.payload, "sample_rate": rate}
+                kept.append(entry)
+        return kept
+
+
+audit_policy = AuditPolicy(settings.AUDIT_SAMPLE_RATES)
+
+
+def build_audit_entry(
+    *, action: str, actor=None, target=None, payload: Optional[dict] = None
+) -> AuditLog:
+    target_model = target.__class__.__name__ if target else ""
+    target_id = str(getattr(target, "id", "")) if target else ""
+    return AuditLog(
+        action=action,
+        actor=actor,
+        target_model=target_model,
+        target_id=target_id,
+        payload=payload or {},
+    )
+
+
+def write_audit_entries(entries: Iterable[AuditLog]) -> list[AuditLog]:
+    """Record audit entries with a single ``bulk_create``.
+
+    Inside a transaction the entries are written immediately, so they commit
+    or roll back with the work they describe. Outside one they are added to
+    the active :func:`buffered_audit` buffer, if any.
+    """
+    entries = audit_policy.apply(entries)
+    if not entries:
+        return entries
+    buffer = _buffer.get()
+    if buffer is None or transaction.get_connection().in_atomic_block:
+        AuditLog.objects.bulk_create(entries)
+    else:
+        buffer.extend(entries)
+        if len(buffer) >= settings.AUDIT_BUFFER_MAX_SIZE:
+            _flush(buffer)
+    return entries
+
+
+def record_audit(
+    *, action: str, actor=None, target=None, payload: Optional[dict] = None
+) -> Optional[AuditLog]:
+    entry = build_audit_entry(action=action, actor=actor, target=target, payload=payload)
+    written = write_audit_entries([entry])
+    return written[0] if written else None
+
+
+def _flush(buffer: list[AuditLog]) -> None:
+    if buffer:
+        AuditLog.objects.bulk_create(buffer)
+        buffer.clear()
+
+
+@contextmanager
+def buffered_audit():
+    """Collect audit entries recorded in autocommit mode and write them at once.
+
+    The buffer is flushed when the block exits, including when it exits with
+    an exception, so entries for work that was already saved are kept.
+    """
+    if _buffer.get() is not None:
+        yield
+        return
+    buffer: list[AuditLog] = []
+    token = _buffer.set(buffer)
+    try:
+        yield
+    finally:
+        _buffer.reset(token)
+        _flush(buffer)
+
+
+class AuditBufferMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with buffered_audit():
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        buffer: list[AuditLog] = []
+        token = _buffer.set(buffer)
+        try:
+            return await self.get_response(request)
+        finally:
+            _buffer.reset(token)
+            if buffer:
+                await sync_to_async(_flush)(buffer)
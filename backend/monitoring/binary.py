@@ -0,0 +1,122 @@
+"""Compact binary reading packets for constrained sensors.
+
+A packet is a little-endian header followed by the sensor token and a batch
+of fixed-size readings::
+
+    magic "CC" | version u8 | flags u8 | token length u8 | first sequence u32
+    | base timestamp u32 (epoch seconds) | reading count u16 | token bytes
+    | count x (timestamp delta u32, temperature x100 i16, humidity x100 u16)
+
+Each timestamp delta is relative to the previous reading (the first one to
+the base timestamp). With ``FLAG_SEQUENCE`` set, reading ``i`` carries the
+sequence number ``first sequence + i``. A reading costs 8 bytes instead of
+roughly 100 for the JSON payload, and a whole packet is decoded with a few
+vectorized numpy operations.
+"""
+
+from __future__ import annotations
+
+import struct
+from datetime import datetime, timezone
+from typing import Iterable, Optional
+
+import numpy as np
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+MEDIA_TYPE = "application/vnd.coldchain.readings"
+MAGIC = b"CC"
+VERSION = 1
+FLAG_SEQUENCE = 0x01
+
+HEADER = struct.Struct("<2sBBBIIH")
+READING = np.dtype([("delta", "<u4"), ("temperature", "<i2"), ("humidity", "<u2")])
+
+
+class BinaryReadings(list):
+    """Readings decoded from a binary packet."""
+
+
+def decode_readings(payload: bytes) -> BinaryReadings:
+    if len(payload) < HEADER.size:
+        raise ValueError("packet is shorter than its header")
+    magic, version, flags, token_length, sequence, base, count = HEADER.unpack_from(
+        payload
+    )
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("unknown packet format")
+    offset = HEADER.size + token_length
+    if len(payload) != offset + count * READING.itemsize:
+        raise ValueError(f"expected {count} readings")
+    try:
+        token = payload[HEADER.size : offset].decode("ascii")
+    except UnicodeDecodeError:
+        raise ValueError("sensor token is not ASCII") from None
+
+    rows = np.frombuffer(payload, dtype=READING, count=count, offset=offset)
+    timestamps = (base + np.cumsum(rows["delta"], dtype=np.int64)).tolist()
+    temperatures = (rows["temperature"] / 100).tolist()
+    humidities = (rows["humidity"] / 100).tolist()
+    sequences = (
+        (sequence + np.arange(count, dtype=np.int64)).tolist()
+        if flags & FLAG_SEQUENCE
+        else [None] * count
+    )
+
+    readings = BinaryReadings()
+    for timestamp, temperature, humidity, number in zip(
+        timestamps, temperatures, humidities, sequences
+    ):
+        reading = {
+            "sensor_token": token,
+            "temperature": temperature,
+            "humidity": humidity,
+            "recorded_at": datetime.fromtimestamp(timestamp, tz=timezone.utc),
+        }
+        if number is not None:
+            reading["sequence"] = number
+        readings.append(reading)
+    return readings
+
+
+def encode_readings(
+    token: str,
+    readings: Iterable[tuple[datetime, float, float]],
+    *,
+    sequence: Optional[int] = None,
+) -> bytes:
+    """Build a packet from ``(recorded_at, temperature, humidity)`` tuples."""
+    readings = list(readings)
+    timestamps = np.array(
+        [int(item[0].timestamp()) for item in readings], dtype=np.int64
+    )
+    base = int(timestamps[0]) if readings else 0
+    deltas = np.diff(timestamps, prepend=base)
+    if (deltas < 0).any():
+        raise ValueError("readings must be in chronological order")
+    rows = np.empty(len(readings), dtype=READING)
+    rows["delta"] = deltas
+    rows["temperature"] = np.round([item[1] * 100 for item in readings])
+    rows["humidity"] = np.round([item[2] * 100 for item in readings])
+    encoded_token = token.encode("ascii")
+    header = HEADER.pack(
+        MAGIC,
+        VERSION,
+        FLAG_SEQUENCE if sequence is not None else 0,
+        len(encoded_token),
+        sequence or 0,
+        base,
+        len(readings),
+    )
+    return header + encoded_token + rows.tobytes()
+
+
+class BinaryReadingsParser(BaseParser):
+    media_type = MEDIA_TYPE
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        payload = stream.read() if stream is not None else b""
+        try:
+            return decode_readings(payload)
+        except (ValueError, struct.error) as exc:
+            raise ParseError(f"Binary packet error - {exc}")
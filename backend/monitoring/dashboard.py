@@ -0,0 +1,131 @@
+"""Dashboard summary, computed in one query and cached for a few seconds.
+
+The cached summary is stored under a version number that ingest and alert or
+ticket changes bump once their transaction commits, so a summary computed
+before a change can never be served after it. The cache alias is
+``DASHBOARD_CACHE``; with the default per-process cache, other processes see
+a change after ``DASHBOARD_SUMMARY_TTL_SECONDS`` at most.
+"""
+
+from __future__ import annotations
+
+import time
+from datetime import datetime, time as day_time, timedelta, timezone as dt_timezone
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection
+from django.db.models import Sum
+from django.utils import timezone
+
+from .models import Alert, Measurement, MeasurementRollup, Sensor, SensorState, Ticket
+
+SUMMARY_KEY = "dashboard:summary:{version}"
+VERSION_KEY = "dashboard:summary:version"
+
+
+def _cache():
+    return caches[settings.DASHBOARD_CACHE]
+
+
+def _subquery(queryset) -> tuple[str, tuple]:
+    sql, params = queryset.query.sql_with_params()
+    return f"({sql})", params
+
+
+def _count(queryset) -> tuple[str, tuple]:
+    sql, params = queryset.order_by().values("pk").query.sql_with_params()
+    return f"(SELECT COUNT(*) FROM ({sql}) AS counted)", params
+
+
+def compute_summary(now: Optional[datetime] = None) -> dict:
+    """Dashboard figures, read with a single query.
+
+    Readings of the day are summed from the 5 minute rollups, which start on
+    every local midnight whatever the time zone.
+    """
+    now = now or timezone.now()
+    midnight = timezone.make_aware(
+        datetime.combine(timezone.localdate(now), day_time())
+    )
+    latest_alert = Alert.objects.order_by("-created_at")[:1]
+    columns = {
+        "measurements_today": _subquery(
+            MeasurementRollup.objects.filter(
+                resolution=MeasurementRollup.Resolution.FIVE_MINUTES,
+                bucket__gte=midnight,
+            )
+            .order_by()
+            .values("resolution")
+            .annotate(total=Sum("count"))
+            .values("total")
+        ),
+        "alerts_24h": _count(
+            Alert.objects.filter(created_at__gte=now - timedelta(hours=24))
+        ),
+        "open_alerts": _count(
+            Alert.objects.filter(
+                status__in=[Alert.Status.OPEN, Alert.Status.ACKNOWLEDGED]
+            )
+        ),
+        "open_tickets": _count(Ticket.objects.exclude(status=Ticket.Status.CLOSED)),
+        "sensors": _count(Sensor.objects.filter(is_active=True)),
+        "sensors_out_of_range": _count(
+            SensorState.objects.filter(sensor__is_active=True).exclude(
+                last_status=Measurement.Status.NORMAL
+            )
+        ),
+        "last_alert_at": _subquery(latest_alert.values("created_at")),
+        "last_alert_sensor": _subquery(latest_alert.values("sensor__name")),
+        "last_alert_severity": _subquery(latest_alert.values("severity")),
+    }
+    sql = ", ".join(f"{column} AS {name}" for name, (column, _) in columns.items())
+    params = [param for _, column_params in columns.values() for param in column_params]
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT {sql}", params)
+        row = dict(zip(columns, cursor.fetchone()))
+
+    last_alert = None
+    if row["last_alert_at"] is not None:
+        created_at = Alert._meta.get_field("created_at").to_python(row["last_alert_at"])
+        if timezone.is_naive(created_at):
+            created_at = created_at.replace(tzinfo=dt_timezone.utc)
+        last_alert = {
+            "created_at": created_at,
+            "sensor_name": row["last_alert_sensor"],
+            "severity": row["last_alert_severity"],
+        }
+    return {
+        "generated_at": now,
+        "measurements_today": int(row["measurements_today"] or 0),
+        "alerts_24h": row["alerts_24h"],
+        "open_alerts": row["open_alerts"],
+        "open_tickets": row["open_tickets"],
+        "sensors": row["sensors"],
+        "sensors_out_of_range": row["sensors_out_of_range"],
+        "last_alert": last_alert,
+    }
+
+
+def _version() -> int:
+    return _cache().get_or_set(VERSION_KEY, time.time_ns, None)
+
+
+def invalidate_summary() -> None:
+    """Make the next request compute a fresh summary."""
+    cache = _cache()
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.add(VERSION_KEY, time.time_ns(), None)
+
+
+def get_summary() -> dict:
+    cache = _cache()
+    key = SUMMARY_KEY.format(version=_version())
+    summary = cache.get(key)
+    if summary is None:
+        summary = compute_summary()
+        cache.set(key, summary, settings.DASHBOARD_SUMMARY_TTL_SECONDS)
+    return summary
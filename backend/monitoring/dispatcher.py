@@ -0,0 +1,210 @@
+from __future__ import annotations
+
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Callable, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import NotificationOutbox
+from .notifications import (
+    NotificationNotConfigured,
+    build_email_message,
+    send_email_notifications,
+    send_telegram_notification,
+    send_webhook_notification,
+    send_whatsapp_notification,
+)
+from .transports import close_transports, transport_stats
+
+logger = logging.getLogger(__name__)
+
+SENDERS: dict[str, Callable[[NotificationOutbox], None]] = {
+    "telegram": lambda entry: send_telegram_notification(entry.body),
+    "whatsapp": lambda entry: send_whatsapp_notification(entry.body),
+    "webhook": lambda entry: send_webhook_notification(
+        entry.target,
+        entry.subject,
+        entry.body,
+        extra={"alert": str(entry.alert_id), "notification": str(entry.id)},
+    ),
+}
+
+
+class NotificationDispatcher:
+    """Drains :class:`NotificationOutbox` rows and delivers them concurrently.
+
+    Rows are claimed with ``SELECT ... FOR UPDATE SKIP LOCKED`` so several
+    dispatcher processes can run side by side. A claimed row is leased until
+    ``next_attempt_at``; if the process dies mid-delivery the lease expires
+    and another dispatcher picks the row up again.
+    """
+
+    def __init__(
+        self,
+        *,
+        batch_size: int = settings.NOTIFICATION_DISPATCH_BATCH_SIZE,
+        max_workers: int = settings.NOTIFICATION_DISPATCH_WORKERS,
+        channel_limits: Optional[dict[str, int]] = None,
+        max_attempts: int = settings.NOTIFICATION_MAX_ATTEMPTS,
+        backoff_seconds: float = settings.NOTIFICATION_BACKOFF_SECONDS,
+        backoff_max_seconds: float = settings.NOTIFICATION_BACKOFF_MAX_SECONDS,
+        lease_seconds: float = settings.NOTIFICATION_LEASE_SECONDS,
+    ) -> None:
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self.lease_seconds = lease_seconds
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="notify"
+        )
+        limits = channel_limits or settings.NOTIFICATION_CHANNEL_CONCURRENCY
+        self._semaphores = {
+            channel_type: threading.BoundedSemaphore(limit)
+            for channel_type, limit in limits.items()
+        }
+
+    def claim(self) -> list[NotificationOutbox]:
+        now = timezone.now()
+        with transaction.atomic():
+            entries = list(
+                NotificationOutbox.objects.select_for_update(skip_locked=True)
+                .filter(
+                    Q(status=NotificationOutbox.Status.PENDING)
+                    | Q(status=NotificationOutbox.Status.SENDING),
+                    next_attempt_at__lte=now,
+                )
+                .order_by("next_attempt_at")[: self.batch_size]
+            )
+            if entries:
+                NotificationOutbox.objects.filter(
+                    id__in=[entry.id for entry in entries]
+                ).update(
+                    status=NotificationOutbox.Status.SENDING,
+                    attempts=F("attempts") + 1,
+                    next_attempt_at=now + timedelta(seconds=self.lease_seconds),
+                )
+        for entry in entries:
+            entry.attempts += 1
+        return entries
+
+    def _guarded(
+        self, channel_type: str, send: Callable[[], None]
+    ) -> Optional[Exception]:
+        semaphore = self._semaphores.get(channel_type)
+        try:
+            if semaphore is None:
+                send()
+            else:
+                with semaphore:
+                    send()
+        except NotificationNotConfigured as exc:
+            logger.warning("Cannot send %s notification: %s", channel_type, exc)
+            return exc
+        except Exception as exc:
+            logger.exception("Failed to send %s notification", channel_type)
+            return exc
+        return None
+
+    def _deliver(self, entry: NotificationOutbox) -> Optional[Exception]:
+        sender = SENDERS.get(entry.channel_type)
+        if sender is None:
+            return NotificationNotConfigured(
+                f"No sender for channel type {entry.channel_type!r}"
+            )
+        return self._guarded(entry.channel_type, lambda: sender(entry))
+
+    def _deliver_emails(
+        self, entries: list[NotificationOutbox]
+    ) -> list[Optional[Exception]]:
+        if not entries:
+            return []
+        messages = [
+            build_email_message(entry.subject, entry.body, [entry.target])
+            for entry in entries
+        ]
+        outcomes: list[Optional[Exception]] = []
+        error = self._guarded(
+            "email", lambda: outcomes.extend(send_email_notifications(messages))
+        )
+        if error is not None:
+            return [error] * len(entries)
+        for entry, outcome in zip(entries, outcomes):
+            if outcome is not None:
+                logger.warning(
+                    "Failed to send email notification %s: %s", entry.id, outcome
+                )
+        return outcomes
+
+    def _backoff(self, attempts: int) -> timedelta:
+        delay = min(self.backoff_seconds * 2 ** (attempts - 1), self.backoff_max_seconds)
+        return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+    def dispatch_once(self) -> dict[str, int]:
+        entries = self.claim()
+        emails = [entry for entry in entries if entry.channel_type == "email"]
+        others = [entry for entry in entries if entry.channel_type != "email"]
+        email_errors = self._executor.submit(self._deliver_emails, emails)
+        errors = list(self._executor.map(self._deliver, others))
+        entries = others + emails
+        errors += email_errors.result()
+        now = timezone.now()
+        counts = {"sent": 0, "retried": 0, "failed": 0}
+        for entry, error in zip(entries, errors):
+            if error is None:
+                entry.status = NotificationOutbox.Status.SENT
+                entry.sent_at = now
+                entry.last_error = ""
+                counts["sent"] += 1
+                continue
+            entry.last_error = f"{error.__class__.__name__}: {error}"
+            # Retrying cannot help a channel that is not configured.
+            if (
+                isinstance(error, NotificationNotConfigured)
+                or entry.attempts >= self.max_attempts
+            ):
+                entry.status = NotificationOutbox.Status.FAILED
+                counts["failed"] += 1
+            else:
+                entry.status = NotificationOutbox.Status.PENDING
+                entry.next_attempt_at = now + self._backoff(entry.attempts)
+                counts["retried"] += 1
+        NotificationOutbox.objects.bulk_update(
+            entries, ["status", "sent_at", "next_attempt_at", "last_error"]
+        )
+        return counts
+
+    def run_forever(
+        self, *, interval: float, stop: threading.Event, stats_every: float = 300
+    ) -> None:
+        next_stats = time.monotonic() + stats_every
+        failures = 0
+        while not stop.is_set():
+            try:
+                counts = self.dispatch_once()
+            except Exception:
+                failures += 1
+                logger.exception("Dispatching notifications failed")
+                # Back off while e.g. the database is down, up to a minute.
+                stop.wait(min(interval * 2**failures, 60))
+                continue
+            failures = 0
+            if any(counts.values()):
+                logger.info("Notification dispatch: %s", counts)
+            if time.monotonic() >= next_stats:
+                logger.info("Notification transports: %s", transport_stats())
+                next_stats = time.monotonic() + stats_every
+            if sum(counts.values()) < self.batch_size:
+                stop.wait(interval)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+        close_transports()
@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import ExcursionState
+
+StateKey = tuple[uuid.UUID, uuid.UUID]
+
+
+@dataclass(frozen=True, slots=True)
+class WindowState:
+    breach_started_at: Optional[datetime] = None
+    last_recorded_at: Optional[datetime] = None
+
+
+class ExcursionSession:
+    """Working copy of the window states touched by one ingest transaction.
+
+    Each call to :meth:`observe` is O(1). Only transitions into or out of an
+    excursion are persisted, so a sensor that stays in range (or stays out of
+    range) does not write anything.
+    """
+
+    def __init__(
+        self, tracker: "ExcursionTracker", states: dict[StateKey, WindowState]
+    ) -> None:
+        self._tracker = tracker
+        self._states = states
+        self._dirty: set[StateKey] = set()
+
+    def observe(
+        self,
+        key: StateKey,
+        *,
+        recorded_at: datetime,
+        breached: bool,
+        window_minutes: int,
+    ) -> bool:
+        state = self._states.get(key, WindowState())
+        if state.last_recorded_at and recorded_at < state.last_recorded_at:
+            return False
+
+        if not breached:
+            started_at = None
+        else:
+            started_at = state.breach_started_at or recorded_at
+        if started_at != state.breach_started_at:
+            self._dirty.add(key)
+        self._states[key] = WindowState(
+            breach_started_at=started_at, last_recorded_at=recorded_at
+        )
+        return breached and recorded_at - started_at >= timedelta(minutes=window_minutes)
+
+    def save(self) -> None:
+        if self._dirty:
+            rows = []
+            for sensor_id, rule_id in self._dirty:
+                state = self._states[(sensor_id, rule_id)]
+                rows.append(
+                    ExcursionState(
+                        sensor_id=sensor_id,
+                        rule_id=rule_id,
+                        breach_started_at=state.breach_started_at,
+                        last_recorded_at=state.last_recorded_at,
+                    )
+                )
+            ExcursionState.objects.bulk_create(
+                rows,
+                update_conflicts=True,
+                unique_fields=["sensor", "rule"],
+                update_fields=["breach_started_at", "last_recorded_at"],
+            )
+        states = dict(self._states)
+        transaction.on_commit(lambda: self._tracker.update(states))
+
+
+class ExcursionTracker:
+    """Process-wide cache of per-(sensor, rule) sustained-excursion state.
+
+    The persisted :class:`ExcursionState` is authoritative: another worker may
+    have started or ended an excursion since this process cached it. Sessions
+    are opened while the sensor rows are locked and always read the stored
+    rows; the cache only contributes the ``last_recorded_at`` of readings that
+    did not change the excursion (those are not written), and only while its
+    ``breach_started_at`` still matches the stored one. Entries expire after
+    ``ttl`` seconds.
+    """
+
+    def __init__(self, ttl: float) -> None:
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._states: dict[StateKey, tuple[float, WindowState]] = {}
+
+    def session(self, keys: Iterable[StateKey]) -> ExcursionSession:
+        """Window states of ``keys``; call with the keys' sensor rows locked."""
+        keys = set(keys)
+        states = {key: WindowState() for key in keys}
+        if not keys:
+            return ExcursionSession(self, states)
+        sensor_ids = {sensor_id for sensor_id, _ in keys}
+        rule_ids = {rule_id for _, rule_id in keys}
+        for row in ExcursionState.objects.filter(
+            sensor_id__in=sensor_ids, rule_id__in=rule_ids
+        ).values_list(
+            "sensor_id", "rule_id", "breach_started_at", "last_recorded_at"
+        ):
+            if row[:2] in keys:
+                states[row[:2]] = WindowState(
+                    breach_started_at=row[2], last_recorded_at=row[3]
+                )
+        now = time.monotonic()
+        with self._lock:
+            for key, stored in states.items():
+                entry = self._states.get(key)
+                if entry is None or entry[0] <= now:
+                    continue
+                cached = entry[1]
+                if cached.breach_started_at == stored.breach_started_at and (
+                    stored.last_recorded_at is None
+                    or (
+                        cached.last_recorded_at
+                        and cached.last_recorded_at > stored.last_recorded_at
+                    )
+                ):
+                    states[key] = cached
+        return ExcursionSession(self, states)
+
+    def update(self, states: dict[StateKey, WindowState]) -> None:
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            for key, state in states.items():
+                self._states[key] = (expires_at, state)
+
+    def forget(self, *, sensor_id=None, rule_id=None) -> None:
+        with self._lock:
+            for key in list(self._states):
+                if key[0] == sensor_id or key[1] == rule_id:
+                    del self._states[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "states": len(self._states),
+                "in_excursion": sum(
+                    1 for _, state in self._states.values() if state.breach_started_at
+                ),
+                "ttl_seconds": self.ttl,
+            }
+
+
+excursion_tracker = ExcursionTracker(ttl=settings.EXCURSION_STATE_TTL_SECONDS)
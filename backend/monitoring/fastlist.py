@@ -0,0 +1,173 @@
+"""Read-only fast path for large list responses (``?fast=true``).
+
+Rows are fetched with ``values_list`` and converted with one precomputed
+converter per field, taken from the view's serializer so the output is the
+one DRF renders, field order included; the page is encoded with orjson.
+Fields without a column of their own (expanded relations, many-to-many)
+are not supported: such requests use the serializer.
+"""
+
+from __future__ import annotations
+
+import decimal
+from typing import Any, Callable, Optional, Sequence
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers, status
+from rest_framework.settings import api_settings
+
+from . import fastpath
+from .fieldsets import requested_expansions
+
+FAST_PARAM = "fast"
+
+Converter = Optional[Callable[[Any], Any]]
+
+
+class Unsupported(Exception):
+    pass
+
+
+def _decimal(field: serializers.DecimalField) -> Converter:
+    coerce = getattr(field, "coerce_to_string", api_settings.COERCE_DECIMAL_TO_STRING)
+    if field.localize or not coerce:
+        return field.to_representation
+    if field.decimal_places is None:
+        return lambda value: f"{decimal.Decimal(value):f}"
+    quantum = decimal.Decimal(".1") ** field.decimal_places
+    context = decimal.getcontext().copy()
+    if field.max_digits is not None:
+        context.prec = field.max_digits
+    rounding = field.rounding
+
+    def convert(value):
+        if not isinstance(value, decimal.Decimal):
+            value = decimal.Decimal(str(value).strip())
+        return f"{value.quantize(quantum, rounding=rounding, context=context):f}"
+
+    return convert
+
+
+def _datetime(field: serializers.DateTimeField) -> Converter:
+    output_format = getattr(field, "format", api_settings.DATETIME_FORMAT)
+    if output_format is None or output_format.lower() != "iso-8601":
+        return field.to_representation
+    zone = getattr(field, "timezone", None) or field.default_timezone()
+
+    def convert(value):
+        if zone is not None:
+            value = value.astimezone(zone)
+        return fastpath._datetime_representation(value)
+
+    return convert
+
+
+def _primary_key(field: serializers.PrimaryKeyRelatedField, model_field) -> Converter:
+    if field.pk_field is not None:
+        return field.pk_field.to_representation
+    # The JSON renderer writes related UUID keys as strings.
+    return str if _is_uuid(model_field.target_field) else None
+
+
+def _is_uuid(model_field) -> bool:
+    return model_field.get_internal_type() == "UUIDField"
+
+
+def _converter(field: serializers.Field, model_field) -> Converter:
+    if isinstance(field, serializers.PrimaryKeyRelatedField):
+        return _primary_key(field, model_field)
+    if isinstance(field, serializers.DecimalField):
+        return _decimal(field)
+    if isinstance(field, serializers.DateTimeField):
+        return _datetime(field)
+    if isinstance(field, serializers.UUIDField):
+        return str if field.uuid_format == "hex_verbose" else field.to_representation
+    if isinstance(
+        field,
+        (
+            serializers.CharField,
+            serializers.ChoiceField,
+            serializers.BooleanField,
+            serializers.IntegerField,
+        ),
+    ):
+        # The database already returns the represented type.
+        return None
+    if isinstance(field, serializers.JSONField) and not field.binary:
+        return None
+    return field.to_representation
+
+
+class RowRenderer:
+    """Renders ``values_list`` rows the way ``serializer`` renders instances."""
+
+    def __init__(self, serializer: serializers.ModelSerializer) -> None:
+        meta = serializer.Meta.model._meta
+        self.columns: list[str] = []
+        fields: list[tuple[str, str, Converter]] = []
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            try:
+                model_field = meta.get_field(field.source)
+            except FieldDoesNotExist:
+                raise Unsupported(name) from None
+            if not model_field.concrete or model_field.many_to_many:
+                raise Unsupported(name)
+            if isinstance(field, serializers.BaseSerializer):
+                raise Unsupported(name)
+            fields.append((name, model_field.attname, _converter(field, model_field)))
+            if model_field.attname not in self.columns:
+                self.columns.append(model_field.attname)
+        self._fields = fields
+
+    def values_list(self, queryset, *extra: str):
+        """Named rows with the rendered columns, ``pk`` and ``extra`` ones."""
+        columns = ["pk", *self.columns]
+        columns += [name for name in extra if name not in columns]
+        self._positions = {column: index for index, column in enumerate(columns)}
+        return queryset.values_list(*columns, named=True)
+
+    def render(self, rows: Sequence[tuple]) -> list[dict]:
+        plan = [
+            (name, self._positions[column], convert)
+            for name, column, convert in self._fields
+        ]
+        return [
+            {
+                name: (
+                    row[index]
+                    if convert is None or row[index] is None
+                    else convert(row[index])
+                )
+                for name, index, convert in plan
+            }
+            for row in rows
+        ]
+
+
+class FastListMixin:
+    """Serve ``list`` through :class:`RowRenderer` with ``?fast=true``.
+
+    Requests expanding relations, or with fields the renderer does not
+    support, go through the serializer as usual.
+    """
+
+    def list(self, request, *args, **kwargs):
+        if request.query_params.get(FAST_PARAM) not in ("1", "true") or (
+            requested_expansions(request, self.get_serializer_class())
+        ):
+            return super().list(request, *args, **kwargs)
+        try:
+            renderer = RowRenderer(self.get_serializer())
+        except Unsupported:
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        cursor_field = getattr(self, "cursor_field", None)
+        rows = renderer.values_list(queryset, *filter(None, [cursor_field]))
+        page = self.paginate_queryset(rows)
+        if page is None:
+            return fastpath.json_response(renderer.render(rows), status.HTTP_200_OK)
+        body = self.paginator.get_paginated_body(renderer.render(page))
+        return fastpath.json_response(body, status.HTTP_200_OK)
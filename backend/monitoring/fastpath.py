@@ -0,0 +1,209 @@
+"""Serializer-free parsing, validation and rendering for the ingest endpoints.
+
+The schema reproduces what :class:`MeasurementIngestSerializer` accepts and
+the error messages it returns, without building DRF field instances for
+every request.
+"""
+
+from __future__ import annotations
+
+import math
+import re
+from collections.abc import Mapping
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Any, Callable, Optional
+
+import orjson
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import APIException
+
+REQUIRED = "This field is required."
+NOT_NULL = "This field may not be null."
+MAX_STRING_LENGTH = 1000
+# Largest value of the bigint ``Measurement.sequence`` column.
+MAX_SEQUENCE = 2**63 - 1
+# Largest magnitude the Decimal(5, 2) temperature and humidity columns hold.
+MAX_READING_VALUE = 999.99
+_DECIMAL_SUFFIX = re.compile(r"\.0*\s*$")
+_SURROGATE = re.compile("[\ud800-\udfff]")
+
+
+class ParseError(Exception):
+    pass
+
+
+class _Invalid(Exception):
+    pass
+
+
+def _char(value: Any) -> str:
+    if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+        raise _Invalid("Not a valid string.")
+    value = str(value).strip()
+    if not value:
+        raise _Invalid("This field may not be blank.")
+    if "\x00" in value:
+        raise _Invalid("Null characters are not allowed.")
+    surrogate = _SURROGATE.search(value)
+    if surrogate:
+        raise _Invalid(
+            f"Surrogate characters are not allowed: U+{ord(surrogate.group()):X}."
+        )
+    return value
+
+
+def _float(value: Any) -> float:
+    if isinstance(value, str) and len(value) > MAX_STRING_LENGTH:
+        raise _Invalid("String value too large.")
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise _Invalid("A valid number is required.") from None
+    except OverflowError:
+        raise _Invalid("Integer value too large to convert to float") from None
+
+
+def _reading_value(value: Any) -> float:
+    value = _float(value)
+    # NaN would pass both range checks below.
+    if not math.isfinite(value):
+        raise _Invalid("A valid number is required.")
+    if value > MAX_READING_VALUE:
+        raise _Invalid(
+            f"Ensure this value is less than or equal to {MAX_READING_VALUE}."
+        )
+    if value < -MAX_READING_VALUE:
+        raise _Invalid(
+            f"Ensure this value is greater than or equal to {-MAX_READING_VALUE}."
+        )
+    return value
+
+
+def _non_negative_integer(value: Any) -> int:
+    if isinstance(value, str) and len(value) > MAX_STRING_LENGTH:
+        raise _Invalid("String value too large.")
+    try:
+        value = int(_DECIMAL_SUFFIX.sub("", str(value)))
+    except (TypeError, ValueError):
+        raise _Invalid("A valid integer is required.") from None
+    if value < 0:
+        raise _Invalid("Ensure this value is greater than or equal to 0.")
+    if value > MAX_SEQUENCE:
+        raise _Invalid(f"Ensure this value is less than or equal to {MAX_SEQUENCE}.")
+    return value
+
+
+def _datetime(value: Any) -> datetime:
+    if isinstance(value, date) and not isinstance(value, datetime):
+        raise _Invalid("Expected a datetime but got a date.")
+    parsed = value if isinstance(value, datetime) else None
+    if parsed is None and isinstance(value, str):
+        try:
+            parsed = parse_datetime(value)
+        except ValueError:
+            parsed = None
+    if parsed is None:
+        raise _Invalid(
+            "Datetime has wrong format. Use one of these formats instead: "
+            "YYYY-MM-DDThh:mm[:ss[.uuuuuu]][+HH:MM|-HH:MM|Z]."
+        )
+    current = timezone.get_current_timezone()
+    try:
+        if timezone.is_aware(parsed):
+            return parsed.astimezone(current)
+        return timezone.make_aware(parsed, current)
+    except OverflowError:
+        raise _Invalid("Datetime value out of range.") from None
+
+
+def _datetime_representation(value: datetime) -> str:
+    text = value.isoformat()
+    return text[:-6] + "Z" if text.endswith("+00:00") else text
+
+
+@dataclass(frozen=True, slots=True)
+class _Field:
+    name: str
+    convert: Callable[[Any], Any]
+    required: bool = True
+    represent: Callable[[Any], Any] = lambda value: value
+
+
+class Schema:
+    """Flat validator built once from a list of fields."""
+
+    def __init__(self, *fields: _Field) -> None:
+        self.fields = fields
+
+    def validate(self, data: Any) -> tuple[Optional[dict], Optional[dict]]:
+        """Return ``(validated_data, None)`` or ``(None, errors)``."""
+        if not isinstance(data, Mapping):
+            return None, {
+                "non_field_errors": [
+                    "Invalid data. Expected a dictionary, but got "
+                    f"{type(data).__name__}."
+                ]
+            }
+        validated: dict = {}
+        errors: dict = {}
+        for field in self.fields:
+            if field.name not in data:
+                if field.required:
+                    errors[field.name] = [REQUIRED]
+                continue
+            value = data[field.name]
+            if value is None:
+                errors[field.name] = [NOT_NULL]
+                continue
+            try:
+                validated[field.name] = field.convert(value)
+            except _Invalid as exc:
+                errors[field.name] = [str(exc)]
+        if errors:
+            return None, errors
+        return validated, None
+
+    def represent(self, validated: dict) -> dict:
+        """Same output as the serializer's ``.data`` for ``validated``."""
+        return {
+            field.name: field.represent(validated[field.name])
+            for field in self.fields
+            if field.name in validated
+        }
+
+
+INGEST_SCHEMA = Schema(
+    _Field("sensor_token", _char),
+    _Field("temperature", _reading_value),
+    _Field("humidity", _reading_value),
+    _Field(
+        "recorded_at", _datetime, required=False, represent=_datetime_representation
+    ),
+    _Field("sequence", _non_negative_integer, required=False),
+)
+
+
+def parse_json(body: bytes) -> Any:
+    if not body:
+        return {}
+    try:
+        return orjson.loads(body)
+    except orjson.JSONDecodeError as exc:
+        raise ParseError(f"JSON parse error - {exc}") from None
+
+
+def json_response(payload: Any, status: int) -> HttpResponse:
+    return HttpResponse(
+        orjson.dumps(payload), status=status, content_type="application/json"
+    )
+
+
+def exception_response(exc: APIException) -> HttpResponse:
+    """Render a DRF exception the way DRF's exception handler would."""
+    response = json_response({"detail": str(exc.detail)}, exc.status_code)
+    if getattr(exc, "wait", None):
+        response["Retry-After"] = "%d" % exc.wait
+    return response
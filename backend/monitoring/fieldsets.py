@@ -0,0 +1,90 @@
+"""Sparse fieldsets (``?fields=``) and opt-in expansion (``?expand=``).
+
+Relations are rendered as ids unless the request expands them, e.g.
+``/api/alerts/?expand=sensor&fields=id,status,sensor,created_at``. A
+serializer lists what can be expanded, and with which serializer, in
+``Meta.expandable_fields``; :class:`SparseFieldsViewMixin` loads only the
+requested columns and joins only the expanded relations. Both only apply to
+reads (``GET``/``HEAD``), so writes keep every field.
+"""
+
+from __future__ import annotations
+
+from typing import Optional
+
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.serializers import ListSerializer
+
+FIELDS_PARAM = "fields"
+EXPAND_PARAM = "expand"
+
+
+def _requested(request, param: str) -> Optional[set[str]]:
+    if request is None or request.method not in SAFE_METHODS:
+        return None
+    value = request.query_params.get(param)
+    if not value:
+        return None
+    return {name.strip() for name in value.split(",") if name.strip()}
+
+
+def requested_fields(request) -> Optional[set[str]]:
+    return _requested(request, FIELDS_PARAM)
+
+
+def requested_expansions(request, serializer_class) -> set[str]:
+    expandable = getattr(serializer_class.Meta, "expandable_fields", {})
+    return (_requested(request, EXPAND_PARAM) or set()) & set(expandable)
+
+
+class SparseFieldsMixin:
+    """Serializer mixin applying ``?fields=`` and ``?expand=``.
+
+    Only the serializer a view builds reads the query; serializers nested in
+    it render all their fields.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        parent = self.parent
+        if isinstance(parent, ListSerializer):
+            parent = parent.parent
+        request = self.context.get("request")
+        if parent is not None or request is None:
+            return fields
+
+        expandable = getattr(self.Meta, "expandable_fields", {})
+        for name in requested_expansions(request, type(self)):
+            fields[name] = expandable[name](read_only=True)
+        wanted = requested_fields(request)
+        if wanted is not None:
+            fields = {name: field for name, field in fields.items() if name in wanted}
+        return fields
+
+
+class SparseFieldsViewMixin:
+    """Viewset mixin matching the list/retrieve queryset to the response.
+
+    ``select_related`` is limited to expanded relations and, with
+    ``?fields=``, ``only()`` to the requested columns (plus the primary key
+    and the pagination cursor field).
+    """
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action not in ("list", "retrieve"):
+            return queryset
+        wanted = requested_fields(self.request)
+        expanded = requested_expansions(self.request, self.get_serializer_class())
+        if wanted is not None:
+            expanded &= wanted
+        queryset = queryset.select_related(None).select_related(*sorted(expanded))
+        if wanted is None:
+            return queryset
+        meta = queryset.model._meta
+        concrete = {field.name for field in meta.concrete_fields}
+        columns = {meta.pk.name, *(wanted & concrete)}
+        cursor_field = getattr(self, "cursor_field", None)
+        if cursor_field:
+            columns.add(cursor_field)
+        return queryset.only(*sorted(columns))
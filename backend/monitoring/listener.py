@@ -0,0 +1,319 @@
+"""Socket ingest for sensors and gateways that cannot afford HTTP.
+
+The listener accepts the same readings as ``/api/ingest/batch/``:
+
+* over UDP, one JSON reading, list of readings or ``{"readings": [...]}`` per
+  datagram, or a binary packet (see :mod:`monitoring.binary`);
+* over TCP, one such JSON payload per line.
+
+Every payload gets a JSON reply shaped like the batch endpoint's response
+(a datagram back to the sender, or a line on the connection). A datagram is
+never answered with more bytes than it carried, so spoofed datagrams cannot
+use the listener as an amplifier: larger replies are cut down to the counts,
+or dropped. Readings from
+all connections are micro-batched and stored together with
+:func:`store_validated_readings`, so alerting behaves exactly as over HTTP.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import struct
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Optional
+
+import orjson
+from django.conf import settings
+from django.db import close_old_connections
+from rest_framework.exceptions import Throttled
+
+from . import fastpath
+from .binary import MAGIC, decode_readings
+from .ratelimit import IngestOverloaded, _sensor_tokens, ingest_limiter
+from .services import store_validated_readings
+
+logger = logging.getLogger(__name__)
+
+MAX_LINE_BYTES = 1024 * 1024
+
+
+def _store_batch(items: list[tuple[dict, dict]]) -> list[dict]:
+    close_old_connections()
+    try:
+        return store_validated_readings(items)
+    finally:
+        close_old_connections()
+
+
+class MicroBatcher:
+    """Collects validated readings and stores them ``max_size`` at a time.
+
+    A batch is flushed when it is full or ``max_delay`` seconds after its
+    first reading. Batches are written one after the other by a single
+    worker thread; once ``max_pending`` readings are waiting, new ones are
+    rejected as overloaded instead of queueing behind a slow database.
+    """
+
+    def __init__(self, *, max_size: int, max_delay: float, max_pending: int) -> None:
+        self.max_size = max_size
+        self.max_delay = max_delay
+        self.max_pending = max_pending
+        self.pending = 0
+        self.batches = 0
+        self.shed = 0
+        self._queue: list[tuple[dict, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._flushes: set[asyncio.Task] = set()
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="ingest-listener"
+        )
+
+    def submit(self, values: dict) -> asyncio.Future:
+        """Queue a validated reading; the future resolves to its outcome."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        if self.max_pending and self.pending >= self.max_pending:
+            self.shed += 1
+            future.set_result(_overloaded())
+            return future
+        self.pending += 1
+        self._queue.append((values, future))
+        if len(self._queue) >= self.max_size:
+            self.flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_delay, self.flush)
+        return future
+
+    def flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._queue:
+            return
+        batch, self._queue = self._queue, []
+        task = asyncio.ensure_future(self._store(batch))
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def _store(self, batch: list[tuple[dict, asyncio.Future]]) -> None:
+        items = [
+            (values, fastpath.INGEST_SCHEMA.represent(values)) for values, _ in batch
+        ]
+        try:
+            outcomes = await asyncio.get_running_loop().run_in_executor(
+                self._executor, _store_batch, items
+            )
+        except Exception:
+            logger.exception("Storing %d listener readings failed", len(batch))
+            outcomes = [_overloaded()] * len(batch)
+        else:
+            self.batches += 1
+            counts = Counter(outcome["status"] for outcome in outcomes)
+            ingest_limiter.record(
+                accepted=len(outcomes) - counts["rejected"],
+                duplicates=counts["duplicate"],
+            )
+        finally:
+            self.pending -= len(batch)
+        for (_, future), outcome in zip(batch, outcomes):
+            if not future.done():
+                future.set_result(outcome)
+
+    async def drain(self) -> None:
+        """Store everything queued so far and stop the worker thread."""
+        self.flush()
+        while self._flushes:
+            await asyncio.gather(*self._flushes)
+        self._executor.shutdown()
+
+    def stats(self) -> dict:
+        return {
+            "pending": self.pending,
+            "batches": self.batches,
+            "shed": self.shed,
+        }
+
+
+def _overloaded() -> dict:
+    exc = IngestOverloaded()
+    return {
+        "status": "rejected",
+        "errors": {"detail": str(exc.detail)},
+        "retry_after": exc.wait,
+    }
+
+
+def _datagram_reply(reply: dict, limit: int) -> Optional[bytes]:
+    """``reply`` encoded in at most ``limit`` bytes, or ``None``."""
+    summary = {
+        key: reply[key]
+        for key in ("created", "duplicates", "rejected", "retry_after")
+        if key in reply
+    }
+    for candidate in (reply, summary):
+        body = orjson.dumps(candidate)
+        if candidate and len(body) <= limit:
+            return body
+    return None
+
+
+def _parse(payload: bytes) -> list:
+    if payload.startswith(MAGIC):
+        try:
+            return decode_readings(payload)
+        except (ValueError, struct.error) as exc:
+            raise fastpath.ParseError(f"Binary packet error - {exc}") from None
+    data = fastpath.parse_json(payload)
+    if isinstance(data, dict) and "readings" in data:
+        data = data["readings"]
+    if not isinstance(data, list):
+        data = [data]
+    if not data:
+        raise fastpath.ParseError("Send at least one reading.")
+    return data
+
+
+class IngestListener:
+    """Turns UDP datagrams and TCP lines into batched measurement writes."""
+
+    def __init__(self, batcher: MicroBatcher) -> None:
+        self.batcher = batcher
+        self.servers: list[Any] = []
+        self.closing = False
+        self._replies: set[asyncio.Task] = set()
+        self._connections: set[asyncio.Task] = set()
+
+    async def handle(self, payload: bytes) -> dict:
+        """Ingest one payload and return the reply for it."""
+        try:
+            items = _parse(payload)
+        except fastpath.ParseError as exc:
+            return {"detail": str(exc)}
+        if len(items) > settings.INGEST_BATCH_MAX_SIZE:
+            return {
+                "detail": "Ensure this field has no more than "
+                f"{settings.INGEST_BATCH_MAX_SIZE} elements."
+            }
+
+        tokens, count = _sensor_tokens(items)
+        wait = ingest_limiter.check(tokens, count)
+        if wait:
+            return {"detail": str(Throttled(wait).detail), "retry_after": math.ceil(wait)}
+
+        results: list[dict] = [{"index": index} for index in range(len(items))]
+        futures: list[asyncio.Future] = []
+        indexes: list[int] = []
+        for index, item in enumerate(items):
+            values, errors = fastpath.INGEST_SCHEMA.validate(item)
+            if errors:
+                results[index].update(status="rejected", errors=errors)
+            else:
+                indexes.append(index)
+                futures.append(self.batcher.submit(values))
+        for index, outcome in zip(indexes, await asyncio.gather(*futures)):
+            results[index].update(outcome)
+
+        counts = Counter(result["status"] for result in results)
+        return {
+            "created": counts["created"],
+            "duplicates": counts["duplicate"],
+            "rejected": counts["rejected"],
+            "results": results,
+        }
+
+    async def start(
+        self, host: str, *, udp_port: Optional[int], tcp_port: Optional[int]
+    ) -> list[tuple[str, Any]]:
+        """Bind the enabled servers; returns ``(protocol, address)`` pairs."""
+        loop = asyncio.get_running_loop()
+        addresses = []
+        if udp_port is not None:
+            transport, _ = await loop.create_datagram_endpoint(
+                lambda: _DatagramProtocol(self), local_addr=(host, udp_port)
+            )
+            self.servers.append(transport)
+            addresses.append(("udp", transport.get_extra_info("sockname")))
+        if tcp_port is not None:
+            server = await asyncio.start_server(
+                self._serve_stream, host, tcp_port, limit=MAX_LINE_BYTES
+            )
+            self.servers.append(server)
+            addresses.extend(("tcp", sock.getsockname()) for sock in server.sockets)
+        return addresses
+
+    async def close(self) -> None:
+        """Stop accepting payloads, store and answer the ones in flight."""
+        self.closing = True
+        for server in self.servers:
+            if isinstance(server, asyncio.Server):
+                server.close()
+        for connection in self._connections:
+            connection.cancel()
+        while self._replies:
+            self.batcher.flush()
+            await asyncio.wait(self._replies, timeout=self.batcher.max_delay)
+        await self.batcher.drain()
+        for server in self.servers:
+            if not isinstance(server, asyncio.Server):
+                server.close()
+
+    def _spawn(self, coroutine) -> None:
+        task = asyncio.ensure_future(coroutine)
+        self._replies.add(task)
+        task.add_done_callback(self._replies.discard)
+
+    async def _serve_stream(self, reader, writer) -> None:
+        # Lines are ingested concurrently so that a client pipelining many
+        # lines fills a batch; replies are still written in line order.
+        replies: asyncio.Queue = asyncio.Queue(maxsize=self.batcher.max_size)
+
+        async def write_replies():
+            while (reply := await replies.get()) is not None:
+                writer.write(orjson.dumps(await reply) + b"\n")
+                await writer.drain()
+
+        sender = asyncio.ensure_future(write_replies())
+        self._replies.add(sender)
+        sender.add_done_callback(self._replies.discard)
+        connection = asyncio.current_task()
+        self._connections.add(connection)
+        try:
+            while line := await reader.readline():
+                if line.strip():
+                    await replies.put(asyncio.ensure_future(self.handle(line.strip())))
+        except asyncio.CancelledError:
+            pass
+        except (ConnectionError, ValueError) as exc:
+            logger.info("Closing ingest connection: %s", exc)
+        finally:
+            self._connections.discard(connection)
+            await replies.put(None)
+            try:
+                await sender
+            except ConnectionError:
+                pass
+            writer.close()
+
+
+class _DatagramProtocol(asyncio.DatagramProtocol):
+    def __init__(self, listener: IngestListener) -> None:
+        self.listener = listener
+        self.transport = None
+
+    def connection_made(self, transport) -> None:
+        self.transport = transport
+
+    def datagram_received(self, data: bytes, addr) -> None:
+        if self.listener.closing:
+            return
+        self.listener._spawn(self._reply(data, addr))
+
+    async def _reply(self, data: bytes, addr) -> None:
+        reply = _datagram_reply(await self.listener.handle(data), len(data))
+        if reply is None:
+            logger.debug("Reply to %s is larger than its datagram, not sent", addr)
+        elif not self.transport.is_closing():
+            self.transport.sendto(reply, addr)
@@ -0,0 +1,150 @@
+import asyncio
+import json
+import ssl
+import statistics
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class _Connection:
+    """Minimal HTTP/1.1 client that reuses the socket when the server allows it."""
+
+    def __init__(self, url: str) -> None:
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.secure = parts.scheme == "https"
+        self.port = parts.port or (443 if self.secure else 80)
+        self.path = parts.path or "/"
+        self.reader = None
+        self.writer = None
+
+    async def _connect(self) -> None:
+        context = ssl.create_default_context() if self.secure else None
+        self.reader, self.writer = await asyncio.open_connection(
+            self.host, self.port, ssl=context
+        )
+
+    async def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except OSError:
+                pass
+        self.reader = self.writer = None
+
+    async def post(self, body: bytes) -> int:
+        if self.writer is None:
+            await self._connect()
+        self.writer.write(
+            (
+                f"POST {self.path} HTTP/1.1\r\n"
+                f"Host: {self.host}\r\n"
+                "Content-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                "Connection: keep-alive\r\n\r\n"
+            ).encode()
+            + body
+        )
+        await self.writer.drain()
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError("Server closed the connection")
+        headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        if "content-length" not in headers:
+            await self.reader.read()
+            await self.close()
+        else:
+            await self.reader.readexactly(int(headers["content-length"]))
+            if headers.get("connection", "").lower() == "close":
+                await self.close()
+        return int(status_line.split()[1])
+
+
+class Command(BaseCommand):
+    help = "Load-test ingest endpoints and compare latency and throughput"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--url",
+            action="append",
+            required=True,
+            help="Ingest endpoint to test; repeat to compare several endpoints",
+        )
+        parser.add_argument("--token", required=True, help="Sensor token to post with")
+        parser.add_argument("--requests", type=int, default=1000)
+        parser.add_argument("--concurrency", type=int, default=50)
+        parser.add_argument("--temperature", type=float, default=5.0)
+
+    def handle(self, *args, **options):
+        for url in options["url"]:
+            report = asyncio.run(
+                self._run(
+                    url,
+                    token=options["token"],
+                    total=options["requests"],
+                    concurrency=options["concurrency"],
+                    temperature=options["temperature"],
+                )
+            )
+            self.stdout.write(self._format(url, report))
+
+    async def _run(self, url, *, token, total, concurrency, temperature) -> dict:
+        remaining = iter(range(total))
+        latencies: list[float] = []
+        statuses: dict[int, int] = {}
+        errors = 0
+
+        async def worker() -> None:
+            nonlocal errors
+            connection = _Connection(url)
+            for _ in remaining:
+                body = json.dumps(
+                    {"sensor_token": token, "temperature": temperature, "humidity": 50}
+                ).encode()
+                started = time.perf_counter()
+                try:
+                    code = await connection.post(body)
+                except (OSError, ConnectionError, asyncio.IncompleteReadError):
+                    errors += 1
+                    await connection.close()
+                    continue
+                latencies.append(time.perf_counter() - started)
+                statuses[code] = statuses.get(code, 0) + 1
+            await connection.close()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+        if not latencies:
+            raise CommandError(f"No successful requests against {url}")
+        latencies.sort()
+        return {
+            "elapsed": elapsed,
+            "throughput": len(latencies) / elapsed,
+            "statuses": statuses,
+            "errors": errors,
+            "p50": latencies[len(latencies) // 2],
+            "p95": latencies[int(len(latencies) * 0.95) - 1],
+            "p99": latencies[int(len(latencies) * 0.99) - 1],
+            "mean": statistics.fmean(latencies),
+        }
+
+    @staticmethod
+    def _format(url: str, report: dict) -> str:
+        return (
+            f"{url}\n"
+            f"  {report['throughput']:.1f} req/s over {report['elapsed']:.2f}s, "
+            f"statuses {report['statuses']}, errors {report['errors']}\n"
+            f"  latency ms: mean {report['mean'] * 1000:.1f}, "
+            f"p50 {report['p50'] * 1000:.1f}, p95 {report['p95'] * 1000:.1f}, "
+            f"p99 {report['p99'] * 1000:.1f}"
+        )
@@ -0,0 +1,128 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+from rest_framework import status
+from rest_framework.response import Response
+
+from monitoring import fastpath
+from monitoring.serializers import MeasurementIngestSerializer
+from monitoring.views import MeasurementIngestView
+
+VALID = {
+    "sensor_token": "90058e8df4f76b6c155b7f6f7ddc7865",
+    "temperature": 4.5,
+    "humidity": 61.2,
+    "recorded_at": "2024-05-01T10:20:00Z",
+}
+
+# Payloads whose validation result must be identical on both paths.
+COMPATIBILITY_CASES = [
+    VALID,
+    {**VALID, "sequence": "12.0"},
+    {},
+    [],
+    {"sensor_token": "", "temperature": "warm", "humidity": None},
+    {"sensor_token": True, "temperature": [1], "humidity": "1e400"},
+    {**VALID, "recorded_at": "yesterday", "sequence": -1},
+    {**VALID, "recorded_at": "2024-05-01", "sequence": 1.5},
+    {**VALID, "recorded_at": "2024-05-01T10:20:00+02:00", "temperature": "  7 "},
+    {**VALID, "sensor_token": 1234, "temperature": 10**400},
+    {**VALID, "sequence": 2**63},
+    {**VALID, "temperature": 1000, "humidity": "-999.995"},
+    {**VALID, "temperature": "-999.99", "humidity": 999.99},
+    {**VALID, "temperature": "nan", "humidity": "NaN"},
+    {**VALID, "temperature": "inf", "humidity": "-Infinity"},
+    {**VALID, "temperature": "1" * 1001, "sensor_token": "x" * 1001},
+    {**VALID, "sequence": "1" * 1001},
+    {**VALID, "sequence": "seven"},
+    {**VALID, "sequence": True},
+    {**VALID, "sequence": "1e3"},
+    {**VALID, "sequence": " 12 "},
+    {**VALID, "recorded_at": "2024-13-01T10:20:00Z"},
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the CPU cost of DRF and fast-path parsing, validation and "
+        "response encoding for /api/ingest/ (no database access)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=20000)
+
+    def handle(self, *args, **options):
+        self._check_compatibility()
+        body = json.dumps(VALID).encode()
+        response_body = {
+            "measurement_id": "4f0c1c52-4b8e-4c84-a36c-3f5d1f0f4a59",
+            "alerts": [],
+        }
+        factory = RequestFactory()
+
+        def drf_path():
+            view = MeasurementIngestView()
+            request = view.initialize_request(
+                factory.post("/api/ingest/", body, content_type="application/json")
+            )
+            view.request, view.args, view.kwargs = request, (), {}
+            view.format_kwarg = None
+            view.headers = {}
+            serializer = MeasurementIngestSerializer(data=request.data)
+            serializer.is_valid(raise_exception=True)
+            serializer.data
+            response = view.finalize_response(
+                request, Response(response_body, status=status.HTTP_201_CREATED)
+            )
+            return response.render()
+
+        def fast_path():
+            request = factory.post(
+                "/api/ingest/fast/", body, content_type="application/json"
+            )
+            values, _ = fastpath.INGEST_SCHEMA.validate(
+                fastpath.parse_json(request.body)
+            )
+            fastpath.INGEST_SCHEMA.represent(values)
+            return fastpath.json_response(response_body, status.HTTP_201_CREATED)
+
+        iterations = options["iterations"]
+        results = {}
+        for name, func in (("drf", drf_path), ("fast", fast_path)):
+            for _ in range(min(iterations, 500)):
+                func()
+            started = time.process_time()
+            for _ in range(iterations):
+                func()
+            results[name] = (time.process_time() - started) / iterations * 1e6
+            self.stdout.write(f"{name:>5}: {results[name]:.1f} µs CPU per request")
+        saved = results["drf"] - results["fast"]
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Saved {saved:.1f} µs per request "
+                f"({saved / results['drf'] * 100:.0f} % of the DRF path)"
+            )
+        )
+
+    def _check_compatibility(self):
+        for case in COMPATIBILITY_CASES:
+            serializer = MeasurementIngestSerializer(data=case)
+            expected = (
+                (serializer.data, None)
+                if serializer.is_valid()
+                else (None, json.loads(json.dumps(serializer.errors)))
+            )
+            values, errors = fastpath.INGEST_SCHEMA.validate(case)
+            actual = (
+                fastpath.INGEST_SCHEMA.represent(values) if values is not None else None,
+                errors,
+            )
+            if expected != actual:
+                raise CommandError(
+                    f"Fast path differs for {case!r}: {actual!r} != {expected!r}"
+                )
+        self.stdout.write(
+            f"Fast path matches the serializer on {len(COMPATIBILITY_CASES)} payloads"
+        )
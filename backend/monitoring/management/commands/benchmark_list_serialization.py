@@ -0,0 +1,122 @@
+import json
+import time
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from monitoring.models import AuditLog, Measurement, Sensor, User
+from monitoring.views import AuditLogViewSet, MeasurementViewSet
+
+ENDPOINTS = (
+    ("measurements", MeasurementViewSet, "/api/measurements/"),
+    ("audit-logs", AuditLogViewSet, "/api/audit-logs/"),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the rows per second of the serializer and of the ?fast=true "
+        "path for the measurement and audit log lists, on synthetic rows that "
+        "are rolled back afterwards"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=5000)
+        parser.add_argument("--page-size", type=int, default=1000)
+        parser.add_argument("--iterations", type=int, default=20)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user = self._seed(options["rows"])
+            try:
+                self._run(user, options["page_size"], options["iterations"])
+            finally:
+                transaction.set_rollback(True)
+
+    def _seed(self, rows: int) -> User:
+        user = User.objects.create_superuser(
+            f"benchmark-{uuid.uuid4().hex[:8]}", password=None
+        )
+        sensors = Sensor.objects.bulk_create(
+            Sensor(name=f"Benchmark {index}", serial_number=f"BENCH-{uuid.uuid4().hex}")
+            for index in range(10)
+        )
+        now = timezone.now()
+        Measurement.objects.bulk_create(
+            (
+                Measurement(
+                    sensor=sensors[index % len(sensors)],
+                    temperature=Decimal(index % 1200) / 100,
+                    humidity=Decimal("61.20"),
+                    recorded_at=now - timedelta(seconds=index, microseconds=index),
+                    status=Measurement.Status.NORMAL,
+                    raw_payload={"sensor_token": "benchmark", "temperature": 4.5},
+                )
+                for index in range(rows)
+            ),
+            batch_size=1000,
+        )
+        AuditLog.objects.bulk_create(
+            (
+                AuditLog(
+                    action="measurement.ingested",
+                    actor=user if index % 2 else None,
+                    target_model="Measurement",
+                    target_id=str(uuid.uuid4()),
+                    payload={"temperature": 4.5, "status": "normal"},
+                )
+                for index in range(rows)
+            ),
+            batch_size=1000,
+        )
+        return user
+
+    def _run(self, user: User, page_size: int, iterations: int) -> None:
+        host = next(
+            (host.lstrip(".") for host in settings.ALLOWED_HOSTS if host != "*"),
+            "localhost",
+        )
+        factory = APIRequestFactory(HTTP_HOST=host)
+        for name, viewset, url in ENDPOINTS:
+            view = viewset.as_view({"get": "list"})
+
+            def fetch(params):
+                request = factory.get(url, {"page_size": page_size, **params})
+                force_authenticate(request, user=user)
+                response = view(request)
+                if response.status_code != 200:
+                    raise CommandError(f"{url} returned {response.status_code}")
+                if hasattr(response, "render"):
+                    response.render()
+                return response
+
+            expected = json.loads(fetch({}).content)
+            actual = json.loads(fetch({"fast": "true"}).content)
+            if expected["results"] != actual["results"]:
+                raise CommandError(f"Fast path differs from the serializer on {url}")
+            rows = len(expected["results"])
+
+            results = {}
+            for path, params in (("drf", {}), ("fast", {"fast": "true"})):
+                fetch(params)
+                started = time.perf_counter()
+                for _ in range(iterations):
+                    fetch(params)
+                elapsed = time.perf_counter() - started
+                results[path] = rows * iterations / elapsed
+                self.stdout.write(
+                    f"{name:>12} {path:>4}: {results[path]:,.0f} rows/s "
+                    f"({elapsed / iterations * 1000:.1f} ms per {rows} rows)"
+                )
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"{name:>12}: {results['fast'] / results['drf']:.1f}x "
+                    "with ?fast=true, same output"
+                )
+            )
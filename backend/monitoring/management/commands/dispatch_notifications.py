@@ -0,0 +1,46 @@
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+
+from monitoring.dispatcher import NotificationDispatcher
+
+
+class Command(BaseCommand):
+    help = "Deliver queued alert notifications from the outbox"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Process a single batch and exit",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=2.0,
+            help="Seconds to wait when the outbox is drained",
+        )
+        parser.add_argument("--batch-size", type=int, help="Rows claimed per batch")
+        parser.add_argument("--workers", type=int, help="Delivery threads")
+
+    def handle(self, *args, **options):
+        kwargs = {}
+        if options["batch_size"]:
+            kwargs["batch_size"] = options["batch_size"]
+        if options["workers"]:
+            kwargs["max_workers"] = options["workers"]
+        dispatcher = NotificationDispatcher(**kwargs)
+        try:
+            if options["once"]:
+                counts = dispatcher.dispatch_once()
+                self.stdout.write(self.style.SUCCESS(f"Dispatched notifications: {counts}"))
+                return
+
+            stop = threading.Event()
+            signal.signal(signal.SIGTERM, lambda *_: stop.set())
+            signal.signal(signal.SIGINT, lambda *_: stop.set())
+            self.stdout.write("Dispatching notifications, press Ctrl+C to stop")
+            dispatcher.run_forever(interval=options["interval"], stop=stop)
+        finally:
+            dispatcher.close()
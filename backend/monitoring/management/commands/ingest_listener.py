@@ -0,0 +1,53 @@
+import asyncio
+import signal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from monitoring.listener import IngestListener, MicroBatcher
+
+
+class Command(BaseCommand):
+    help = "Ingest readings sent over UDP datagrams or TCP lines"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="0.0.0.0")
+        parser.add_argument(
+            "--udp-port", type=int, default=9100, help="UDP port, 0 disables UDP"
+        )
+        parser.add_argument(
+            "--tcp-port", type=int, default=9100, help="TCP port, 0 disables TCP"
+        )
+        parser.add_argument("--batch-size", type=int, help="Readings stored per batch")
+        parser.add_argument(
+            "--flush-ms", type=float, help="Longest wait before a batch is stored"
+        )
+
+    def handle(self, *args, **options):
+        batcher = MicroBatcher(
+            max_size=options["batch_size"] or settings.INGEST_LISTENER_BATCH_SIZE,
+            max_delay=(options["flush_ms"] or settings.INGEST_LISTENER_FLUSH_MS) / 1000,
+            max_pending=settings.INGEST_LISTENER_MAX_PENDING,
+        )
+        asyncio.run(self._serve(IngestListener(batcher), options))
+
+    async def _serve(self, listener, options):
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        loop.add_signal_handler(signal.SIGTERM, stop.set)
+        loop.add_signal_handler(signal.SIGINT, stop.set)
+
+        addresses = await listener.start(
+            options["host"],
+            udp_port=options["udp_port"] or None,
+            tcp_port=options["tcp_port"] or None,
+        )
+        for protocol, (host, port, *_) in addresses:
+            self.stdout.write(f"Listening on {protocol}://{host}:{port}")
+        self.stdout.write("Press Ctrl+C to stop")
+        await stop.wait()
+
+        await listener.close()
+        self.stdout.write(
+            self.style.SUCCESS(f"Stopped after {listener.batcher.batches} batches")
+        )
@@ -0,0 +1,47 @@
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from monitoring.spool import SpoolLoader
+
+
+class Command(BaseCommand):
+    help = "Load spooled readings into the database"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Drain the spool once and exit",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=0.5,
+            help="Seconds to wait when the spool is drained",
+        )
+        parser.add_argument("--batch-size", type=int, help="Readings stored per transaction")
+
+    def handle(self, *args, **options):
+        loader = SpoolLoader(
+            settings.INGEST_SPOOL_DIR,
+            batch_size=options["batch_size"] or settings.INGEST_SPOOL_BATCH_SIZE,
+            segment_seconds=settings.INGEST_SPOOL_SEGMENT_SECONDS,
+        )
+        if options["once"]:
+            loaded = loader.drain_once()
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Loaded {loaded} spooled readings ({loader.skipped} skipped, "
+                    f"{loader.dead_lettered} dead-lettered)"
+                )
+            )
+            return
+
+        stop = threading.Event()
+        signal.signal(signal.SIGTERM, lambda *_: stop.set())
+        signal.signal(signal.SIGINT, lambda *_: stop.set())
+        self.stdout.write("Loading spooled readings, press Ctrl+C to stop")
+        loader.run_forever(interval=options["interval"], stop=stop)
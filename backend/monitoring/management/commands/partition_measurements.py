@@ -0,0 +1,48 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from monitoring import partitions
+
+
+class Command(BaseCommand):
+    help = "Create upcoming monthly measurement partitions (PostgreSQL)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--months-ahead",
+            type=int,
+            help="Months after the current one to create partitions for",
+        )
+        parser.add_argument(
+            "--convert",
+            action="store_true",
+            help="Rebuild an unpartitioned measurement table as a partitioned "
+            "one (locks the table while its rows are copied)",
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("Measurement partitioning requires PostgreSQL")
+        months_ahead = options["months_ahead"]
+        if months_ahead is None:
+            months_ahead = settings.MEASUREMENT_PARTITIONS_AHEAD
+
+        if not partitions.is_partitioned():
+            if not options["convert"]:
+                raise CommandError(
+                    f"{partitions.TABLE} is not partitioned, run with --convert"
+                )
+            created = partitions.convert_to_partitioned(months_ahead)
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Converted {partitions.TABLE} into {len(created)} "
+                    "monthly partitions"
+                )
+            )
+            return
+
+        created = partitions.create_future_partitions(months_ahead)
+        for partition in created:
+            self.stdout.write(f"Created {partition.name}")
+        self.stdout.write(self.style.SUCCESS(f"{len(created)} partitions created"))
@@ -0,0 +1,67 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from monitoring import partitions
+
+
+class Command(BaseCommand):
+    help = (
+        "Detach monthly measurement partitions older than the retention period, "
+        "with the alerts raised on them"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--keep-months",
+            type=int,
+            help="Months kept besides the current one",
+        )
+        parser.add_argument(
+            "--archive-dir",
+            help="Write each partition to <dir>/<partition>.csv.gz, then drop it",
+        )
+        parser.add_argument(
+            "--drop",
+            action="store_true",
+            help="Drop detached partitions instead of keeping them as tables",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only list the partitions that would be detached",
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql" or not partitions.is_partitioned():
+            raise CommandError(
+                f"{partitions.TABLE} is not partitioned, see partition_measurements"
+            )
+        keep_months = options["keep_months"]
+        if keep_months is None:
+            keep_months = settings.MEASUREMENT_RETENTION_MONTHS
+        cutoff = partitions.add_months(
+            partitions.month_start(timezone.now()), -keep_months
+        )
+        expired = [
+            partition
+            for partition in partitions.list_partitions()
+            if partition.end <= cutoff
+        ]
+
+        for partition in expired:
+            if options["dry_run"]:
+                self.stdout.write(f"Would detach {partition.name}")
+                continue
+            archive = partitions.detach_partition(
+                partition, archive_dir=options["archive_dir"], drop=options["drop"]
+            )
+            self.stdout.write(
+                f"Detached {partition.name}" + (f" to {archive}" if archive else "")
+            )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{len(expired)} partitions before {cutoff:%Y-%m} expired"
+            )
+        )
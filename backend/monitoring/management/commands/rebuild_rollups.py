@@ -0,0 +1,58 @@
+from datetime import datetime, time, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from monitoring.models import Measurement, MeasurementRollup
+from monitoring.rollups import bucket_start, rebuild_rollups
+
+
+def _parse(value: str) -> datetime:
+    parsed = parse_datetime(value)
+    if parsed is None and (day := parse_date(value)) is not None:
+        parsed = datetime.combine(day, time())
+    if parsed is None:
+        raise CommandError(f"Invalid date or datetime: {value}")
+    return parsed if timezone.is_aware(parsed) else timezone.make_aware(parsed)
+
+
+class Command(BaseCommand):
+    help = "Recompute measurement rollups from raw measurements"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--from", dest="start", help="Start date or datetime")
+        parser.add_argument("--to", dest="end", help="End date or datetime (exclusive)")
+        parser.add_argument(
+            "--sensor", action="append", dest="sensors", help="Sensor id (repeatable)"
+        )
+
+    def handle(self, *args, **options):
+        bounds = Measurement.objects.aggregate(
+            oldest=Min("recorded_at"), newest=Max("recorded_at")
+        )
+        if bounds["oldest"] is None:
+            self.stdout.write("No measurements to roll up")
+            return
+        start = _parse(options["start"]) if options["start"] else bounds["oldest"]
+        end = (
+            _parse(options["end"])
+            if options["end"]
+            else bounds["newest"] + timedelta(microseconds=1)
+        )
+
+        # One transaction per day keeps ingest for the rebuilt sensors waiting
+        # on their daily rollup locks for a moment only.
+        total = 0
+        day = bucket_start(start, MeasurementRollup.Resolution.DAY)
+        while day < end:
+            next_day = day + timedelta(days=1)
+            total += rebuild_rollups(day, next_day, sensor_ids=options["sensors"])
+            day = next_day
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Rolled up {total} measurements "
+                f"from {start:%Y-%m-%d} to {end:%Y-%m-%d}"
+            )
+        )
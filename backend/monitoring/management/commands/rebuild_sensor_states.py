@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from monitoring.sensor_states import rebuild_sensor_states
+
+
+class Command(BaseCommand):
+    help = "Recompute the latest state of sensors from their measurements"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sensor", action="append", dest="sensors", help="Sensor id (repeatable)"
+        )
+
+    def handle(self, *args, **options):
+        written = rebuild_sensor_states(options["sensors"])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt the state of {written} sensors"))
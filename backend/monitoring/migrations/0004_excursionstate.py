@@ -0,0 +1,27 @@
+# Generated by Django 5.1.1 on 2026-10-18 06:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0003_notificationoutbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExcursionState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('breach_started_at', models.DateTimeField(blank=True, null=True)),
+                ('last_recorded_at', models.DateTimeField(blank=True, null=True)),
+                ('rule', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='excursion_states', to='monitoring.alertrule')),
+                ('sensor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='excursion_states', to='monitoring.sensor')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('sensor', 'rule'), name='unique_excursion_state')],
+            },
+        ),
+    ]
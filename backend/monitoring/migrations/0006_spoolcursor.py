@@ -0,0 +1,22 @@
+# Generated by Django 5.1.1 on 2026-10-18 07:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0005_alert_incident_fields'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SpoolCursor',
+            fields=[
+                ('segment', models.CharField(max_length=255, primary_key=True, serialize=False)),
+                ('offset', models.PositiveBigIntegerField(default=0)),
+                ('records', models.PositiveBigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.1.1 on 2026-10-18 07:08
+
+from django.db import migrations, models
+
+
+def remove_duplicate_measurements(apps, schema_editor):
+    """Keep the first received reading per (sensor, recorded_at).
+
+    Alerts pointing at a dropped duplicate are moved to the kept reading.
+    """
+    Measurement = apps.get_model("monitoring", "Measurement")
+    Alert = apps.get_model("monitoring", "Alert")
+    duplicates = (
+        Measurement.objects.values("sensor_id", "recorded_at")
+        .annotate(rows=models.Count("id"))
+        .filter(rows__gt=1)
+    )
+    for group in duplicates.iterator():
+        ids = list(
+            Measurement.objects.filter(
+                sensor_id=group["sensor_id"], recorded_at=group["recorded_at"]
+            )
+            .order_by("received_at")
+            .values_list("id", flat=True)
+        )
+        keep, drop = ids[0], ids[1:]
+        Alert.objects.filter(measurement_id__in=drop).update(measurement_id=keep)
+        Alert.objects.filter(last_measurement_id__in=drop).update(
+            last_measurement_id=keep
+        )
+        Measurement.objects.filter(id__in=drop).delete()
+    if schema_editor.connection.vendor == "postgresql":
+        # The alert foreign keys are deferred: check them now, or adding the
+        # constraints below fails with "pending trigger events".
+        schema_editor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0006_spoolcursor'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='measurement',
+            name='sequence',
+            field=models.PositiveBigIntegerField(blank=True, help_text='Client-provided reading counter', null=True),
+        ),
+        migrations.RunPython(remove_duplicate_measurements, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='measurement',
+            constraint=models.UniqueConstraint(fields=('sensor', 'recorded_at'), name='unique_measurement_sensor_recorded_at'),
+        ),
+        migrations.AddConstraint(
+            model_name='measurement',
+            constraint=models.UniqueConstraint(condition=models.Q(('sequence__isnull', False)), fields=('sensor', 'sequence'), name='unique_measurement_sensor_sequence'),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.1.1 on 2026-10-18 07:20
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Build the indexes without locking writes to large tables.
+    atomic = False
+
+    dependencies = [
+        ('monitoring', '0007_measurement_idempotency'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='alert',
+            index=models.Index(fields=['-created_at'], name='alert_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='alert',
+            index=models.Index(fields=['status', '-created_at'], name='alert_status_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='alert',
+            index=models.Index(fields=['sensor', 'status'], name='alert_sensor_status_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='alert',
+            index=models.Index(condition=models.Q(('status__in', ['open', 'acknowledged'])), fields=['sensor', 'created_at'], name='alert_open_sensor_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='alert',
+            index=models.Index(condition=models.Q(('status', 'open')), fields=['-created_at'], name='alert_open_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='auditlog',
+            index=models.Index(fields=['-created_at'], name='auditlog_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='auditlog',
+            index=models.Index(fields=['action', '-created_at'], name='auditlog_action_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='measurement',
+            index=models.Index(fields=['-recorded_at'], name='measurement_recorded_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='measurement',
+            index=models.Index(fields=['status', '-recorded_at'], name='measurement_status_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='ticket',
+            index=models.Index(fields=['-created_at'], name='ticket_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='ticket',
+            index=models.Index(fields=['status', 'priority'], name='ticket_status_priority_idx'),
+        ),
+    ]
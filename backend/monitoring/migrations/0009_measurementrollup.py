@@ -0,0 +1,35 @@
+# Generated by Django 5.1.1 on 2026-10-18 07:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0008_list_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MeasurementRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resolution', models.CharField(choices=[('5m', '5 minutes'), ('1h', '1 hour'), ('1d', '1 day')], max_length=2)),
+                ('bucket', models.DateTimeField(help_text='Start of the bucket')),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('out_of_range_count', models.PositiveIntegerField(default=0)),
+                ('temperature_min', models.DecimalField(decimal_places=2, max_digits=5)),
+                ('temperature_max', models.DecimalField(decimal_places=2, max_digits=5)),
+                ('temperature_sum', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('humidity_min', models.DecimalField(decimal_places=2, max_digits=5)),
+                ('humidity_max', models.DecimalField(decimal_places=2, max_digits=5)),
+                ('humidity_sum', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('sensor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='monitoring.sensor')),
+            ],
+            options={
+                'ordering': ['bucket'],
+                'constraints': [models.UniqueConstraint(fields=('sensor', 'resolution', 'bucket'), name='unique_rollup_sensor_resolution_bucket')],
+            },
+        ),
+    ]
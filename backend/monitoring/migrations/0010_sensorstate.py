@@ -0,0 +1,28 @@
+# Generated by Django 5.1.1 on 2026-10-18 07:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0009_measurementrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SensorState',
+            fields=[
+                ('sensor', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='state', serialize=False, to='monitoring.sensor')),
+                ('last_recorded_at', models.DateTimeField()),
+                ('last_temperature', models.DecimalField(decimal_places=2, max_digits=5)),
+                ('last_humidity', models.DecimalField(decimal_places=2, max_digits=5)),
+                ('last_status', models.CharField(choices=[('normal', 'Normal'), ('warning', 'Warning'), ('critical', 'Critical')], max_length=32)),
+                ('last_out_of_range_at', models.DateTimeField(blank=True, null=True)),
+                ('reading_count', models.PositiveBigIntegerField(default=0)),
+                ('out_of_range_count', models.PositiveBigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
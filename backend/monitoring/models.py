@@ -70,14 +70,89 @@ class Measurement(models.Model):
     )
     note = models.CharField(max_length=255, blank=True)
     raw_payload = models.JSONField(default=dict, blank=True)
+    sequence = models.PositiveBigIntegerField(
+        null=True, blank=True, help_text="Client-provided reading counter"
+    )
 
     class Meta:
         ordering = ["-recorded_at"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["sensor", "recorded_at"],
+                name="unique_measurement_sensor_recorded_at",
+            ),
+            models.UniqueConstraint(
+                fields=["sensor", "sequence"],
+                condition=models.Q(sequence__isnull=False),
+                name="unique_measurement_sensor_sequence",
+            ),
+        ]
+        # Filtering by sensor uses unique_measurement_sensor_recorded_at.
+        indexes = [
+            models.Index(fields=["-recorded_at"], name="measurement_recorded_idx"),
+            models.Index(
+                fields=["status", "-recorded_at"], name="measurement_status_idx"
+            ),
+        ]
 
     def __str__(self) -> str:
         return f"{self.sensor.name} @ {self.recorded_at:%Y-%m-%d %H:%M}"
 
 
+class MeasurementRollup(models.Model):
+    """Aggregate of a sensor's measurements over one time bucket."""
+
+    class Resolution(models.TextChoices):
+        FIVE_MINUTES = "5m", "5 minutes"
+        HOUR = "1h", "1 hour"
+        DAY = "1d", "1 day"
+
+    sensor = models.ForeignKey(
+        Sensor, related_name="rollups", on_delete=models.CASCADE
+    )
+    resolution = models.CharField(max_length=2, choices=Resolution.choices)
+    bucket = models.DateTimeField(help_text="Start of the bucket")
+    count = models.PositiveIntegerField(default=0)
+    out_of_range_count = models.PositiveIntegerField(default=0)
+    temperature_min = models.DecimalField(max_digits=5, decimal_places=2)
+    temperature_max = models.DecimalField(max_digits=5, decimal_places=2)
+    temperature_sum = models.DecimalField(max_digits=14, decimal_places=2)
+    humidity_min = models.DecimalField(max_digits=5, decimal_places=2)
+    humidity_max = models.DecimalField(max_digits=5, decimal_places=2)
+    humidity_sum = models.DecimalField(max_digits=14, decimal_places=2)
+
+    class Meta:
+        ordering = ["bucket"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["sensor", "resolution", "bucket"],
+                name="unique_rollup_sensor_resolution_bucket",
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.sensor_id} {self.resolution} @ {self.bucket:%Y-%m-%d %H:%M}"
+
+
+class SensorState(models.Model):
+    """Latest reading and running counters of a sensor."""
+
+    sensor = models.OneToOneField(
+        Sensor, primary_key=True, related_name="state", on_delete=models.CASCADE
+    )
+    last_recorded_at = models.DateTimeField()
+    last_temperature = models.DecimalField(max_digits=5, decimal_places=2)
+    last_humidity = models.DecimalField(max_digits=5, decimal_places=2)
+    last_status = models.CharField(max_length=32, choices=Measurement.Status.choices)
+    last_out_of_range_at = models.DateTimeField(null=True, blank=True)
+    reading_count = models.PositiveBigIntegerField(default=0)
+    out_of_range_count = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return f"{self.sensor_id} {self.last_status} @ {self.last_recorded_at}"
+
+
 class AlertRule(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     name = models.CharField(max_length=120)
@@ -112,6 +187,27 @@ class AlertRule(models.Model):
         return f"{self.name} ({scope})"
 
 
+class ExcursionState(models.Model):
+    sensor = models.ForeignKey(
+        Sensor, related_name="excursion_states", on_delete=models.CASCADE
+    )
+    rule = models.ForeignKey(
+        AlertRule, related_name="excursion_states", on_delete=models.CASCADE
+    )
+    breach_started_at = models.DateTimeField(null=True, blank=True)
+    last_recorded_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["sensor", "rule"], name="unique_excursion_state"
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.sensor_id}/{self.rule_id} since {self.breach_started_at}"
+
+
 class Alert(models.Model):
     class Severity(models.TextChoices):
         INFO = "info", "Info"
@@ -144,6 +240,18 @@ class Alert(models.Model):
         max_length=32, choices=Status.choices, default=Status.OPEN
     )
     message = models.TextField()
+    occurrences = models.PositiveIntegerField(default=1)
+    peak_temperature = models.DecimalField(
+        max_digits=5, decimal_places=2, null=True, blank=True
+    )
+    last_seen_at = models.DateTimeField(null=True, blank=True)
+    last_measurement = models.ForeignKey(
+        Measurement,
+        related_name="+",
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     acknowledged_at = models.DateTimeField(null=True, blank=True)
     resolved_at = models.DateTimeField(null=True, blank=True)
@@ -164,6 +272,23 @@ class Alert(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["-created_at"], name="alert_created_idx"),
+            models.Index(fields=["status", "-created_at"], name="alert_status_idx"),
+            models.Index(fields=["sensor", "status"], name="alert_sensor_status_idx"),
+            # Open alerts are a small fraction of the table and are read on
+            # every reading of their sensor.
+            models.Index(
+                fields=["sensor", "created_at"],
+                condition=models.Q(status__in=["open", "acknowledged"]),
+                name="alert_open_sensor_idx",
+            ),
+            models.Index(
+                fields=["-created_at"],
+                condition=models.Q(status="open"),
+                name="alert_open_created_idx",
+            ),
+        ]
 
     def __str__(self) -> str:
         return f"{self.sensor.name} - {self.severity}"
@@ -184,6 +309,49 @@ class Channel(models.Model):
         return f"{self.name} ({self.channel_type})"
 
 
+class NotificationOutbox(models.Model):
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        SENDING = "sending", "Sending"
+        SENT = "sent", "Sent"
+        FAILED = "failed", "Failed"
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    alert = models.ForeignKey(
+        Alert, related_name="notifications", on_delete=models.CASCADE
+    )
+    channel = models.ForeignKey(
+        Channel,
+        related_name="notifications",
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+    )
+    channel_type = models.CharField(max_length=20, choices=Channel.CHANNEL_TYPES)
+    target = models.CharField(max_length=255, blank=True)
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    status = models.CharField(
+        max_length=32, choices=Status.choices, default=Status.PENDING
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["created_at"]
+        indexes = [
+            models.Index(
+                fields=["status", "next_attempt_at"], name="outbox_status_due_idx"
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.channel_type} -> {self.target or 'default'} ({self.status})"
+
+
 
 class Ticket(models.Model):
     class Status(models.TextChoices):
@@ -229,6 +397,10 @@ class Ticket(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["-created_at"], name="ticket_created_idx"),
+            models.Index(fields=["status", "priority"], name="ticket_status_priority_idx"),
+        ]
 
     def __str__(self) -> str:
         return self.title
@@ -247,6 +419,20 @@ class AuditLog(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["-created_at"], name="auditlog_created_idx"),
+            models.Index(fields=["action", "-created_at"], name="auditlog_action_idx"),
+        ]
 
     def __str__(self) -> str:
         return f"{self.action} by {self.actor or 'system'}"
+
+
+class SpoolCursor(models.Model):
+    segment = models.CharField(max_length=255, primary_key=True)
+    offset = models.PositiveBigIntegerField(default=0)
+    records = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return f"{self.segment} @ {self.offset}"
@@ -1,40 +1,45 @@
-import logging
-import requests
+from typing import Optional
+
 from django.conf import settings
-from django.core.mail import send_mail
+from django.core.mail import EmailMessage
+
+from .transports import http_transports, smtp_transport
+
+class NotificationNotConfigured(Exception):
+    """The channel cannot deliver anything until its settings are filled in."""
 
-logger = logging.getLogger(__name__)
+
+def build_email_message(subject: str, body: str, recipients: list[str]) -> EmailMessage:
+    return EmailMessage(
+        subject=subject,
+        body=body,
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=recipients,
+    )
 
 
 def send_email_notification(subject: str, body: str, recipients: list[str]) -> None:
     if not recipients:
         return
-    try:
-        send_mail(
-            subject=subject,
-            message=body,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=recipients,
-            fail_silently=False,
-        )
-    except Exception:
-        logger.exception("Failed to send email notification")
+    smtp_transport.send_messages([build_email_message(subject, body, recipients)])
+
+
+def send_email_notifications(messages: list[EmailMessage]) -> list[Optional[Exception]]:
+    """Send ``messages``; returns the error of each one, ``None`` once sent."""
+    return smtp_transport.send_each(messages)
 
 
 def send_telegram_notification(body: str) -> None:
     if not settings.TELEGRAM_BOT_TOKEN or not settings.TELEGRAM_CHAT_ID:
-        return
+        raise NotificationNotConfigured("Telegram bot token or chat id not set")
     url = f"https://api.telegram.org/bot{settings.TELEGRAM_BOT_TOKEN}/sendMessage"
     payload = {"chat_id": settings.TELEGRAM_CHAT_ID, "text": body}
-    try:
-        requests.post(url, json=payload, timeout=10)
-    except Exception:
-        logger.exception("Failed to send Telegram notification")
+    http_transports["telegram"].post_json(url, payload)
 
 
 def send_whatsapp_notification(body: str) -> None:
     if not settings.WHATSAPP_TOKEN or not settings.WHATSAPP_PHONE_ID:
-        return
+        raise NotificationNotConfigured("WhatsApp token or phone id not set")
     url = (
         f"https://graph.facebook.com/v17.0/{settings.WHATSAPP_PHONE_ID}/messages"
     )
@@ -48,8 +53,11 @@ def send_whatsapp_notification(body: str) -> None:
         "Authorization": f"Bearer {settings.WHATSAPP_TOKEN}",
         "Content-Type": "application/json",
     }
-    try:
-        requests.post(url, json=payload, headers=headers, timeout=10)
-    except Exception:
-        logger.exception("Failed to send WhatsApp notification")
+    http_transports["whatsapp"].post_json(url, payload, headers=headers)
+
 
+def send_webhook_notification(
+    url: str, subject: str, body: str, extra: Optional[dict] = None
+) -> None:
+    payload = {"subject": subject, "text": body, **(extra or {})}
+    http_transports["webhook"].post_json(url, payload)
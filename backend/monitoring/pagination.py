@@ -0,0 +1,210 @@
+"""Keyset (cursor) pagination for the large, time ordered lists.
+
+Pages are ordered by ``(<time field>, id)`` and a cursor holds the position
+of the last (or first) row of the page it came from, so every page is one
+index range scan of ``page_size`` rows whatever its depth, and there is no
+``COUNT(*)``. A total is only returned with ``?count=approximate``: on
+PostgreSQL it is the planner's estimate for the filtered query.
+"""
+
+from __future__ import annotations
+
+import base64
+import json
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.db.models import Q
+from rest_framework import exceptions
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+@dataclass(frozen=True)
+class Cursor:
+    value: Any
+    pk: Any
+    reverse: bool
+
+
+def estimate_count(queryset) -> int:
+    """Row estimate of ``queryset``; an exact count outside PostgreSQL."""
+    if connection.vendor != "postgresql":
+        return queryset.count()
+    sql, params = queryset.order_by().values("pk").query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+class KeysetPagination(BasePagination):
+    """Cursor pagination on ``(view.cursor_field, id)``, a datetime field.
+
+    Pages are newest first unless the queryset is ordered by the cursor field
+    ascending (e.g. ``?ordering=recorded_at``). Any other ``?ordering=`` is
+    rejected with a 400 rather than silently ignored.
+    """
+
+    cursor_query_param = "cursor"
+    count_query_param = "count"
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+    invalid_cursor_message = "Invalid cursor"
+
+    def get_page_size(self, request) -> int:
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return api_settings.PAGE_SIZE
+        return min(max(size, 1), self.max_page_size)
+
+    def _encode(self, cursor: Cursor) -> str:
+        data = {
+            "v": cursor.value.isoformat(),
+            "id": str(cursor.pk),
+            "r": cursor.reverse,
+        }
+        raw = json.dumps(data, separators=(",", ":")).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    def _decode(self, token: Optional[str]) -> Optional[Cursor]:
+        if not token:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+            data = json.loads(raw)
+            meta = self.model._meta
+            value = meta.get_field(self.field).to_python(data["v"])
+            pk = meta.pk.to_python(data["id"])
+            return Cursor(value, pk, bool(data.get("r", False)))
+        except (ValueError, TypeError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def _check_ordering(self, request) -> None:
+        param = api_settings.ORDERING_PARAM
+        terms = [
+            term.strip()
+            for term in request.query_params.get(param, "").split(",")
+            if term.strip()
+        ]
+        if terms and terms not in ([self.field], [f"-{self.field}"]):
+            raise exceptions.ValidationError(
+                {param: [f"Only {self.field} and -{self.field} are supported."]}
+            )
+
+    def _descending(self, queryset) -> bool:
+        ordering = queryset.query.order_by or queryset.model._meta.ordering
+        return not (ordering and ordering[0] == self.field)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.model = queryset.model
+        self.field = view.cursor_field
+        self._check_ordering(request)
+        self.page_size = self.get_page_size(request)
+        self.cursor = self._decode(request.query_params.get(self.cursor_query_param))
+        self.descending = self._descending(queryset)
+        self.count = None
+        if request.query_params.get(self.count_query_param) == "approximate":
+            self.count = estimate_count(queryset)
+
+        reverse = self.cursor is not None and self.cursor.reverse
+        descending = self.descending != reverse
+        if self.cursor is not None:
+            value, pk = self.cursor.value, self.cursor.pk
+            if descending:
+                queryset = queryset.filter(**{f"{self.field}__lte": value}).filter(
+                    Q(**{f"{self.field}__lt": value}) | Q(pk__lt=pk)
+                )
+            else:
+                queryset = queryset.filter(**{f"{self.field}__gte": value}).filter(
+                    Q(**{f"{self.field}__gt": value}) | Q(pk__gt=pk)
+                )
+        sign = "-" if descending else ""
+        queryset = queryset.order_by(f"{sign}{self.field}", f"{sign}pk")
+
+        rows = list(queryset[: self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[: self.page_size]
+        if reverse:
+            rows.reverse()
+            self.has_previous, self.has_next = has_more, True
+        else:
+            self.has_previous, self.has_next = self.cursor is not None, has_more
+        self.page = rows
+        return rows
+
+    def _link(self, row, reverse: bool) -> str:
+        url = self.request.build_absolute_uri()
+        cursor = Cursor(getattr(row, self.field), row.pk, reverse)
+        return replace_query_param(url, self.cursor_query_param, self._encode(cursor))
+
+    def get_next_link(self) -> Optional[str]:
+        if not self.has_next or not self.page:
+            return None
+        return self._link(self.page[-1], reverse=False)
+
+    def get_previous_link(self) -> Optional[str]:
+        if not self.has_previous:
+            return None
+        if not self.page:
+            # Past the end of the list: back to the first page.
+            url = self.request.build_absolute_uri()
+            return remove_query_param(url, self.cursor_query_param)
+        return self._link(self.page[0], reverse=True)
+
+    def get_paginated_body(self, data) -> dict:
+        body = {"next": self.get_next_link(), "previous": self.get_previous_link()}
+        if self.count is not None:
+            body["count"] = self.count
+        body["results"] = data
+        return body
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_body(data))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "count": {
+                    "type": "integer",
+                    "description": "Estimated total, with ?count=approximate",
+                },
+                "results": schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": self.cursor_query_param,
+                "required": False,
+                "in": "query",
+                "schema": {"type": "string"},
+            },
+            {
+                "name": self.page_size_query_param,
+                "required": False,
+                "in": "query",
+                "schema": {"type": "integer"},
+            },
+            {
+                "name": self.count_query_param,
+                "required": False,
+                "in": "query",
+                "schema": {"type": "string", "enum": ["approximate"]},
+            },
+        ]
+
@@ -0,0 +1,273 @@
+"""Monthly PostgreSQL range partitions for measurements.
+
+Partitioning is optional: ``manage.py partition_measurements --convert``
+turns ``monitoring_measurement`` into a table partitioned by
+``recorded_at`` with one partition per calendar month (UTC) plus a default
+partition for readings outside every month that exists. Afterwards:
+
+* the primary key is ``(id, recorded_at)`` and unique indexes that do not
+  contain ``recorded_at`` (see :data:`PARTITION_UNIQUE_INDEXES`) are only
+  enforced within a month;
+* alerts keep their ``measurement`` ids but PostgreSQL cannot enforce a
+  foreign key to a partitioned table on ``id`` alone, so those constraints
+  are dropped;
+* old months are removed by detaching whole partitions
+  (:func:`detach_partition`) instead of deleting rows.
+"""
+
+from __future__ import annotations
+
+import gzip
+import re
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+
+from django.db import connection, transaction
+from django.db.models.expressions import RawSQL
+
+from .models import Alert, Measurement
+
+TABLE = Measurement._meta.db_table
+DEFAULT_PARTITION = f"{TABLE}_default"
+
+# Unique indexes PostgreSQL cannot enforce across partitions, created on each
+# partition instead.
+PARTITION_UNIQUE_INDEXES = {
+    "unique_measurement_sensor_sequence": (
+        "(sensor_id, sequence) WHERE sequence IS NOT NULL"
+    ),
+}
+
+
+@dataclass(frozen=True)
+class Partition:
+    name: str
+    start: datetime
+    end: datetime
+
+
+def month_start(value: datetime) -> datetime:
+    value = value.astimezone(timezone.utc)
+    return datetime(value.year, value.month, 1, tzinfo=timezone.utc)
+
+
+def add_months(value: datetime, months: int) -> datetime:
+    index = value.year * 12 + value.month - 1 + months
+    return value.replace(year=index // 12, month=index % 12 + 1)
+
+
+def partition_for(month: datetime) -> Partition:
+    start = month_start(month)
+    return Partition(
+        f"{TABLE}_y{start:%Y}m{start:%m}", start, add_months(start, 1)
+    )
+
+
+def _quote(name: str) -> str:
+    return connection.ops.quote_name(name)
+
+
+def is_partitioned() -> bool:
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)",
+            [TABLE],
+        )
+        return cursor.fetchone() is not None
+
+
+def list_partitions() -> list[Partition]:
+    """Monthly partitions attached to the measurement table, oldest first."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT child.relname
+            FROM pg_inherits
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE pg_inherits.inhparent = to_regclass(%s)
+            """,
+            [TABLE],
+        )
+        names = {name for (name,) in cursor.fetchall()}
+    partitions = []
+    for name in names:
+        try:
+            month = datetime.strptime(name[len(TABLE) :], "_y%Ym%m")
+        except ValueError:
+            continue
+        partitions.append(partition_for(month.replace(tzinfo=timezone.utc)))
+    return sorted(partitions, key=lambda partition: partition.start)
+
+
+def _bound(value: datetime) -> str:
+    return f"'{value.isoformat()}'"
+
+
+def _create_unique_indexes(cursor, table: str) -> None:
+    for name, definition in PARTITION_UNIQUE_INDEXES.items():
+        cursor.execute(
+            f"CREATE UNIQUE INDEX IF NOT EXISTS {_quote(f'{table}_{name}'[:63])} "
+            f"ON {_quote(table)} {definition}"
+        )
+
+
+def create_partition(month: datetime) -> Optional[Partition]:
+    """Create and attach the partition of ``month``; None if it exists.
+
+    Rows of that month already sitting in the default partition are moved
+    into the new partition before it is attached.
+    """
+    partition = partition_for(month)
+    if partition in list_partitions():
+        return None
+    table, name = _quote(TABLE), _quote(partition.name)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE TABLE {name} "
+            f"(LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+        )
+        cursor.execute(
+            f"WITH moved AS (DELETE FROM {_quote(DEFAULT_PARTITION)} "
+            "WHERE recorded_at >= %s AND recorded_at < %s RETURNING *) "
+            f"INSERT INTO {name} SELECT * FROM moved",
+            [partition.start, partition.end],
+        )
+        cursor.execute(
+            f"ALTER TABLE {table} ATTACH PARTITION {name} FOR VALUES "
+            f"FROM ({_bound(partition.start)}) TO ({_bound(partition.end)})"
+        )
+        _create_unique_indexes(cursor, partition.name)
+    return partition
+
+
+def create_future_partitions(months_ahead: int, *, now: Optional[datetime] = None):
+    """Make sure the current month and ``months_ahead`` more have partitions."""
+    current = month_start(now or datetime.now(timezone.utc))
+    created = []
+    for offset in range(months_ahead + 1):
+        partition = create_partition(add_months(current, offset))
+        if partition is not None:
+            created.append(partition)
+    return created
+
+
+def convert_to_partitioned(months_ahead: int) -> list[Partition]:
+    """Rebuild the measurement table as a partitioned table.
+
+    Every row is copied in a single transaction that locks the table, so
+    run it in a maintenance window.
+    """
+    legacy = f"{TABLE}_unpartitioned"
+    table, quoted_legacy = _quote(TABLE), _quote(legacy)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"ALTER TABLE {table} RENAME TO {quoted_legacy}")
+
+        # Foreign keys from other tables (alerts) cannot point to the
+        # partitioned table. The constraints and indexes of the old table
+        # are recreated on the new one under the same names.
+        cursor.execute(
+            """
+            SELECT conrelid::regclass::text, conname
+            FROM pg_constraint WHERE confrelid = to_regclass(%s)
+            """,
+            [legacy],
+        )
+        for referencing, constraint in cursor.fetchall():
+            cursor.execute(
+                f"ALTER TABLE {referencing} DROP CONSTRAINT {_quote(constraint)}"
+            )
+        cursor.execute(
+            """
+            SELECT conname, contype, pg_get_constraintdef(oid)
+            FROM pg_constraint WHERE conrelid = to_regclass(%s)
+            """,
+            [legacy],
+        )
+        constraints = cursor.fetchall()
+        cursor.execute(
+            """
+            SELECT index_class.relname, pg_get_indexdef(index_class.oid)
+            FROM pg_index
+            JOIN pg_class index_class ON index_class.oid = pg_index.indexrelid
+            WHERE pg_index.indrelid = to_regclass(%s)
+              AND NOT EXISTS (
+                  SELECT 1 FROM pg_constraint WHERE conindid = index_class.oid
+              )
+            """,
+            [legacy],
+        )
+        indexes = cursor.fetchall()
+        for name, _, _ in constraints:
+            cursor.execute(
+                f"ALTER TABLE {quoted_legacy} DROP CONSTRAINT {_quote(name)}"
+            )
+        for name, _ in indexes:
+            cursor.execute(f"DROP INDEX {_quote(name)}")
+
+        cursor.execute(
+            f"CREATE TABLE {table} (LIKE {quoted_legacy} INCLUDING DEFAULTS) "
+            "PARTITION BY RANGE (recorded_at)"
+        )
+        cursor.execute(
+            f"CREATE TABLE {_quote(DEFAULT_PARTITION)} PARTITION OF {table} DEFAULT"
+        )
+        for name, kind, definition in constraints:
+            if kind == "p":
+                definition = "PRIMARY KEY (id, recorded_at)"
+            cursor.execute(
+                f"ALTER TABLE {table} ADD CONSTRAINT {_quote(name)} {definition}"
+            )
+        on_legacy = re.compile(rf" ON (?:\S+\.)?{re.escape(legacy)} ")
+        for name, definition in indexes:
+            if name not in PARTITION_UNIQUE_INDEXES:
+                cursor.execute(on_legacy.sub(f" ON {table} ", definition))
+        _create_unique_indexes(cursor, DEFAULT_PARTITION)
+
+        cursor.execute(f"SELECT min(recorded_at) FROM {quoted_legacy}")
+        (oldest,) = cursor.fetchone()
+        now = datetime.now(timezone.utc)
+        month = month_start(oldest or now)
+        while month < month_start(now):
+            create_partition(month)
+            month = add_months(month, 1)
+        create_future_partitions(months_ahead, now=now)
+
+        cursor.execute(f"INSERT INTO {table} SELECT * FROM {quoted_legacy}")
+        cursor.execute(f"DROP TABLE {quoted_legacy}")
+    return list_partitions()
+
+
+def detach_partition(
+    partition: Partition, *, archive_dir: Optional[Path] = None, drop: bool = False
+) -> Optional[Path]:
+    """Remove a month of measurements and the alerts raised on them.
+
+    The partition is detached into a standalone table. With ``archive_dir``
+    it is first written there as ``<partition>.csv.gz``; with ``archive_dir``
+    or ``drop`` the detached table is then dropped.
+    """
+    name = _quote(partition.name)
+    in_partition = RawSQL(f"SELECT id FROM {name}", [])
+    archive = None
+    with transaction.atomic():
+        Alert.objects.filter(last_measurement_id__in=in_partition).update(
+            last_measurement=None
+        )
+        # Through the ORM, so tickets and notifications cascade as before.
+        Alert.objects.filter(measurement_id__in=in_partition).delete()
+        with connection.cursor() as cursor:
+            cursor.execute(f"ALTER TABLE {_quote(TABLE)} DETACH PARTITION {name}")
+            if archive_dir is not None:
+                archive = Path(archive_dir) / f"{partition.name}.csv.gz"
+                archive.parent.mkdir(parents=True, exist_ok=True)
+                with gzip.open(archive, "wb") as output, cursor.copy(
+                    f"COPY {name} TO STDOUT (FORMAT csv, HEADER)"
+                ) as copy:
+                    for chunk in copy:
+                        output.write(chunk)
+            if archive is not None or drop:
+                cursor.execute(f"DROP TABLE {name}")
+    return archive
+
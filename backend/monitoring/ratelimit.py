@@ -0,0 +1,298 @@
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Iterable, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.throttling import BaseThrottle
+
+logger = logging.getLogger(__name__)
+
+BucketState = tuple[float, float]
+
+
+class IngestOverloaded(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Ingest is overloaded, retry later."
+    default_code = "overloaded"
+    wait = 1
+
+
+def _refill(
+    state: Optional[BucketState], *, capacity: float, rate: float, now: float
+) -> float:
+    """Tokens in a bucket once refilled up to ``now``."""
+    tokens, updated = state or (capacity, now)
+    return min(capacity, tokens + max(0.0, now - updated) * rate)
+
+
+def _take_all(
+    states: dict[str, Optional[BucketState]],
+    *,
+    capacity: float,
+    rate: float,
+    now: float,
+) -> tuple[Optional[dict[str, BucketState]], float]:
+    """Take one token from every bucket, or from none of them.
+
+    Returns the new states and 0, or ``None`` and the wait until every bucket
+    has a token again.
+    """
+    tokens = {
+        key: _refill(state, capacity=capacity, rate=rate, now=now)
+        for key, state in states.items()
+    }
+    wait = max(((1 - left) / rate for left in tokens.values() if left < 1), default=0.0)
+    if wait:
+        return None, wait
+    return {key: (left - 1, now) for key, left in tokens.items()}, 0.0
+
+
+class LocalBucketStore:
+    """Token buckets held in this process, bounded to ``max_size`` sensors."""
+
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max_size
+        self._buckets: OrderedDict[str, BucketState] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, keys: Iterable[str], *, capacity: float, rate: float) -> float:
+        with self._lock:
+            states, wait = _take_all(
+                {key: self._buckets.get(key) for key in keys},
+                capacity=capacity,
+                rate=rate,
+                now=time.time(),
+            )
+            if states:
+                for key, state in states.items():
+                    self._buckets.pop(key, None)
+                    self._buckets[key] = state
+                while len(self._buckets) > self.max_size:
+                    self._buckets.popitem(last=False)
+        return wait
+
+    def size(self) -> int:
+        return len(self._buckets)
+
+
+class CacheBucketStore:
+    """Token buckets shared through a Django cache (e.g. Redis).
+
+    The read-modify-write is not atomic, so concurrent requests of one sensor
+    on different workers may occasionally both get the last token; the limit
+    still holds within a token or two.
+    """
+
+    def __init__(self, alias: str) -> None:
+        self.cache = caches[alias]
+
+    def take(self, keys: Iterable[str], *, capacity: float, rate: float) -> float:
+        cache_keys = {f"ingest-bucket:{key}": key for key in keys}
+        stored = self.cache.get_many(list(cache_keys))
+        states, wait = _take_all(
+            {cache_key: stored.get(cache_key) for cache_key in cache_keys},
+            capacity=capacity,
+            rate=rate,
+            now=time.time(),
+        )
+        if states:
+            self.cache.set_many(states, timeout=int(capacity / rate) + 60)
+        return wait
+
+    def size(self) -> Optional[int]:
+        return None
+
+
+class DatabaseLoad:
+    """Sessions busy in the database, sampled by a background thread.
+
+    Counts the other sessions of the database that are running a statement
+    (``pg_stat_activity``), so every worker process sees the load put on the
+    database by all of them, whatever kind of worker it is. Only PostgreSQL
+    reports it; on other databases it stays 0.
+    """
+
+    def __init__(self, interval: float) -> None:
+        self.interval = interval
+        self.active = 0
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def current(self) -> int:
+        if self.interval > 0 and self._pid != os.getpid():
+            self._start()
+        return self.active
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self.active = 0
+            threading.Thread(
+                target=self._sample_forever, name="ingest-database-load", daemon=True
+            ).start()
+
+    def _sample_forever(self) -> None:
+        connection = connections[DEFAULT_DB_ALIAS]
+        if connection.vendor != "postgresql":
+            return
+        pid = os.getpid()
+        while self._pid == pid:
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        "SELECT count(*) FROM pg_stat_activity "
+                        "WHERE datname = current_database() AND state = 'active' "
+                        "AND pid <> pg_backend_pid()"
+                    )
+                    (self.active,) = cursor.fetchone()
+            except Exception:
+                logger.warning("Sampling the database load failed", exc_info=True)
+                self.active = 0
+                connection.close()
+            time.sleep(self.interval)
+
+
+class IngestLimiter:
+    """Per-sensor rate limiting and global backpressure for the ingest API.
+
+    Each sensor token gets a bucket of ``burst`` requests refilled at
+    ``per_minute``; a request naming several tokens spends one from each, or
+    from none when any of them is empty. Independently, readings are shed with
+    a 503 instead of piling up behind a saturated database once
+    ``max_database_active`` sessions are busy in the database (across all
+    workers), or once ``max_inflight`` writes are in progress or waiting for
+    the database in this process (which only matters for threaded and async
+    workers: a sync worker has at most one).
+    """
+
+    def __init__(
+        self,
+        store,
+        *,
+        burst: float,
+        per_minute: float,
+        max_inflight: int,
+        database: DatabaseLoad,
+        max_database_active: int,
+    ) -> None:
+        self.store = store
+        self.burst = burst
+        self.rate = per_minute / 60
+        self.max_inflight = max_inflight
+        self.database = database
+        self.max_database_active = max_database_active
+        self._lock = threading.Lock()
+        self.inflight = 0
+        self.accepted = 0
+        self.duplicates = 0
+        self.throttled = 0
+        self.shed = 0
+
+    def check(self, tokens: Iterable[str], readings: int = 1) -> float:
+        """Seconds to wait before ``tokens`` may send again, 0 if allowed now.
+
+        Every token spends one request from its bucket, unless one of them is
+        throttled; a throttled request counts its ``readings`` as throttled.
+        """
+        tokens = list(tokens)
+        if self.rate <= 0 or not tokens:
+            return 0.0
+        wait = self.store.take(tokens, capacity=self.burst, rate=self.rate)
+        if wait:
+            self.record(throttled=readings)
+        return wait
+
+    @contextmanager
+    def write_slot(self, readings: int = 1):
+        """Hold a write slot, or raise :class:`IngestOverloaded` if none is free."""
+        with self._lock:
+            if (self.max_inflight and self.inflight >= self.max_inflight) or (
+                self.max_database_active
+                and self.database.current() >= self.max_database_active
+            ):
+                self.shed += readings
+                raise IngestOverloaded()
+            self.inflight += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.inflight -= 1
+
+    def record(
+        self, *, accepted: int = 0, duplicates: int = 0, throttled: int = 0
+    ) -> None:
+        """Count readings; ``duplicates`` are accepted readings already stored."""
+        with self._lock:
+            self.accepted += accepted
+            self.duplicates += duplicates
+            self.throttled += throttled
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "accepted": self.accepted,
+                "duplicates": self.duplicates,
+                "throttled": self.throttled,
+                "shed": self.shed,
+                "inflight": self.inflight,
+                "max_inflight": self.max_inflight,
+                "database_active": self.database.active,
+                "max_database_active": self.max_database_active,
+                "buckets": self.store.size(),
+            }
+
+
+def _sensor_tokens(data: Any) -> tuple[set[str], int]:
+    """Tokens and number of readings in an ingest or batch payload."""
+    if isinstance(data, dict) and isinstance(data.get("readings"), list):
+        data = data["readings"]
+    items: Iterable = data if isinstance(data, list) else [data]
+    tokens = set()
+    count = 0
+    for item in items:
+        count += 1
+        token = item.get("sensor_token") if isinstance(item, dict) else None
+        if isinstance(token, str):
+            tokens.add(token)
+    return tokens, count
+
+
+class SensorTokenThrottle(BaseThrottle):
+    """Applies :data:`ingest_limiter` to every sensor token in the request."""
+
+    def allow_request(self, request, view) -> bool:
+        tokens, count = _sensor_tokens(request.data)
+        self._wait = ingest_limiter.check(tokens, count)
+        return not self._wait
+
+    def wait(self) -> Optional[float]:
+        return self._wait
+
+
+def _build_store():
+    if settings.INGEST_RATE_LIMIT_STORE == "cache":
+        return CacheBucketStore(settings.INGEST_RATE_LIMIT_CACHE)
+    return LocalBucketStore(max_size=settings.SENSOR_CACHE_MAX_SIZE)
+
+
+ingest_limiter = IngestLimiter(
+    _build_store(),
+    burst=settings.INGEST_RATE_LIMIT_BURST,
+    per_minute=settings.INGEST_RATE_LIMIT_PER_MINUTE,
+    max_inflight=settings.INGEST_MAX_INFLIGHT_WRITES,
+    database=DatabaseLoad(interval=settings.INGEST_DATABASE_LOAD_INTERVAL_MS / 1000),
+    max_database_active=settings.INGEST_MAX_DATABASE_ACTIVE,
+)
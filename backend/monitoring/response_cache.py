@@ -0,0 +1,138 @@
+"""Cached, conditional list and detail responses for read-mostly viewsets.
+
+Every model a viewset reads has a version in the ``RESPONSE_CACHE`` cache
+alias: the time (in ns) it last changed, bumped by model signals once the
+transaction commits (see ``signals.py``) and by ingest for the alerts and
+tickets it writes in bulk. A response is cached under the versions of its
+models, the role of the user and the full URL, and carries an ``ETag`` and a
+``Last-Modified`` derived from them. A request revalidating an unchanged
+resource gets ``304 Not Modified`` without reading the database.
+
+Responses only depend on the role of the user (the viewsets do not filter
+per user), so one cached copy is shared by every user of a role. Versions
+expire after ``RESPONSE_CACHE_TTL_SECONDS``, which bounds staleness when the
+cache is per process.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import time
+from typing import Iterable
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Model
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.response import Response
+
+
+def _label(model: type[Model]) -> str:
+    return model._meta.label_lower
+
+
+class ResponseCache:
+    version_prefix = "response-cache:version:"
+    response_prefix = "response-cache:response:"
+
+    def __init__(self, alias: str, ttl: float) -> None:
+        self.alias = alias
+        self.ttl = ttl
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def versions(self, models: Iterable[type[Model]]) -> dict[str, int]:
+        keys = {self.version_prefix + _label(model): _label(model) for model in models}
+        found = self.cache.get_many(list(keys))
+        missing = {key: time.time_ns() for key in keys if key not in found}
+        if missing:
+            for key, version in missing.items():
+                self.cache.add(key, version, self.ttl)
+            found.update(self.cache.get_many(list(missing)))
+        return {label: found.get(key, missing.get(key)) for key, label in keys.items()}
+
+    def bump(self, *models: type[Model]) -> None:
+        now = time.time_ns()
+        self.cache.set_many(
+            {self.version_prefix + _label(model): now for model in models}, self.ttl
+        )
+
+    def get(self, key: str):
+        return self.cache.get(self.response_prefix + key)
+
+    def set(self, key: str, data) -> None:
+        self.cache.set(self.response_prefix + key, data, self.ttl)
+
+
+response_cache = ResponseCache(
+    settings.RESPONSE_CACHE, ttl=settings.RESPONSE_CACHE_TTL_SECONDS
+)
+
+
+def _role(user) -> str:
+    return ":".join(
+        [
+            str(getattr(user, "role", "")),
+            str(int(user.is_staff)),
+            str(int(user.is_superuser)),
+        ]
+    )
+
+
+class CachedResponseMixin:
+    """Serve ``list`` and ``retrieve`` from :data:`response_cache`.
+
+    ``cache_models`` lists every model the responses are built from; the
+    viewset's own model is always included.
+    """
+
+    cache_models: tuple[type[Model], ...] = ()
+
+    def list(self, request, *args, **kwargs):
+        return self._cached_response(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._cached_response(request, super().retrieve, *args, **kwargs)
+
+    def _cached_response(self, request, render, *args, **kwargs):
+        models = {self.get_queryset().model, *self.cache_models}
+        versions = response_cache.versions(models)
+        key = "|".join(
+            [
+                self.basename,
+                self.action,
+                _role(request.user),
+                ",".join(f"{label}={version}" for label, version in sorted(versions.items())),
+                request.build_absolute_uri(),
+            ]
+        )
+        key = hashlib.sha256(key.encode()).hexdigest()
+        etag = f'"{key[:32]}"'
+        last_modified = max(versions.values()) // 1_000_000_000
+        headers = {
+            "ETag": etag,
+            "Last-Modified": http_date(last_modified),
+            "Cache-Control": "private, no-cache",
+        }
+
+        not_modified = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if not_modified is not None:
+            for name, value in headers.items():
+                not_modified[name] = value
+            return not_modified
+
+        data = response_cache.get(key)
+        if data is not None:
+            return Response(data, headers=headers)
+        response = render(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            response_cache.set(key, response.data)
+            for name, value in headers.items():
+                response[name] = value
+        return response
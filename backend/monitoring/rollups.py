@@ -0,0 +1,314 @@
+"""Per-sensor measurement rollups at 5 minute, hourly and daily resolution.
+
+Rollups are additive (count, sums, out of range count) or idempotent
+(min, max), so new readings are folded into their buckets with an upsert
+whatever order they arrive in: a late reading simply updates an older
+bucket. Rollups are kept when raw measurements are pruned, so nothing here
+deletes a bucket whose readings are no longer stored.
+"""
+
+from __future__ import annotations
+
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Iterable, Optional, Sequence
+
+from django.db import connection, transaction
+from django.db.models import F, Max, Min
+
+from .models import Measurement, MeasurementRollup
+
+RESOLUTION_SECONDS = {
+    MeasurementRollup.Resolution.FIVE_MINUTES.value: 5 * 60,
+    MeasurementRollup.Resolution.HOUR.value: 60 * 60,
+    MeasurementRollup.Resolution.DAY.value: 24 * 60 * 60,
+}
+UPSERT_BATCH_SIZE = 1000
+REBUILD_CHUNK_SIZE = 50000
+_CENT = Decimal("0.01")
+
+RollupKey = tuple[uuid.UUID, str, datetime]
+
+
+def bucket_start(value: datetime, resolution: str) -> datetime:
+    seconds = RESOLUTION_SECONDS[resolution]
+    timestamp = int(value.timestamp())
+    return datetime.fromtimestamp(timestamp - timestamp % seconds, tz=timezone.utc)
+
+
+def _decimal(value) -> Decimal:
+    return Decimal(str(value)).quantize(_CENT)
+
+
+@dataclass
+class _Bucket:
+    count: int
+    out_of_range_count: int
+    temperature_min: Decimal
+    temperature_max: Decimal
+    temperature_sum: Decimal
+    humidity_min: Decimal
+    humidity_max: Decimal
+    humidity_sum: Decimal
+
+    def add(self, other: _Bucket) -> None:
+        self.count += other.count
+        self.out_of_range_count += other.out_of_range_count
+        self.temperature_min = min(self.temperature_min, other.temperature_min)
+        self.temperature_max = max(self.temperature_max, other.temperature_max)
+        self.temperature_sum += other.temperature_sum
+        self.humidity_min = min(self.humidity_min, other.humidity_min)
+        self.humidity_max = max(self.humidity_max, other.humidity_max)
+        self.humidity_sum += other.humidity_sum
+
+
+def _accumulate(
+    rows: Iterable[tuple], buckets: Optional[dict[RollupKey, _Bucket]] = None
+) -> dict[RollupKey, _Bucket]:
+    """Fold ``(sensor_id, recorded_at, temperature, humidity, status)`` rows."""
+    buckets = {} if buckets is None else buckets
+    for sensor_id, recorded_at, temperature, humidity, status in rows:
+        temperature, humidity = _decimal(temperature), _decimal(humidity)
+        reading = _Bucket(
+            count=1,
+            out_of_range_count=int(status != Measurement.Status.NORMAL),
+            temperature_min=temperature,
+            temperature_max=temperature,
+            temperature_sum=temperature,
+            humidity_min=humidity,
+            humidity_max=humidity,
+            humidity_sum=humidity,
+        )
+        for resolution in RESOLUTION_SECONDS:
+            key = (sensor_id, resolution, bucket_start(recorded_at, resolution))
+            if key in buckets:
+                buckets[key].add(reading)
+            else:
+                buckets[key] = _Bucket(**vars(reading))
+    return buckets
+
+
+_VALUE_COLUMNS = [
+    "count",
+    "out_of_range_count",
+    "temperature_min",
+    "temperature_max",
+    "temperature_sum",
+    "humidity_min",
+    "humidity_max",
+    "humidity_sum",
+]
+
+
+def _merge(name: str, table: str) -> str:
+    column = connection.ops.quote_name(name)
+    current, new = f"{table}.{column}", f"EXCLUDED.{column}"
+    if name.endswith("_min"):
+        return f"{column} = CASE WHEN {new} < {current} THEN {new} ELSE {current} END"
+    if name.endswith("_max"):
+        return f"{column} = CASE WHEN {new} > {current} THEN {new} ELSE {current} END"
+    return f"{column} = {current} + {new}"
+
+
+def _upsert(buckets: dict[RollupKey, _Bucket], *, replace: bool = False) -> None:
+    """Add ``buckets`` to the stored rollups, or overwrite them with ``replace``.
+
+    Keys are written in sorted order so concurrent batches touching the same
+    buckets lock them in the same order.
+    """
+    if not buckets:
+        return
+    meta = MeasurementRollup._meta
+    quote = connection.ops.quote_name
+    table = quote(meta.db_table)
+    fields = [
+        meta.get_field(name)
+        for name in ("sensor", "resolution", "bucket", *_VALUE_COLUMNS)
+    ]
+    columns = ", ".join(quote(field.column) for field in fields)
+    row = f"({', '.join(['%s'] * len(fields))})"
+    if replace:
+        updates = ", ".join(
+            f"{quote(name)} = EXCLUDED.{quote(name)}" for name in _VALUE_COLUMNS
+        )
+    else:
+        updates = ", ".join(_merge(name, table) for name in _VALUE_COLUMNS)
+    keys = sorted(buckets)
+    with connection.cursor() as cursor:
+        for start in range(0, len(keys), UPSERT_BATCH_SIZE):
+            batch = keys[start : start + UPSERT_BATCH_SIZE]
+            params = []
+            for key in batch:
+                bucket = buckets[key]
+                values = [*key, *(getattr(bucket, name) for name in _VALUE_COLUMNS)]
+                params.extend(
+                    field.get_db_prep_save(value, connection)
+                    for field, value in zip(fields, values)
+                )
+            cursor.execute(
+                f"INSERT INTO {table} ({columns}) "
+                f"VALUES {', '.join([row] * len(batch))} "
+                "ON CONFLICT (sensor_id, resolution, bucket) "
+                f"DO UPDATE SET {updates}",
+                params,
+            )
+
+
+def add_to_rollups(measurements: Sequence[Measurement]) -> None:
+    """Fold newly stored measurements into their rollups."""
+    _upsert(
+        _accumulate(
+            (m.sensor_id, m.recorded_at, m.temperature, m.humidity, m.status)
+            for m in measurements
+        )
+    )
+
+
+def remove_from_rollups(measurements: Sequence[Measurement]) -> None:
+    """Take deleted or changed measurements out of their rollups.
+
+    Call it once the rows are deleted or saved with their new values; the
+    previous values are passed in ``measurements``. Counts and sums are
+    decremented in place. A bucket whose minimum or maximum may have been one
+    of these readings gets them recomputed from its stored readings (all of
+    them are still there: pruning drops whole months), and a bucket left
+    empty is deleted. Only the touched rollup rows are locked.
+    """
+    buckets = _accumulate(
+        (m.sensor_id, m.recorded_at, m.temperature, m.humidity, m.status)
+        for m in measurements
+    )
+    for key in sorted(buckets):
+        sensor_id, resolution, start = key
+        removed = buckets[key]
+        rollups = MeasurementRollup.objects.filter(
+            sensor_id=sensor_id, resolution=resolution, bucket=start
+        )
+        if not rollups.update(
+            count=F("count") - removed.count,
+            out_of_range_count=F("out_of_range_count") - removed.out_of_range_count,
+            temperature_sum=F("temperature_sum") - removed.temperature_sum,
+            humidity_sum=F("humidity_sum") - removed.humidity_sum,
+        ):
+            continue
+        rollup = rollups.get()
+        if rollup.count <= 0:
+            rollup.delete()
+            continue
+        if (
+            removed.temperature_min <= rollup.temperature_min
+            or removed.temperature_max >= rollup.temperature_max
+            or removed.humidity_min <= rollup.humidity_min
+            or removed.humidity_max >= rollup.humidity_max
+        ):
+            end = start + timedelta(seconds=RESOLUTION_SECONDS[resolution])
+            rollups.update(
+                **Measurement.objects.filter(
+                    sensor_id=sensor_id, recorded_at__gte=start, recorded_at__lt=end
+                ).aggregate(
+                    temperature_min=Min("temperature"),
+                    temperature_max=Max("temperature"),
+                    humidity_min=Min("humidity"),
+                    humidity_max=Max("humidity"),
+                )
+            )
+
+
+def rebuild_rollups(
+    start: datetime,
+    end: datetime,
+    *,
+    sensor_ids: Optional[Sequence] = None,
+) -> int:
+    """Recompute the rollups of ``[start, end)`` from raw measurements.
+
+    The range is widened to whole days so every bucket it touches is
+    recomputed completely (``start == end`` rebuilds that day). Only buckets
+    that still have raw measurements are rewritten; the rollups of pruned
+    readings are left as they are. Returns the number of measurements read.
+
+    Instead of the whole table, the daily rollups of the sensors and days
+    being rebuilt are locked (created empty first where missing). Every ingest
+    into those days upserts them too, so it waits for the rebuild or the
+    rebuild waits for it: a reading is counted either by the rebuild or by its
+    own upsert, never twice.
+    """
+    day = MeasurementRollup.Resolution.DAY
+    last = bucket_start(max(start, end - timedelta(microseconds=1)), day)
+    start, end = bucket_start(start, day), last + timedelta(days=1)
+    measurements = Measurement.objects.filter(
+        recorded_at__gte=start, recorded_at__lt=end
+    )
+    if sensor_ids is not None:
+        measurements = measurements.filter(sensor_id__in=sensor_ids)
+
+    read = 0
+    with transaction.atomic():
+        sensors = sorted(
+            set(measurements.order_by().values_list("sensor_id", flat=True).distinct())
+        )
+        if not sensors:
+            return 0
+        days = [start + timedelta(days=index) for index in range((end - start).days)]
+        _lock_days(sensors, days)
+
+        written: set[RollupKey] = set()
+
+        def flush(buckets: dict[RollupKey, _Bucket]) -> None:
+            # A bucket is overwritten the first time and added to after that.
+            _upsert(
+                {key: bucket for key, bucket in buckets.items() if key not in written},
+                replace=True,
+            )
+            _upsert({key: bucket for key, bucket in buckets.items() if key in written})
+            written.update(buckets)
+
+        buckets: dict[RollupKey, _Bucket] = {}
+        rows = measurements.order_by().values_list(
+            "sensor_id", "recorded_at", "temperature", "humidity", "status"
+        )
+        for row in rows.iterator(chunk_size=5000):
+            _accumulate([row], buckets)
+            read += 1
+            if read % REBUILD_CHUNK_SIZE == 0:
+                flush(buckets)
+                buckets = {}
+        flush(buckets)
+        MeasurementRollup.objects.filter(
+            sensor_id__in=sensors, resolution=day, bucket__in=days, count=0
+        ).delete()
+    return read
+
+
+def _lock_days(sensors: Sequence[uuid.UUID], days: Sequence[datetime]) -> None:
+    """Lock the daily rollups of ``sensors`` on ``days``, creating empty ones."""
+    day = MeasurementRollup.Resolution.DAY
+    zero = Decimal(0)
+    MeasurementRollup.objects.bulk_create(
+        [
+            MeasurementRollup(
+                sensor_id=sensor_id,
+                resolution=day,
+                bucket=bucket,
+                count=0,
+                out_of_range_count=0,
+                temperature_min=zero,
+                temperature_max=zero,
+                temperature_sum=zero,
+                humidity_min=zero,
+                humidity_max=zero,
+                humidity_sum=zero,
+            )
+            for sensor_id in sensors
+            for bucket in days
+        ],
+        ignore_conflicts=True,
+    )
+    list(
+        MeasurementRollup.objects.select_for_update()
+        .filter(sensor_id__in=sensors, resolution=day, bucket__in=days)
+        .order_by("sensor_id", "bucket")
+        .values_list("id", flat=True)
+    )
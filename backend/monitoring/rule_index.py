@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import threading
+import time
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+from django.conf import settings
+from django.db.models import Prefetch
+
+from .models import AlertRule, Channel
+
+
+@dataclass(frozen=True, slots=True)
+class ChannelSnapshot:
+    id: int
+    name: str
+    channel_type: str
+    target: str
+
+    @classmethod
+    def from_channel(cls, channel: Channel) -> "ChannelSnapshot":
+        return cls(
+            id=channel.id,
+            name=channel.name,
+            channel_type=channel.channel_type,
+            target=channel.target,
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class CompiledRule:
+    id: uuid.UUID
+    name: str
+    sensor_id: Optional[uuid.UUID]
+    min_temp: float
+    max_temp: float
+    window_minutes: int
+    channels: tuple[ChannelSnapshot, ...]
+
+    @classmethod
+    def from_rule(cls, rule: AlertRule) -> "CompiledRule":
+        return cls(
+            id=rule.id,
+            name=rule.name,
+            sensor_id=rule.sensor_id,
+            min_temp=float(rule.min_temp),
+            max_temp=float(rule.max_temp),
+            window_minutes=rule.window_minutes,
+            channels=tuple(
+                ChannelSnapshot.from_channel(channel) for channel in rule.channels.all()
+            ),
+        )
+
+    def triggers(self, temperature: float) -> bool:
+        return temperature < self.min_temp or temperature > self.max_temp
+
+
+def _active_rules():
+    return AlertRule.objects.filter(is_active=True).prefetch_related(
+        Prefetch("channels", queryset=Channel.objects.order_by("id"))
+    )
+
+
+class RuleIndex:
+    """In-memory index of active alert rules, keyed by sensor id.
+
+    The index is built lazily with two queries (rules with their channels, and
+    the default channel list) and then kept current by ``AlertRule`` and
+    ``Channel`` signals, which reload only the rules they touch. A full
+    rebuild still happens every ``ttl`` seconds so that changes made by other
+    worker processes are eventually picked up.
+    """
+
+    def __init__(self, ttl: float) -> None:
+        self.ttl = ttl
+        self._lock = threading.RLock()
+        self._rules: dict[uuid.UUID, CompiledRule] = {}
+        self._global: tuple[CompiledRule, ...] = ()
+        self._by_sensor: dict[uuid.UUID, tuple[CompiledRule, ...]] = {}
+        self._default_channels: tuple[ChannelSnapshot, ...] = ()
+        self._expires_at = 0.0
+        self.builds = 0
+
+    def _ensure_loaded(self) -> None:
+        if self._expires_at > time.monotonic():
+            return
+        with self._lock:
+            if self._expires_at > time.monotonic():
+                return
+            self._rules = {rule.id: CompiledRule.from_rule(rule) for rule in _active_rules()}
+            self._default_channels = tuple(
+                ChannelSnapshot.from_channel(channel)
+                for channel in Channel.objects.order_by("id")
+            )
+            self._regroup()
+            self._expires_at = time.monotonic() + self.ttl
+            self.builds += 1
+
+    def _regroup(self) -> None:
+        by_sensor: dict[uuid.UUID, list[CompiledRule]] = defaultdict(list)
+        global_rules: list[CompiledRule] = []
+        for rule in sorted(self._rules.values(), key=lambda item: item.name):
+            if rule.sensor_id is None:
+                global_rules.append(rule)
+            else:
+                by_sensor[rule.sensor_id].append(rule)
+        self._global = tuple(global_rules)
+        self._by_sensor = {
+            sensor_id: self._global + tuple(rules) for sensor_id, rules in by_sensor.items()
+        }
+
+    def rules_for(self, sensor_id: uuid.UUID) -> tuple[CompiledRule, ...]:
+        self._ensure_loaded()
+        return self._by_sensor.get(sensor_id, self._global)
+
+    def default_channels(self) -> tuple[ChannelSnapshot, ...]:
+        self._ensure_loaded()
+        return self._default_channels
+
+    def refresh_rules(self, rule_ids: Iterable[uuid.UUID]) -> None:
+        rule_ids = set(rule_ids)
+        if not rule_ids:
+            return
+        with self._lock:
+            if self._expires_at <= time.monotonic():
+                return
+            for rule_id in rule_ids:
+                self._rules.pop(rule_id, None)
+            for rule in _active_rules().filter(id__in=rule_ids):
+                self._rules[rule.id] = CompiledRule.from_rule(rule)
+            self._regroup()
+
+    def remove_rule(self, rule_id: uuid.UUID) -> None:
+        with self._lock:
+            if self._rules.pop(rule_id, None) is not None:
+                self._regroup()
+
+    def refresh_channel(self, channel_id: int) -> None:
+        with self._lock:
+            if self._expires_at <= time.monotonic():
+                return
+            self._default_channels = tuple(
+                ChannelSnapshot.from_channel(channel)
+                for channel in Channel.objects.order_by("id")
+            )
+            self.refresh_rules(
+                rule.id
+                for rule in self._rules.values()
+                if any(channel.id == channel_id for channel in rule.channels)
+            )
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._expires_at = 0.0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "rules": len(self._rules),
+                "sensors": len(self._by_sensor),
+                "global_rules": len(self._global),
+                "builds": self.builds,
+                "ttl_seconds": self.ttl,
+            }
+
+
+rule_index = RuleIndex(ttl=settings.RULE_INDEX_TTL_SECONDS)
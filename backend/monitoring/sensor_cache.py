@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+from django.conf import settings
+
+from .models import Sensor
+
+
+@dataclass(frozen=True, slots=True)
+class SensorSnapshot:
+    id: uuid.UUID
+    token: str
+    name: str
+    location: str
+    threshold_min: float
+    threshold_max: float
+    is_active: bool
+
+    @classmethod
+    def from_sensor(cls, sensor: Sensor) -> "SensorSnapshot":
+        return cls(
+            id=sensor.id,
+            token=sensor.token,
+            name=sensor.name,
+            location=sensor.location,
+            threshold_min=float(sensor.threshold_min),
+            threshold_max=float(sensor.threshold_max),
+            is_active=sensor.is_active,
+        )
+
+
+_SNAPSHOT_FIELDS = (
+    "id",
+    "token",
+    "name",
+    "location",
+    "threshold_min",
+    "threshold_max",
+    "is_active",
+)
+
+
+class SensorTokenCache:
+    """Bounded LRU mapping sensor tokens to :class:`SensorSnapshot` objects.
+
+    Unknown tokens are cached as well (as ``None``) so that a misconfigured
+    device cannot force a database lookup on every request. Entries expire
+    after ``ttl`` seconds, which bounds staleness across worker processes;
+    within a process, ``Sensor`` signals invalidate entries immediately.
+    """
+
+    def __init__(self, max_size: int, ttl: float) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, Optional[SensorSnapshot]]] = (
+            OrderedDict()
+        )
+        self._tokens_by_id: dict[uuid.UUID, str] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, token: str) -> Optional[SensorSnapshot]:
+        return self.get_many([token]).get(token)
+
+    def get_many(self, tokens: Iterable[str]) -> dict[str, Optional[SensorSnapshot]]:
+        found, missing = self._lookup(tokens)
+        if missing:
+            rows = Sensor.objects.filter(token__in=missing).values(*_SNAPSHOT_FIELDS)
+            found.update(self._remember(missing, rows))
+        return found
+
+    async def aget(self, token: str) -> Optional[SensorSnapshot]:
+        found, missing = self._lookup([token])
+        if missing:
+            row = await (
+                Sensor.objects.filter(token=token).values(*_SNAPSHOT_FIELDS).afirst()
+            )
+            found.update(self._remember(missing, [row] if row else []))
+        return found[token]
+
+    def _lookup(
+        self, tokens: Iterable[str]
+    ) -> tuple[dict[str, Optional[SensorSnapshot]], set[str]]:
+        found: dict[str, Optional[SensorSnapshot]] = {}
+        missing: set[str] = set()
+        now = time.monotonic()
+        with self._lock:
+            for token in tokens:
+                if token in found or token in missing:
+                    continue
+                entry = self._entries.get(token)
+                if entry is not None and entry[0] > now:
+                    self._entries.move_to_end(token)
+                    found[token] = entry[1]
+                    self.hits += 1
+                else:
+                    missing.add(token)
+                    self.misses += 1
+        return found, missing
+
+    def _remember(
+        self, missing: set[str], rows: Iterable[dict]
+    ) -> dict[str, Optional[SensorSnapshot]]:
+        loaded = {
+            row["token"]: SensorSnapshot(
+                id=row["id"],
+                token=row["token"],
+                name=row["name"],
+                location=row["location"],
+                threshold_min=float(row["threshold_min"]),
+                threshold_max=float(row["threshold_max"]),
+                is_active=row["is_active"],
+            )
+            for row in rows
+        }
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            for token in missing:
+                self._store(token, loaded.get(token), expires_at)
+        return {token: loaded.get(token) for token in missing}
+
+    def _store(
+        self, token: str, snapshot: Optional[SensorSnapshot], expires_at: float
+    ) -> None:
+        self._entries[token] = (expires_at, snapshot)
+        self._entries.move_to_end(token)
+        if snapshot is not None:
+            self._tokens_by_id[snapshot.id] = token
+        while len(self._entries) > self.max_size:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            if evicted is not None:
+                self._tokens_by_id.pop(evicted.id, None)
+
+    def invalidate(self, *, token: Optional[str] = None, sensor_id=None) -> None:
+        with self._lock:
+            tokens = {token} if token else set()
+            previous = self._tokens_by_id.pop(sensor_id, None)
+            if previous:
+                tokens.add(previous)
+            for item in tokens:
+                self._entries.pop(item, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._tokens_by_id.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            }
+
+
+sensor_cache = SensorTokenCache(
+    max_size=settings.SENSOR_CACHE_MAX_SIZE,
+    ttl=settings.SENSOR_CACHE_TTL_SECONDS,
+)
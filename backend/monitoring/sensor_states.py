@@ -0,0 +1,148 @@
+"""Latest reading and running counters per sensor (:class:`SensorState`).
+
+Stored readings are folded into the state of their sensor with one upsert per
+batch. The last reading only moves forward in ``recorded_at``, so a late
+reading bumps the counters without replacing a newer last reading.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Optional, Sequence
+
+from django.db import connection, transaction
+from django.db.models import Sum
+
+from .models import Measurement, MeasurementRollup, Sensor, SensorState
+
+_LAST_COLUMNS = ["last_temperature", "last_humidity", "last_status", "last_recorded_at"]
+
+
+def _fold(measurements: Sequence[Measurement]) -> list[SensorState]:
+    states: dict = {}
+    for measurement in measurements:
+        out_of_range = measurement.status != Measurement.Status.NORMAL
+        state = states.get(measurement.sensor_id)
+        if state is None:
+            state = states[measurement.sensor_id] = SensorState(
+                sensor_id=measurement.sensor_id,
+                last_recorded_at=measurement.recorded_at,
+                reading_count=0,
+                out_of_range_count=0,
+            )
+        if measurement.recorded_at >= state.last_recorded_at:
+            state.last_recorded_at = measurement.recorded_at
+            state.last_temperature = measurement.temperature
+            state.last_humidity = measurement.humidity
+            state.last_status = measurement.status
+        if out_of_range and (
+            state.last_out_of_range_at is None
+            or measurement.recorded_at > state.last_out_of_range_at
+        ):
+            state.last_out_of_range_at = measurement.recorded_at
+        state.reading_count += 1
+        state.out_of_range_count += int(out_of_range)
+    return [states[sensor_id] for sensor_id in sorted(states)]
+
+
+def _merge(name: str, table: str) -> str:
+    column = connection.ops.quote_name(name)
+    current, new = f"{table}.{column}", f"EXCLUDED.{column}"
+    if name in _LAST_COLUMNS:
+        newer = f"EXCLUDED.last_recorded_at >= {table}.last_recorded_at"
+        return f"{column} = CASE WHEN {newer} THEN {new} ELSE {current} END"
+    if name == "last_out_of_range_at":
+        newer = f"{current} IS NULL OR {new} > {current}"
+        return f"{column} = CASE WHEN {newer} THEN {new} ELSE {current} END"
+    if name.endswith("_count"):
+        return f"{column} = {current} + {new}"
+    return f"{column} = {new}"
+
+
+def update_sensor_states(measurements: Sequence[Measurement]) -> None:
+    """Fold newly stored measurements into the state of their sensors.
+
+    Sensors are upserted in id order so concurrent batches lock their rows in
+    the same order.
+    """
+    states = _fold(measurements)
+    if not states:
+        return
+    meta = SensorState._meta
+    quote = connection.ops.quote_name
+    table = quote(meta.db_table)
+    fields = meta.concrete_fields
+    columns = ", ".join(quote(field.column) for field in fields)
+    row = f"({', '.join(['%s'] * len(fields))})"
+    updates = ", ".join(
+        _merge(field.column, table) for field in fields if not field.primary_key
+    )
+    params = [
+        field.get_db_prep_save(field.pre_save(state, True), connection)
+        for state in states
+        for field in fields
+    ]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} ({columns}) "
+            f"VALUES {', '.join([row] * len(states))} "
+            f"ON CONFLICT ({quote(meta.pk.column)}) DO UPDATE SET {updates}",
+            params,
+        )
+
+
+def rebuild_sensor_states(sensor_ids: Optional[Sequence] = None) -> int:
+    """Recompute sensor states from stored measurements and daily rollups.
+
+    Counters come from the rollups, so they still include pruned readings.
+    Returns the number of states written.
+    """
+    sensors = Sensor.objects.all()
+    if sensor_ids is not None:
+        sensors = sensors.filter(pk__in=sensor_ids)
+    with transaction.atomic():
+        if connection.vendor == "postgresql":
+            # Ingest upserts wait until the rebuild commits, as for rollups.
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "LOCK TABLE %s IN SHARE ROW EXCLUSIVE MODE"
+                    % connection.ops.quote_name(SensorState._meta.db_table)
+                )
+        ids = list(sensors.values_list("pk", flat=True))
+        counts = {
+            row["sensor_id"]: row
+            for row in MeasurementRollup.objects.filter(
+                sensor_id__in=ids, resolution=MeasurementRollup.Resolution.DAY
+            )
+            .values("sensor_id")
+            .annotate(readings=Sum("count"), out_of_range=Sum("out_of_range_count"))
+        }
+        states = []
+        for sensor_id in ids:
+            readings = Measurement.objects.filter(sensor_id=sensor_id).order_by(
+                "-recorded_at"
+            )
+            last = readings.first()
+            if last is None:
+                continue
+            last_out_of_range_at: Optional[datetime] = (
+                readings.exclude(status=Measurement.Status.NORMAL)
+                .values_list("recorded_at", flat=True)
+                .first()
+            )
+            count = counts.get(sensor_id, {})
+            states.append(
+                SensorState(
+                    sensor_id=sensor_id,
+                    last_recorded_at=last.recorded_at,
+                    last_temperature=last.temperature,
+                    last_humidity=last.humidity,
+                    last_status=last.status,
+                    last_out_of_range_at=last_out_of_range_at,
+                    reading_count=count.get("readings") or 0,
+                    out_of_range_count=count.get("out_of_range") or 0,
+                )
+            )
+        SensorState.objects.filter(sensor_id__in=ids).delete()
+        SensorState.objects.bulk_create(states)
+    return len(states)
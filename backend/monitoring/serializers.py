@@ -1,10 +1,43 @@
+import math
+from datetime import timedelta
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 from rest_framework import serializers
 
 from . import models
+from .fastpath import MAX_READING_VALUE, MAX_SEQUENCE
+from .fieldsets import SparseFieldsMixin
+
+
+class UserSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = get_user_model()
+        fields = ["id", "username", "first_name", "last_name", "role"]
 
 
-class UserSerializer(serializers.ModelSerializer):
+class SensorSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = models.Sensor
+        fields = [
+            "id",
+            "name",
+            "serial_number",
+            "location",
+            "threshold_min",
+            "threshold_max",
+            "is_active",
+        ]
+
+
+class MeasurementSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = models.Measurement
+        fields = ["id", "sensor", "temperature", "humidity", "recorded_at", "status"]
+
+
+class UserSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, required=False)
 
     class Meta:
@@ -40,65 +73,165 @@ class UserSerializer(serializers.ModelSerializer):
         return user
 
 
-class SensorSerializer(serializers.ModelSerializer):
+class SensorSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = models.Sensor
         fields = "__all__"
         read_only_fields = ["id", "created_at", "updated_at", "created_by"]
 
 
-class MeasurementSerializer(serializers.ModelSerializer):
+class SensorStateSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = models.SensorState
+        exclude = ["sensor"]
+
+
+class SensorStateListSerializer(serializers.ModelSerializer):
+    state = SensorStateSerializer(read_only=True, allow_null=True)
+
+    class Meta:
+        model = models.Sensor
+        fields = [
+            "id",
+            "name",
+            "location",
+            "is_active",
+            "threshold_min",
+            "threshold_max",
+            "state",
+        ]
+
+
+class MeasurementSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     sensor = serializers.PrimaryKeyRelatedField(queryset=models.Sensor.objects.all())
+    sequence = serializers.IntegerField(
+        required=False, allow_null=True, min_value=0, max_value=MAX_SEQUENCE
+    )
 
     class Meta:
         model = models.Measurement
         fields = "__all__"
         read_only_fields = ["id", "received_at", "status"]
+        expandable_fields = {"sensor": SensorSummarySerializer}
+
+    def get_validators(self):
+        # Creates go through store_measurement, whose ON CONFLICT insert
+        # reports duplicates; the unique-together validators would also make
+        # ``sequence`` required.
+        if self.instance is None:
+            return []
+        return super().get_validators()
+
+
+class MeasurementSeriesQuerySerializer(serializers.Serializer):
+    sensor = serializers.PrimaryKeyRelatedField(queryset=models.Sensor.objects.all())
+    to = serializers.DateTimeField(required=False)
+    points = serializers.IntegerField(
+        required=False,
+        min_value=2,
+        max_value=settings.SERIES_MAX_POINTS,
+        default=settings.SERIES_DEFAULT_POINTS,
+    )
+    mode = serializers.ChoiceField(choices=["aggregate", "lttb"], default="aggregate")
+
+    def get_fields(self):
+        # "from" is a Python keyword, so it cannot be declared as an attribute.
+        fields = super().get_fields()
+        fields["from"] = serializers.DateTimeField(required=False)
+        return fields
+
+    def validate(self, attrs):
+        end = attrs.get("to") or timezone.now()
+        start = attrs.get("from") or end - timedelta(days=1)
+        if start >= end:
+            raise serializers.ValidationError({"from": "Must be before 'to'."})
+        return {**attrs, "from": start, "to": end}
+
+
+class ReadingValueField(serializers.FloatField):
+    """A float the Decimal(5, 2) reading columns can hold.
+
+    ``float()`` accepts "nan" and "inf", which every range check lets through.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault("min_value", -MAX_READING_VALUE)
+        kwargs.setdefault("max_value", MAX_READING_VALUE)
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        value = super().to_internal_value(data)
+        if not math.isfinite(value):
+            self.fail("invalid")
+        return value
 
 
 class MeasurementIngestSerializer(serializers.Serializer):
     sensor_token = serializers.CharField()
-    temperature = serializers.FloatField()
-    humidity = serializers.FloatField()
+    temperature = ReadingValueField()
+    humidity = ReadingValueField()
     recorded_at = serializers.DateTimeField(required=False)
+    sequence = serializers.IntegerField(
+        required=False, min_value=0, max_value=MAX_SEQUENCE
+    )
 
 
-class AlertRuleSerializer(serializers.ModelSerializer):
+class MeasurementBatchIngestSerializer(serializers.Serializer):
+    readings = serializers.ListField(
+        child=serializers.DictField(),
+        allow_empty=False,
+        max_length=settings.INGEST_BATCH_MAX_SIZE,
+    )
+
+
+class AlertRuleSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = models.AlertRule
         fields = "__all__"
         read_only_fields = ["id", "created_at", "updated_at", "created_by"]
+        expandable_fields = {"sensor": SensorSummarySerializer}
 
 
-class AlertSerializer(serializers.ModelSerializer):
-    sensor = SensorSerializer(read_only=True)
-    measurement = MeasurementSerializer(read_only=True)
-
+class AlertSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = models.Alert
         fields = "__all__"
         read_only_fields = [
             "id",
+            "sensor",
+            "measurement",
+            "occurrences",
+            "peak_temperature",
+            "last_seen_at",
+            "last_measurement",
             "created_at",
             "acknowledged_at",
             "resolved_at",
             "acknowledged_by",
             "resolved_by",
         ]
+        expandable_fields = {
+            "sensor": SensorSummarySerializer,
+            "measurement": MeasurementSummarySerializer,
+            "last_measurement": MeasurementSummarySerializer,
+        }
 
 
-class TicketSerializer(serializers.ModelSerializer):
+class TicketSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = models.Ticket
         fields = "__all__"
         read_only_fields = ["id", "created_at", "updated_at", "closed_at"]
+        expandable_fields = {
+            "opened_by": UserSummarySerializer,
+            "assigned_to": UserSummarySerializer,
+        }
 
 
-class AuditLogSerializer(serializers.ModelSerializer):
-    actor = UserSerializer(read_only=True)
-
+class AuditLogSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = models.AuditLog
         fields = "__all__"
-        read_only_fields = ["id", "created_at"]
+        read_only_fields = ["id", "actor", "created_at"]
+        expandable_fields = {"actor": UserSummarySerializer}
 
@@ -0,0 +1,206 @@
+"""Chart series of one sensor, capped at a number of points.
+
+Short ranges return the raw readings. Longer ones are either aggregated from
+:class:`MeasurementRollup` buckets, re-binned so there are at most ``points``
+of them, or downsampled from raw readings with Largest-Triangle-Three-Buckets,
+which keeps the visual shape (peaks included) of the original line. Series
+are columnar: one array per value, timestamps in epoch milliseconds.
+"""
+
+from __future__ import annotations
+
+import math
+from datetime import datetime, timezone
+
+import numpy as np
+from django.conf import settings
+
+from .models import Measurement, MeasurementRollup
+from .rollups import RESOLUTION_SECONDS
+
+AGGREGATE = "aggregate"
+LTTB = "lttb"
+RAW = "raw"
+
+
+def lttb(x: np.ndarray, y: np.ndarray, points: int) -> np.ndarray:
+    """Indices of the ``points`` samples LTTB keeps out of ``(x, y)``.
+
+    The first and last samples are always kept (only the first one with
+    ``points == 1``). The others are split into
+    ``points - 2`` buckets; each bucket keeps the sample forming the largest
+    triangle with the previously kept one and the average of the next bucket.
+    """
+    size = len(x)
+    if points >= size:
+        return np.arange(size)
+    if points < 3:
+        return np.array([0, size - 1][: max(points, 1)], dtype=np.int64)
+    edges = np.linspace(1, size - 1, points - 1).astype(np.int64)
+    # Averages of every bucket, then of the last sample standing for the
+    # bucket after the final one.
+    sums_x = np.add.reduceat(x[1 : size - 1], edges[:-1] - 1)
+    sums_y = np.add.reduceat(y[1 : size - 1], edges[:-1] - 1)
+    lengths = np.diff(edges)
+    next_x = np.append((sums_x / lengths)[1:], x[-1])
+    next_y = np.append((sums_y / lengths)[1:], y[-1])
+
+    selected = np.empty(points, dtype=np.int64)
+    selected[0], selected[-1] = 0, size - 1
+    previous = 0
+    for bucket in range(points - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        px, py = x[previous], y[previous]
+        areas = np.abs(
+            (px - next_x[bucket]) * (y[start:end] - py)
+            - (px - x[start:end]) * (next_y[bucket] - py)
+        )
+        previous = start + int(areas.argmax())
+        selected[bucket + 1] = previous
+    return selected
+
+
+def _raw_rows(sensor_id, start: datetime, end: datetime):
+    return (
+        Measurement.objects.filter(
+            sensor_id=sensor_id, recorded_at__gte=start, recorded_at__lt=end
+        )
+        .order_by("recorded_at")
+        .values_list("recorded_at", "temperature", "humidity")
+    )
+
+
+def _columns(rows) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    timestamps = np.fromiter(
+        (int(recorded_at.timestamp() * 1000) for recorded_at, _, _ in rows),
+        dtype=np.int64,
+        count=len(rows),
+    )
+    values = np.array(
+        [(temperature, humidity) for _, temperature, humidity in rows],
+        dtype=np.float64,
+    ).reshape(-1, 2)
+    return timestamps, values[:, 0], values[:, 1]
+
+
+def _readings(mode: str, timestamps, temperatures, humidities) -> dict:
+    return {
+        "mode": mode,
+        "resolution": None,
+        "bucket_seconds": None,
+        "timestamps": timestamps.tolist(),
+        "temperature": temperatures.tolist(),
+        "humidity": humidities.tolist(),
+    }
+
+
+def aggregate(sensor_id, start: datetime, end: datetime, points: int) -> dict:
+    """At most ``points`` buckets built from the rollups of ``[start, end)``."""
+    span = max(1.0, (end - start).total_seconds())
+    # The coarsest resolution with at least ``points`` buckets in the range,
+    # merged below into wider bins; the finest one for shorter ranges.
+    resolution = next(
+        (
+            name
+            for name, seconds in reversed(RESOLUTION_SECONDS.items())
+            if span / seconds >= points
+        ),
+        MeasurementRollup.Resolution.FIVE_MINUTES.value,
+    )
+    seconds = RESOLUTION_SECONDS[resolution]
+    first, last = int(start.timestamp()), math.ceil(end.timestamp())
+    multiple = math.ceil(span / (seconds * points))
+    while True:
+        width = seconds * multiple
+        origin = first // width * width
+        if math.ceil((last - origin) / width) <= points:
+            break
+        multiple += 1
+
+    rows = list(
+        MeasurementRollup.objects.filter(
+            sensor_id=sensor_id,
+            resolution=resolution,
+            bucket__gte=datetime.fromtimestamp(
+                first // seconds * seconds, tz=timezone.utc
+            ),
+            bucket__lt=end,
+        )
+        .order_by("bucket")
+        .values_list(
+            "bucket",
+            "count",
+            "out_of_range_count",
+            "temperature_min",
+            "temperature_max",
+            "temperature_sum",
+            "humidity_min",
+            "humidity_max",
+            "humidity_sum",
+        )
+    )
+    result = {"mode": AGGREGATE, "resolution": resolution, "bucket_seconds": width}
+    names = [
+        "count",
+        "out_of_range_count",
+        "temperature_min",
+        "temperature_max",
+        "temperature_avg",
+        "humidity_min",
+        "humidity_max",
+        "humidity_avg",
+    ]
+    if not rows:
+        return {**result, "timestamps": [], **{name: [] for name in names}}
+
+    buckets = np.fromiter(
+        (int(row[0].timestamp()) for row in rows), dtype=np.int64, count=len(rows)
+    )
+    values = np.array([row[1:] for row in rows], dtype=np.float64)
+    bins = (buckets - origin) // width
+    starts = np.flatnonzero(np.diff(bins, prepend=bins[0] - 1))
+    count = np.add.reduceat(values[:, 0], starts)
+    columns = {
+        "count": count,
+        "out_of_range_count": np.add.reduceat(values[:, 1], starts),
+        "temperature_min": np.minimum.reduceat(values[:, 2], starts),
+        "temperature_max": np.maximum.reduceat(values[:, 3], starts),
+        "temperature_avg": np.add.reduceat(values[:, 4], starts) / count,
+        "humidity_min": np.minimum.reduceat(values[:, 5], starts),
+        "humidity_max": np.maximum.reduceat(values[:, 6], starts),
+        "humidity_avg": np.add.reduceat(values[:, 7], starts) / count,
+    }
+    result["timestamps"] = ((origin + bins[starts] * width) * 1000).tolist()
+    for name in names:
+        column = columns[name]
+        result[name] = (
+            column.astype(np.int64).tolist()
+            if name.endswith("count")
+            else np.round(column, 2).tolist()
+        )
+    return result
+
+
+def build_series(
+    sensor_id, start: datetime, end: datetime, *, points: int, mode: str
+) -> dict:
+    """Series of ``[start, end)`` for one sensor with at most ``points`` points.
+
+    ``mode`` is ``aggregate`` or ``lttb``; it only applies when the range has
+    more readings than ``points``, otherwise the raw readings are returned.
+    LTTB falls back to ``aggregate`` beyond ``SERIES_LTTB_MAX_ROWS`` readings.
+    """
+    sample = list(_raw_rows(sensor_id, start, end)[: points + 1])
+    if len(sample) <= points:
+        return _readings(RAW, *_columns(sample))
+    if mode == LTTB:
+        rows = list(
+            _raw_rows(sensor_id, start, end)[: settings.SERIES_LTTB_MAX_ROWS + 1]
+        )
+        if len(rows) <= settings.SERIES_LTTB_MAX_ROWS:
+            timestamps, temperatures, humidities = _columns(rows)
+            keep = lttb(timestamps.astype(np.float64), temperatures, points)
+            return _readings(
+                LTTB, timestamps[keep], temperatures[keep], humidities[keep]
+            )
+    return aggregate(sensor_id, start, end, points)
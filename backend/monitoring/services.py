@@ -1,89 +1,87 @@
 from __future__ import annotations
 
+import logging
+import uuid
+from collections import Counter
 from dataclasses import dataclass
-from typing import Iterable, Optional
+from datetime import datetime, timedelta
+from typing import Any, Iterable, Optional, Sequence
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db import transaction
+from django.db import connections, router, transaction
 from django.db.models import Q
 from django.utils import timezone
- 
 
-from .models import Alert, AlertRule, AuditLog, Measurement, Sensor, Ticket, Channel
-from .notifications import (
-    send_email_notification,
-    send_telegram_notification,
-    send_whatsapp_notification,
-)
 
+from .audit import build_audit_entry, write_audit_entries
+from .dashboard import invalidate_summary
+from .excursions import excursion_tracker
+from .models import Alert, AuditLog, Measurement, NotificationOutbox, Sensor, Ticket
+from .response_cache import response_cache
+from .rollups import add_to_rollups
+from .rule_index import ChannelSnapshot, CompiledRule, rule_index
+from .sensor_cache import SensorSnapshot, sensor_cache
+from .sensor_states import update_sensor_states
+
+logger = logging.getLogger(__name__)
 
 @dataclass
 class MeasurementResult:
     measurement: Measurement
     alerts: list[Alert]
+    duplicate: bool = False
 
 
-def record_audit(
-    *, action: str, actor=None, target=None, payload: Optional[dict] = None
-) -> AuditLog:
-    target_model = target.__class__.__name__ if target else ""
-    target_id = str(getattr(target, "id", "")) if target else ""
-    return AuditLog.objects.create(
-        action=action,
-        actor=actor,
-        target_model=target_model,
-        target_id=target_id,
-        payload=payload or {},
-    )
+@dataclass
+class IngestReading:
+    sensor: Sensor | SensorSnapshot
+    temperature: float
+    humidity: float
+    recorded_at: Optional[datetime] = None
+    raw_payload: Optional[dict] = None
+    sequence: Optional[int] = None
 
 
-def _determine_status(sensor: Sensor, temperature: float) -> str:
+def _determine_status(sensor: SensorSnapshot, temperature: float) -> str:
     if sensor.threshold_min <= temperature <= sensor.threshold_max:
         return Measurement.Status.NORMAL
     delta = min(
-        abs(float(temperature) - float(sensor.threshold_min)),
-        abs(float(temperature) - float(sensor.threshold_max)),
+        abs(temperature - sensor.threshold_min),
+        abs(temperature - sensor.threshold_max),
     )
     if delta <= 1.5:
         return Measurement.Status.WARNING
     return Measurement.Status.CRITICAL
 
 
-def _matching_rules(sensor: Sensor) -> Iterable[AlertRule]:
-    return AlertRule.objects.filter(is_active=True).filter(
-        Q(sensor__isnull=True) | Q(sensor=sensor)
-    )
-
-
-def _should_trigger(rule: AlertRule, temperature: float) -> bool:
-    return temperature < float(rule.min_temp) or temperature > float(rule.max_temp)
-
-
-def _notify_channels(alert: Alert, channels) -> None:
-    subject = f"[Cold Chain] {alert.severity.upper()} - {alert.sensor.name}"
+def _build_notifications(
+    alert: Alert, sensor: SensorSnapshot, channels: Iterable[ChannelSnapshot]
+) -> list[NotificationOutbox]:
+    subject = f"[Cold Chain] {alert.severity.upper()} - {sensor.name}"
     body = (
-        f"Sensor: {alert.sensor.name}\n"
-        f"Location: {alert.sensor.location}\n"
+        f"Sensor: {sensor.name}\n"
+        f"Location: {sensor.location}\n"
         f"Temperature: {alert.measurement.temperature} °C\n"
         f"Recorded at: {alert.measurement.recorded_at:%Y-%m-%d %H:%M:%S}\n"
         f"Message: {alert.message}"
     )
+    return [
+        NotificationOutbox(
+            alert=alert,
+            channel_id=channel.id,
+            channel_type=channel.channel_type,
+            target=channel.target,
+            subject=subject,
+            body=body,
+        )
+        for channel in channels
+    ]
 
-    for channel in channels:
-        if channel.channel_type == "email":
-            send_email_notification(
-                subject=subject,
-                body=body,
-                recipients=[channel.target],
-            )
-
-        elif channel.channel_type == "telegram":
-            send_telegram_notification(body)
-
-        elif channel.channel_type == "whatsapp":
-            send_whatsapp_notification(body)
 
-def _create_alert(*, measurement: Measurement, rule: Optional[AlertRule]) -> Alert:
+def _build_alert(
+    *, measurement: Measurement, sensor: SensorSnapshot, rule: Optional[CompiledRule]
+) -> Alert:
     severity = (
         Alert.Severity.CRITICAL
         if measurement.status == Measurement.Status.CRITICAL
@@ -92,97 +90,495 @@ def _create_alert(*, measurement: Measurement, rule: Optional[AlertRule]) -> Ale
 
     message = (
         f"Temperature {measurement.temperature}°C outside "
-        f"{float(rule.min_temp) if rule else measurement.sensor.threshold_min}"
+        f"{rule.min_temp if rule else sensor.threshold_min}"
         f"-"
-        f"{float(rule.max_temp) if rule else measurement.sensor.threshold_max}°C"
+        f"{rule.max_temp if rule else sensor.threshold_max}°C"
     )
 
-    alert = Alert.objects.create(
-        sensor=measurement.sensor,
-        rule=rule,
+    return Alert(
+        sensor_id=sensor.id,
+        rule_id=rule.id if rule else None,
         measurement=measurement,
         severity=severity,
         message=message,
     )
 
-    if rule:
-        channels = list(rule.channels.all())
-    else:
-        channels = list(Channel.objects.all())
 
-    _notify_channels(alert, channels)
+def _build_ticket(alert: Alert, sensor: SensorSnapshot) -> Ticket:
+    return Ticket(
+        alert=alert,
+        title=f"{sensor.name} temperature incident",
+        description=alert.message,
+        opened_by=None,
+        priority=Ticket.Priority.CRITICAL
+        if alert.severity == Alert.Severity.CRITICAL
+        else Ticket.Priority.HIGH,
+    )
+
 
-    record_audit(
-        action="alert.created",
-        actor=None,
-        target=alert,
-        payload={"message": message},
+def _deviation(temperature: float, low: float, high: float) -> float:
+    if temperature < low:
+        return low - temperature
+    if temperature > high:
+        return temperature - high
+    return 0.0
+
+
+def _insert_new_measurements(measurements: Sequence[Measurement]) -> set[uuid.UUID]:
+    """Insert measurements, skipping readings that are already stored.
+
+    Uses ``INSERT ... ON CONFLICT DO NOTHING RETURNING id`` so retries and
+    replays are rejected by the unique indexes on ``(sensor, recorded_at)``
+    and ``(sensor, sequence)`` without reading the table first. Returns the
+    ids of the rows that were inserted.
+    """
+    meta = Measurement._meta
+    fields = meta.concrete_fields
+    connection = connections[router.db_for_write(Measurement)]
+    quote = connection.ops.quote_name
+    columns = ", ".join(quote(field.column) for field in fields)
+    row = f"({', '.join(['%s'] * len(fields))})"
+    batch_size = connection.ops.bulk_batch_size(fields, measurements) or len(measurements)
+
+    inserted: set[uuid.UUID] = set()
+    with connection.cursor() as cursor:
+        for start in range(0, len(measurements), batch_size):
+            batch = measurements[start : start + batch_size]
+            params = [
+                field.get_db_prep_save(field.pre_save(measurement, True), connection)
+                for measurement in batch
+                for field in fields
+            ]
+            cursor.execute(
+                f"INSERT INTO {quote(meta.db_table)} ({columns}) "
+                f"VALUES {', '.join([row] * len(batch))} "
+                f"ON CONFLICT DO NOTHING RETURNING {quote(meta.pk.column)}",
+                params,
+            )
+            inserted.update(meta.pk.to_python(value) for (value,) in cursor.fetchall())
+
+    for measurement in measurements:
+        if measurement.pk in inserted:
+            measurement._state.adding = False
+            measurement._state.db = connection.alias
+    return inserted
+
+
+def _release_reset_sequences(measurements: Sequence[Measurement]) -> bool:
+    """Free sequence numbers that a device reuses after a counter reset.
+
+    ``measurements`` were skipped as duplicates. A stored reading with the
+    same ``(sensor, sequence)`` recorded more than
+    ``INGEST_SEQUENCE_WINDOW_HOURS`` apart is not the same reading: the
+    counter restarted, so the stored reading's sequence is cleared and the
+    caller can insert the new one. Returns whether any sequence was cleared.
+    """
+    window = timedelta(hours=settings.INGEST_SEQUENCE_WINDOW_HOURS)
+    skipped = {
+        (measurement.sensor_id, measurement.sequence): measurement.recorded_at
+        for measurement in measurements
+        if measurement.sequence is not None
+    }
+    if not window or not skipped:
+        return False
+    matching = Q()
+    for sensor_id, sequence in skipped:
+        matching |= Q(sensor_id=sensor_id, sequence=sequence)
+    stale = {
+        pk: sensor_id
+        for pk, sensor_id, sequence, recorded_at in Measurement.objects.filter(
+            matching
+        ).values_list("pk", "sensor_id", "sequence", "recorded_at")
+        if abs(skipped[sensor_id, sequence] - recorded_at) > window
+    }
+    if not stale:
+        return False
+    Measurement.objects.filter(pk__in=stale).update(sequence=None)
+    logger.warning(
+        "Sequence counter reset by sensors %s, released %d stored sequences",
+        ", ".join(sorted({str(sensor_id) for sensor_id in stale.values()})),
+        len(stale),
     )
+    return True
 
-    return alert
 
+IncidentKey = tuple[uuid.UUID, Optional[uuid.UUID]]
 
+OPEN_ALERT_STATUSES = (Alert.Status.OPEN, Alert.Status.ACKNOWLEDGED)
 
-def _ensure_ticket(alert: Alert) -> Ticket:
-    ticket, created = Ticket.objects.get_or_create(
-        alert=alert,
-        defaults={
-            "title": f"{alert.sensor.name} temperature incident",
-            "description": alert.message,
-            "opened_by": None,
-            "priority": Ticket.Priority.CRITICAL
-            if alert.severity == Alert.Severity.CRITICAL
-            else Ticket.Priority.HIGH,
-        },
+
+def _lock_sensors(sensor_ids: Iterable[uuid.UUID]) -> None:
+    """Lock the sensor rows, so ingests touching a sensor run one after the other.
+
+    Rows are locked in id order, so two batches cannot deadlock on each other.
+    """
+    list(
+        Sensor.objects.select_for_update()
+        .filter(id__in=list(sensor_ids))
+        .order_by("id")
+        .values_list("id", flat=True)
     )
-    if created:
-        record_audit(
-            action="ticket.autocreated",
-            actor=None,
-            target=ticket,
-            payload={"alert": str(alert.id)},
+
+
+class _IncidentBook:
+    """Alerts raised or updated while storing one batch.
+
+    In incident mode the open alerts of the batch's sensors are loaded keyed
+    by ``(sensor, rule)``; a breach updates the open alert instead of raising
+    a new one. The caller must hold the sensor rows' locks (see
+    :func:`_lock_sensors`): locking only the open alerts would let two batches
+    both find none and each raise an incident. Without incident mode every
+    breach creates a new alert, as before.
+    """
+
+    def __init__(self, sensor_ids: Iterable[uuid.UUID], *, incident_mode: bool) -> None:
+        self.incident_mode = incident_mode
+        self.created: list[tuple[Alert, SensorSnapshot, tuple[ChannelSnapshot, ...]]] = []
+        self.updated: dict[uuid.UUID, Alert] = {}
+        self.resolved: list[Alert] = []
+        self._open: dict[IncidentKey, Alert] = {}
+        if incident_mode:
+            alerts = (
+                Alert.objects.select_for_update()
+                .filter(sensor_id__in=list(sensor_ids), status__in=OPEN_ALERT_STATUSES)
+                .order_by("created_at")
+            )
+            for alert in alerts:
+                self._open[(alert.sensor_id, alert.rule_id)] = alert
+
+    def fire(
+        self,
+        *,
+        measurement: Measurement,
+        sensor: SensorSnapshot,
+        rule: Optional[CompiledRule],
+        channels: tuple[ChannelSnapshot, ...],
+    ) -> Alert:
+        key = (sensor.id, rule.id if rule else None)
+        alert = self._open.get(key)
+        if alert is None:
+            alert = _build_alert(measurement=measurement, sensor=sensor, rule=rule)
+            alert.occurrences = 0
+            self.created.append((alert, sensor, channels))
+            if self.incident_mode:
+                self._open[key] = alert
+        elif not alert._state.adding:
+            self.updated[alert.id] = alert
+
+        low = rule.min_temp if rule else sensor.threshold_min
+        high = rule.max_temp if rule else sensor.threshold_max
+        temperature = float(measurement.temperature)
+        if alert.peak_temperature is None or _deviation(
+            temperature, low, high
+        ) > _deviation(float(alert.peak_temperature), low, high):
+            alert.peak_temperature = measurement.temperature
+        alert.occurrences += 1
+        if alert.last_seen_at is None or measurement.recorded_at >= alert.last_seen_at:
+            alert.last_seen_at = measurement.recorded_at
+            alert.last_measurement = measurement
+        if measurement.status == Measurement.Status.CRITICAL:
+            alert.severity = Alert.Severity.CRITICAL
+        return alert
+
+    def resolve(
+        self, *, measurement: Measurement, sensor_id: uuid.UUID, rule_id=None
+    ) -> None:
+        alert = self._open.get((sensor_id, rule_id))
+        if alert is None or (
+            alert.last_seen_at and measurement.recorded_at < alert.last_seen_at
+        ):
+            return
+        del self._open[(sensor_id, rule_id)]
+        alert.status = Alert.Status.RESOLVED
+        alert.resolved_at = measurement.recorded_at
+        self.resolved.append(alert)
+        if not alert._state.adding:
+            self.updated[alert.id] = alert
+
+    def save(self) -> list[Ticket]:
+        tickets: list[Ticket] = []
+        if self.created:
+            Alert.objects.bulk_create([alert for alert, _, _ in self.created])
+            tickets = Ticket.objects.bulk_create(
+                [_build_ticket(alert, sensor) for alert, sensor, _ in self.created]
+            )
+        if self.updated:
+            Alert.objects.bulk_update(
+                list(self.updated.values()),
+                [
+                    "occurrences",
+                    "peak_temperature",
+                    "last_seen_at",
+                    "last_measurement",
+                    "severity",
+                    "status",
+                    "resolved_at",
+                ],
+            )
+        return tickets
+
+
+def stamp_untimed(
+    readings: Sequence[tuple[Any, Optional[datetime]]], now: datetime
+) -> list[datetime]:
+    """``recorded_at`` of each ``(sensor key, recorded_at)`` pair.
+
+    Untimed readings of a sensor are stamped ``now`` a microsecond apart, or
+    all but one of them would be skipped as duplicates of
+    ``(sensor, recorded_at)``.
+    """
+    untimed: Counter = Counter()
+    stamped: list[datetime] = []
+    for key, recorded_at in readings:
+        if recorded_at is None:
+            recorded_at = now + timedelta(microseconds=untimed[key])
+            untimed[key] += 1
+        stamped.append(recorded_at)
+    return stamped
+
+
+def store_measurements(
+    readings: Sequence[IngestReading], *, actor=None
+) -> list[MeasurementResult]:
+    """Persist a batch of readings and evaluate alert rules over all of them.
+
+    Measurements, alerts, tickets and audit entries are each written with a
+    single ``bulk_create`` inside one transaction, so the query count does not
+    grow with the size of the batch. Rules come from the in-memory
+    :data:`rule_index`, so evaluating them costs no queries. Notifications
+    are only queued in the outbox here; ``dispatch_notifications`` delivers
+    them once the transaction has committed.
+
+    Rules with a ``window_minutes`` only fire once readings have stayed out of
+    range for that long; readings are evaluated in ``recorded_at`` order so a
+    batch behaves like the same readings posted one by one. Their window state
+    is read once the sensor rows are locked, as are the open incidents, so
+    concurrent ingests of a sensor (from any worker) see each other's changes.
+
+    With ``ALERT_INCIDENT_MODE`` enabled there is at most one open alert per
+    sensor and rule: further breaches update it in place without a new ticket
+    or notification, and it is resolved once a reading is back in range.
+
+    A reading whose ``(sensor, recorded_at)`` is already stored, or whose
+    ``(sensor, sequence)`` is stored within ``INGEST_SEQUENCE_WINDOW_HOURS``,
+    is skipped and reported with ``duplicate=True``; it raises no alert,
+    writes no audit entry and is not added to the rollups or the sensor state.
+    """
+    if not readings:
+        return []
+
+    now = timezone.now()
+    sensors = [
+        reading.sensor
+        if isinstance(reading.sensor, SensorSnapshot)
+        else SensorSnapshot.from_sensor(reading.sensor)
+        for reading in readings
+    ]
+    recorded_at = stamp_untimed(
+        [(sensor.id, reading.recorded_at) for reading, sensor in zip(readings, sensors)],
+        now,
+    )
+    measurements = [
+        Measurement(
+            sensor_id=sensor.id,
+            temperature=reading.temperature,
+            humidity=reading.humidity,
+            recorded_at=timestamp,
+            status=_determine_status(sensor, float(reading.temperature)),
+            raw_payload=reading.raw_payload or {},
+            sequence=reading.sequence,
+        )
+        for reading, sensor, timestamp in zip(readings, sensors, recorded_at)
+    ]
+    sensor_ids = {sensor.id for sensor in sensors}
+    window_keys = [
+        (sensor_id, rule.id)
+        for sensor_id in sensor_ids
+        for rule in rule_index.rules_for(sensor_id)
+        if rule.window_minutes
+    ]
+
+    with transaction.atomic():
+        if settings.ALERT_INCIDENT_MODE or window_keys:
+            _lock_sensors(sensor_ids)
+        windows = excursion_tracker.session(window_keys)
+        inserted = _insert_new_measurements(measurements)
+        skipped = [m for m in measurements if m.id not in inserted]
+        if skipped and _release_reset_sequences(skipped):
+            inserted |= _insert_new_measurements(skipped)
+        stored = [m for m in measurements if m.id in inserted]
+        add_to_rollups(stored)
+        update_sensor_states(stored)
+        if stored:
+            transaction.on_commit(invalidate_summary)
+        incidents = _IncidentBook(
+            sensor_ids, incident_mode=settings.ALERT_INCIDENT_MODE
         )
-    return ticket
+
+        results: dict[int, MeasurementResult] = {}
+        audit_entries: list[AuditLog] = []
+        for index in sorted(
+            range(len(readings)), key=lambda item: measurements[item].recorded_at
+        ):
+            reading, sensor = readings[index], sensors[index]
+            measurement = measurements[index]
+            if measurement.id not in inserted:
+                results[index] = MeasurementResult(
+                    measurement=measurement, alerts=[], duplicate=True
+                )
+                continue
+            audit_entries.append(
+                build_audit_entry(
+                    action="measurement.created",
+                    actor=actor,
+                    target=measurement,
+                    payload={
+                        "sensor": str(sensor.id),
+                        "temperature": reading.temperature,
+                    },
+                )
+            )
+
+            alerts: list[Alert] = []
+            pending_window = False
+            for rule in rule_index.rules_for(sensor.id):
+                breached = rule.triggers(float(reading.temperature))
+                fires = breached
+                if rule.window_minutes:
+                    pending_window |= breached
+                    fires = windows.observe(
+                        (sensor.id, rule.id),
+                        recorded_at=measurement.recorded_at,
+                        breached=breached,
+                        window_minutes=rule.window_minutes,
+                    )
+                if fires:
+                    alerts.append(
+                        incidents.fire(
+                            measurement=measurement,
+                            sensor=sensor,
+                            rule=rule,
+                            channels=rule.channels,
+                        )
+                    )
+                elif not breached:
+                    incidents.resolve(
+                        measurement=measurement, sensor_id=sensor.id, rule_id=rule.id
+                    )
+
+            if measurement.status == Measurement.Status.NORMAL:
+                incidents.resolve(measurement=measurement, sensor_id=sensor.id)
+            elif not alerts and not pending_window:
+                alerts.append(
+                    incidents.fire(
+                        measurement=measurement,
+                        sensor=sensor,
+                        rule=None,
+                        channels=rule_index.default_channels(),
+                    )
+                )
+
+            results[index] = MeasurementResult(measurement=measurement, alerts=alerts)
+
+        tickets = incidents.save()
+        if incidents.created or incidents.updated:
+            # Bulk writes send no signals.
+            transaction.on_commit(lambda: response_cache.bump(Alert, Ticket))
+        notifications: list[NotificationOutbox] = []
+        for (alert, sensor, channels), ticket in zip(incidents.created, tickets):
+            notifications.extend(_build_notifications(alert, sensor, channels))
+            audit_entries.append(
+                build_audit_entry(
+                    action="alert.created",
+                    actor=None,
+                    target=alert,
+                    payload={"message": alert.message},
+                )
+            )
+            audit_entries.append(
+                build_audit_entry(
+                    action="ticket.autocreated",
+                    actor=None,
+                    target=ticket,
+                    payload={"alert": str(alert.id)},
+                )
+            )
+        for alert in incidents.resolved:
+            audit_entries.append(
+                build_audit_entry(
+                    action="alert.autoresolved",
+                    actor=None,
+                    target=alert,
+                    payload={"occurrences": alert.occurrences},
+                )
+            )
+        NotificationOutbox.objects.bulk_create(notifications)
+        write_audit_entries(audit_entries)
+        windows.save()
+
+    return [results[index] for index in range(len(readings))]
 
 
 def store_measurement(
     *,
-    sensor: Sensor,
+    sensor: Sensor | SensorSnapshot,
     temperature: float,
     humidity: float,
     recorded_at,
     actor=None,
     raw_payload: Optional[dict] = None,
+    sequence: Optional[int] = None,
 ) -> MeasurementResult:
-    recorded_at = recorded_at or timezone.now()
-
-    with transaction.atomic():
-        measurement = Measurement.objects.create(
-            sensor=sensor,
-            temperature=temperature,
-            humidity=humidity,
-            recorded_at=recorded_at,
-            status=_determine_status(sensor, temperature),
-            raw_payload=raw_payload or {},
-        )
-        record_audit(
-            action="measurement.created",
-            actor=actor,
-            target=measurement,
-            payload={"sensor": str(sensor.id), "temperature": temperature},
+    reading = IngestReading(
+        sensor=sensor,
+        temperature=temperature,
+        humidity=humidity,
+        recorded_at=recorded_at,
+        raw_payload=raw_payload,
+        sequence=sequence,
+    )
+    return store_measurements([reading], actor=actor)[0]
+
+
+def store_validated_readings(
+    items: Sequence[tuple[dict, dict]], *, actor=None
+) -> list[dict]:
+    """Resolve sensor tokens and store readings that passed the ingest schema.
+
+    ``items`` are ``(values, raw_payload)`` pairs. Returns one outcome per
+    item: ``{"status": "created", "measurement_id": ..., "alerts": [...]}``,
+    ``{"status": "duplicate"}`` or ``{"status": "rejected", "errors": ...}``
+    for unknown and inactive sensors.
+    """
+    sensors = sensor_cache.get_many(values["sensor_token"] for values, _ in items)
+    outcomes: list[dict] = [{} for _ in items]
+    accepted: list[int] = []
+    readings: list[IngestReading] = []
+    for index, (values, raw_payload) in enumerate(items):
+        sensor = sensors.get(values["sensor_token"])
+        if sensor is None or not sensor.is_active:
+            detail = "Unknown sensor token" if sensor is None else "Sensor is inactive"
+            outcomes[index] = {"status": "rejected", "errors": {"detail": detail}}
+            continue
+        accepted.append(index)
+        readings.append(
+            IngestReading(
+                sensor=sensor,
+                temperature=values["temperature"],
+                humidity=values["humidity"],
+                recorded_at=values.get("recorded_at"),
+                raw_payload=raw_payload,
+                sequence=values.get("sequence"),
+            )
         )
 
-        alerts: list[Alert] = []
-        for rule in _matching_rules(sensor):
-            if _should_trigger(rule, float(temperature)):
-                alert = _create_alert(measurement=measurement, rule=rule)
-                alerts.append(alert)
-                _ensure_ticket(alert)
-
-        if not alerts and measurement.status != Measurement.Status.NORMAL:
-            alert = _create_alert(measurement=measurement, rule=None)
-            alerts.append(alert)
-            _ensure_ticket(alert)
-
-        return MeasurementResult(measurement=measurement, alerts=alerts)
-
+    for index, result in zip(accepted, store_measurements(readings, actor=actor)):
+        if result.duplicate:
+            outcomes[index] = {"status": "duplicate"}
+        else:
+            outcomes[index] = {
+                "status": "created",
+                "measurement_id": str(result.measurement.id),
+                "alerts": [str(alert.id) for alert in result.alerts],
+            }
+    return outcomes
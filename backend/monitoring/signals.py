@@ -0,0 +1,86 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .dashboard import invalidate_summary
+from .excursions import excursion_tracker
+from .models import Alert, AlertRule, Channel, Measurement, Sensor, Ticket
+from .response_cache import response_cache
+from .rule_index import rule_index
+from .sensor_cache import sensor_cache
+
+
+@receiver(post_save, sender=Sensor)
+@receiver(post_delete, sender=Sensor)
+def invalidate_sensor_cache(sender, instance: Sensor, **kwargs) -> None:
+    sensor_cache.invalidate(token=instance.token, sensor_id=instance.id)
+
+
+@receiver(post_delete, sender=Sensor)
+def forget_sensor_excursions(sender, instance: Sensor, **kwargs) -> None:
+    excursion_tracker.forget(sensor_id=instance.id)
+
+
+@receiver(post_save, sender=AlertRule)
+def refresh_indexed_rule(sender, instance: AlertRule, **kwargs) -> None:
+    transaction.on_commit(lambda: rule_index.refresh_rules([instance.id]))
+    excursion_tracker.forget(rule_id=instance.id)
+
+
+@receiver(post_delete, sender=AlertRule)
+def remove_indexed_rule(sender, instance: AlertRule, **kwargs) -> None:
+    # Deleting clears ``instance.id`` before the transaction commits.
+    rule_id = instance.id
+    transaction.on_commit(lambda: rule_index.remove_rule(rule_id))
+    excursion_tracker.forget(rule_id=rule_id)
+
+
+@receiver(m2m_changed, sender=AlertRule.channels.through)
+def refresh_rule_channels(sender, instance, action, reverse, pk_set, **kwargs) -> None:
+    if not action.startswith("post_"):
+        return
+    if not reverse:
+        transaction.on_commit(lambda: rule_index.refresh_rules([instance.pk]))
+    elif pk_set:
+        transaction.on_commit(lambda: rule_index.refresh_rules(pk_set))
+    else:
+        transaction.on_commit(rule_index.invalidate)
+
+
+@receiver(post_save, sender=Channel)
+@receiver(post_delete, sender=Channel)
+def refresh_indexed_channel(sender, instance: Channel, **kwargs) -> None:
+    channel_id = instance.id
+    transaction.on_commit(lambda: rule_index.refresh_channel(channel_id))
+
+
+@receiver(post_save, sender=Measurement)
+@receiver(post_delete, sender=Measurement)
+@receiver(post_save, sender=Alert)
+@receiver(post_delete, sender=Alert)
+@receiver(post_save, sender=Ticket)
+@receiver(post_delete, sender=Ticket)
+def invalidate_dashboard_summary(sender, instance, **kwargs) -> None:
+    transaction.on_commit(invalidate_summary)
+
+
+@receiver(post_save, sender=Sensor)
+@receiver(post_delete, sender=Sensor)
+@receiver(post_save, sender=AlertRule)
+@receiver(post_delete, sender=AlertRule)
+@receiver(post_save, sender=Channel)
+@receiver(post_delete, sender=Channel)
+@receiver(post_save, sender=Measurement)
+@receiver(post_delete, sender=Measurement)
+@receiver(post_save, sender=Alert)
+@receiver(post_delete, sender=Alert)
+@receiver(post_save, sender=Ticket)
+@receiver(post_delete, sender=Ticket)
+def bump_response_cache(sender, instance, **kwargs) -> None:
+    transaction.on_commit(lambda: response_cache.bump(sender))
+
+
+@receiver(m2m_changed, sender=AlertRule.channels.through)
+def bump_rule_channels(sender, action, **kwargs) -> None:
+    if action.startswith("post_"):
+        transaction.on_commit(lambda: response_cache.bump(AlertRule))
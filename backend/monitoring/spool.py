@@ -0,0 +1,473 @@
+from __future__ import annotations
+
+import atexit
+import fcntl
+import json
+import logging
+import mmap
+import os
+import socket
+import struct
+import threading
+import time
+import zlib
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import InterfaceError, OperationalError, transaction
+from django.utils.dateparse import parse_datetime
+
+from .models import SpoolCursor
+from .sensor_cache import sensor_cache
+from .services import IngestReading, store_measurements
+
+logger = logging.getLogger(__name__)
+
+# Every record is ``<length><crc32>`` followed by a JSON payload. Segments are
+# preallocated with zeros, so a zero length marks the end of the written data.
+HEADER = struct.Struct("<II")
+OPEN_SUFFIX = ".open"
+SEALED_SUFFIX = ".seg"
+# Records that cannot be stored are appended here, one JSON object per line.
+DEAD_LETTER_NAME = "dead-letter.jsonl"
+# The database being unreachable is no fault of the records being loaded.
+TRANSIENT_ERRORS = (InterfaceError, OperationalError)
+
+
+def _fsync_directory(directory: Path) -> None:
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _segment_created_at(path: Path) -> float:
+    """Creation time (epoch seconds) encoded at the start of a segment name."""
+    return int(path.stem.split("-", 1)[0]) / 1000
+
+
+def _writer_is_alive(path: Path) -> bool:
+    """Whether a process still holds the lock of the open segment ``path``."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except FileNotFoundError:
+        # Sealed since it was listed.
+        return True
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        return True
+    finally:
+        os.close(fd)
+    return False
+
+
+class _Segment:
+    """Open segment, locked with ``flock`` for as long as its writer holds it.
+
+    The kernel drops the lock when the writer process exits, however it
+    exits, which is how :class:`SpoolLoader` tells an abandoned segment from
+    one whose writer is only slow.
+    """
+
+    def __init__(self, path: Path, size: int) -> None:
+        fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_EXCL, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            os.ftruncate(fd, size)
+            self.map = mmap.mmap(fd, size)
+        except BaseException:
+            os.close(fd)
+            raise
+        self.fd = fd
+        self.path = path
+        self.size = size
+        self.offset = 0
+        self.created = time.monotonic()
+
+    def fits(self, payload: bytes) -> bool:
+        return self.offset + HEADER.size + len(payload) <= self.size
+
+    def write(self, payload: bytes) -> None:
+        # The header goes in last so a reader never sees a length for a payload
+        # that is not fully copied yet.
+        start = self.offset + HEADER.size
+        end = start + len(payload)
+        self.map[start:end] = payload
+        self.map[self.offset : start] = HEADER.pack(len(payload), zlib.crc32(payload))
+        self.offset = end
+
+    def sync(self) -> None:
+        self.map.flush()
+
+    def seal(self) -> None:
+        try:
+            self.map.flush()
+            self.map.close()
+            self.path.rename(self.path.with_suffix(SEALED_SUFFIX))
+            _fsync_directory(self.path.parent)
+        finally:
+            os.close(self.fd)
+
+    def release(self) -> None:
+        """Close the segment without sealing it, e.g. after an I/O error."""
+        try:
+            self.map.close()
+        except (OSError, ValueError):
+            pass
+        os.close(self.fd)
+
+
+class IngestSpool:
+    """Append-only spool of validated readings, written by the ingest API.
+
+    Each process appends to its own memory-mapped segment file, so writers
+    never contend across processes. Appends are acknowledged as soon as the
+    record is in the mapping; the pages are flushed to disk every
+    ``sync_records`` records or ``sync_interval`` seconds, whichever comes
+    first, so a power loss can drop at most that window. A segment is sealed
+    (renamed to ``.seg``) when it is full or older than ``segment_seconds``;
+    :class:`SpoolLoader` drains segments into the database.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        *,
+        segment_bytes: int,
+        segment_seconds: float,
+        sync_records: int,
+        sync_interval: float,
+    ) -> None:
+        self.directory = Path(directory)
+        self.segment_bytes = segment_bytes
+        self.segment_seconds = segment_seconds
+        self.sync_records = sync_records
+        self.sync_interval = sync_interval
+        self._segment: Optional[_Segment] = None
+        self._reset()
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self) -> None:
+        # The child must not keep the parent's segment (and its lock) open.
+        if self._segment is not None:
+            self._segment.release()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._segment: Optional[_Segment] = None
+        self._flusher: Optional[threading.Thread] = None
+        self._counter = 0
+        self._unsynced = 0
+        self.records = 0
+        self.syncs = 0
+        self.segments = 0
+
+    def append_reading(
+        self,
+        *,
+        sensor_token: str,
+        temperature: float,
+        humidity: float,
+        recorded_at: datetime,
+        raw_payload: Optional[dict] = None,
+        sequence: Optional[int] = None,
+    ) -> None:
+        self.append(
+            {
+                "sensor_token": sensor_token,
+                "temperature": temperature,
+                "humidity": humidity,
+                "recorded_at": recorded_at.isoformat(),
+                "raw_payload": raw_payload or {},
+                "sequence": sequence,
+            }
+        )
+
+    def append(self, record: dict) -> None:
+        payload = json.dumps(record, cls=DjangoJSONEncoder, separators=(",", ":")).encode()
+        if HEADER.size + len(payload) > self.segment_bytes:
+            raise ValueError("Spool record is larger than a segment")
+        if self._pid != os.getpid():
+            self._reset()
+        with self._lock:
+            try:
+                if self._segment is None or not self._segment.fits(payload):
+                    self._roll()
+                self._segment.write(payload)
+                self.records += 1
+                self._unsynced += 1
+                if self._unsynced >= self.sync_records:
+                    self._sync()
+            except OSError:
+                # The next append starts a new segment.
+                self._abandon()
+                raise
+            if self._flusher is None:
+                self._flusher = threading.Thread(
+                    target=self._flush_periodically, name="ingest-spool", daemon=True
+                )
+                self._flusher.start()
+
+    def _roll(self) -> None:
+        if self._segment is not None:
+            self._seal()
+        if not self._counter:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            atexit.register(self.close)
+        self._counter += 1
+        name = (
+            f"{time.time_ns() // 1_000_000:015d}-{socket.gethostname()}"
+            f"-{self._pid}-{self._counter}{OPEN_SUFFIX}"
+        )
+        self._segment = _Segment(self.directory / name, self.segment_bytes)
+        _fsync_directory(self.directory)
+        self.segments += 1
+
+    def _sync(self) -> None:
+        self._segment.sync()
+        self._unsynced = 0
+        self.syncs += 1
+
+    def _seal(self) -> None:
+        segment, self._segment = self._segment, None
+        self._unsynced = 0
+        segment.seal()
+
+    def _abandon(self) -> None:
+        """Drop the current segment unsealed; the loader reclaims it."""
+        segment, self._segment = self._segment, None
+        self._unsynced = 0
+        if segment is not None:
+            segment.release()
+
+    def _flush(self) -> None:
+        with self._lock:
+            if self._segment is None:
+                return
+            try:
+                if time.monotonic() - self._segment.created >= self.segment_seconds:
+                    self._seal()
+                elif self._unsynced:
+                    self._sync()
+            except OSError:
+                self._abandon()
+                raise
+
+    def _flush_periodically(self) -> None:
+        while True:
+            time.sleep(self.sync_interval)
+            try:
+                self._flush()
+            except Exception:
+                logger.exception("Flushing the ingest spool failed")
+
+    def close(self) -> None:
+        if self._pid != os.getpid():
+            return
+        with self._lock:
+            if self._segment is not None:
+                self._seal()
+
+    def stats(self) -> dict:
+        return {
+            "mode": settings.INGEST_MODE,
+            "records": self.records,
+            "syncs": self.syncs,
+            "segments": self.segments,
+            "pending_segments": sum(
+                1
+                for path in self.directory.glob("*")
+                if path.suffix in (OPEN_SUFFIX, SEALED_SUFFIX)
+            ),
+        }
+
+
+def read_records(path: Path, offset: int, limit: int) -> tuple[list[dict], int, bool]:
+    """Read up to ``limit`` records starting at ``offset``.
+
+    Returns the records, the offset after the last one and whether the end of
+    the written data was reached. A record with a bad checksum (a torn write
+    after a crash) is treated as the end of the segment.
+    """
+    records: list[dict] = []
+    with open(path, "rb") as handle:
+        size = os.fstat(handle.fileno()).st_size
+        if offset + HEADER.size > size:
+            return records, offset, True
+        with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            while len(records) < limit:
+                if offset + HEADER.size > size:
+                    return records, offset, True
+                length, checksum = HEADER.unpack_from(view, offset)
+                start = offset + HEADER.size
+                if length == 0 or start + length > size:
+                    return records, offset, True
+                payload = view[start : start + length]
+                if zlib.crc32(payload) != checksum:
+                    logger.warning("Torn spool record in %s at offset %s", path, offset)
+                    return records, offset, True
+                records.append(json.loads(payload))
+                offset = start + length
+    return records, offset, False
+
+
+class SpoolLoader:
+    """Drains spool segments into :class:`Measurement` with bulk inserts.
+
+    Each batch is stored with :func:`store_measurements` in the same
+    transaction that advances the segment's :class:`SpoolCursor`, so after a
+    crash loading resumes at the last committed offset and no reading is
+    stored twice. A segment file is removed once it is sealed and fully
+    loaded. An open segment is only reclaimed once it is well past
+    ``segment_seconds`` and its writer no longer holds its lock, i.e. the
+    writer has exited or given the segment up after an I/O error.
+
+    When a batch fails for any other reason than the database being
+    unreachable, it is retried record by record and the records that still
+    fail are appended to ``dead-letter.jsonl`` in the spool directory, so one
+    bad record cannot hold back the readings behind it.
+    """
+
+    def __init__(self, directory: Path, *, batch_size: int, segment_seconds: float) -> None:
+        self.directory = Path(directory)
+        self.batch_size = batch_size
+        self.abandon_after = segment_seconds * 2 + 60
+        self.loaded = 0
+        self.skipped = 0
+        self.dead_lettered = 0
+
+    def segments(self) -> list[Path]:
+        if not self.directory.exists():
+            return []
+        return sorted(
+            [
+                *self.directory.glob(f"*{SEALED_SUFFIX}"),
+                *self.directory.glob(f"*{OPEN_SUFFIX}"),
+            ],
+            key=lambda path: path.stem,
+        )
+
+    def drain_once(self) -> int:
+        loaded = 0
+        for path in self.segments():
+            sealed = path.suffix == SEALED_SUFFIX or (
+                time.time() - _segment_created_at(path) > self.abandon_after
+                and not _writer_is_alive(path)
+            )
+            try:
+                while True:
+                    count, at_end = self._load_batch(path)
+                    loaded += count
+                    if at_end:
+                        break
+            except FileNotFoundError:
+                # Sealed by its writer since it was listed; picked up next round.
+                continue
+            if sealed:
+                path.unlink()
+                SpoolCursor.objects.filter(segment=path.stem).delete()
+        return loaded
+
+    def _load_batch(self, path: Path) -> tuple[int, bool]:
+        with transaction.atomic():
+            cursor, _ = SpoolCursor.objects.select_for_update().get_or_create(
+                segment=path.stem
+            )
+            records, offset, at_end = read_records(path, cursor.offset, self.batch_size)
+            if not records:
+                return 0, at_end
+            try:
+                with transaction.atomic():
+                    store_measurements(self._readings(records))
+            except TRANSIENT_ERRORS:
+                raise
+            except Exception:
+                logger.exception(
+                    "Loading %d spooled readings from %s at offset %s failed, "
+                    "retrying them one by one",
+                    len(records),
+                    path.name,
+                    cursor.offset,
+                )
+                for record in records:
+                    self._load_record(path, record)
+            cursor.offset = offset
+            cursor.records += len(records)
+            cursor.save(update_fields=["offset", "records", "updated_at"])
+        self.loaded += len(records)
+        return len(records), at_end
+
+    def _load_record(self, path: Path, record: dict) -> None:
+        try:
+            with transaction.atomic():
+                store_measurements(self._readings([record]))
+        except TRANSIENT_ERRORS:
+            raise
+        except Exception as exc:
+            self.dead_lettered += 1
+            logger.error("Dead-lettering spooled reading from %s: %r", path.name, exc)
+            entry = {"segment": path.stem, "error": repr(exc), "record": record}
+            with open(self.directory / DEAD_LETTER_NAME, "a") as handle:
+                handle.write(json.dumps(entry, cls=DjangoJSONEncoder) + "\n")
+                handle.flush()
+                os.fsync(handle.fileno())
+
+    def _readings(self, records: list[dict]) -> list[IngestReading]:
+        sensors = sensor_cache.get_many(record["sensor_token"] for record in records)
+        readings = []
+        for record in records:
+            sensor = sensors.get(record["sensor_token"])
+            if sensor is None or not sensor.is_active:
+                self.skipped += 1
+                logger.warning(
+                    "Skipping spooled reading for unknown or inactive sensor %s",
+                    record["sensor_token"],
+                )
+                continue
+            recorded_at = parse_datetime(record["recorded_at"])
+            if recorded_at is None:
+                raise ValueError(f"Invalid recorded_at {record['recorded_at']!r}")
+            readings.append(
+                IngestReading(
+                    sensor=sensor,
+                    temperature=record["temperature"],
+                    humidity=record["humidity"],
+                    recorded_at=recorded_at,
+                    raw_payload=record["raw_payload"],
+                    sequence=record.get("sequence"),
+                )
+            )
+        return readings
+
+    def run_forever(self, *, interval: float, stop: threading.Event) -> None:
+        failures = 0
+        while not stop.is_set():
+            try:
+                loaded = self.drain_once()
+            except Exception:
+                failures += 1
+                logger.exception("Loading the ingest spool failed")
+                # Back off while e.g. the database is down, up to a minute.
+                stop.wait(min(interval * 2**failures, 60))
+                continue
+            failures = 0
+            if loaded:
+                logger.info("Loaded %s spooled readings", loaded)
+            else:
+                stop.wait(interval)
+
+
+ingest_spool = IngestSpool(
+    settings.INGEST_SPOOL_DIR,
+    segment_bytes=settings.INGEST_SPOOL_SEGMENT_BYTES,
+    segment_seconds=settings.INGEST_SPOOL_SEGMENT_SECONDS,
+    sync_records=settings.INGEST_SPOOL_SYNC_RECORDS,
+    sync_interval=settings.INGEST_SPOOL_SYNC_INTERVAL_MS / 1000,
+)
@@ -1,3 +1,2239 @@
-from django.test import TestCase
+import asyncio
+import csv
+import gzip
+import json
+import random
+import shutil
+import smtplib
+import threading
+import tempfile
+import time
+import unittest
+import uuid
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import caches
+from django.db import IntegrityError, OperationalError, connection, transaction
+from django.conf import settings
+from django.test import AsyncClient, TestCase, TransactionTestCase
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from . import partitions
+from .audit import (
+    AuditBufferMiddleware,
+    AuditPolicy,
+    buffered_audit,
+    build_audit_entry,
+    record_audit,
+    write_audit_entries,
+)
+from .binary import FLAG_SEQUENCE, HEADER, MEDIA_TYPE, decode_readings, encode_readings
+from .dispatcher import NotificationDispatcher
+from .fastpath import INGEST_SCHEMA
+from .listener import IngestListener, MicroBatcher
+from .management.commands.benchmark_ingest_parsing import COMPATIBILITY_CASES
+from .models import (
+    Alert,
+    AlertRule,
+    AuditLog,
+    Channel,
+    ExcursionState,
+    Measurement,
+    MeasurementRollup,
+    NotificationOutbox,
+    Sensor,
+    SensorState,
+    SpoolCursor,
+    Ticket,
+    User,
+)
+from .ratelimit import CacheBucketStore, DatabaseLoad, LocalBucketStore, ingest_limiter
+from .rollups import rebuild_rollups
+from .rule_index import rule_index
+from .sensor_cache import SensorTokenCache, sensor_cache
+from .sensor_states import rebuild_sensor_states
+from .spool import DEAD_LETTER_NAME, IngestSpool, SpoolLoader
+from .transports import smtp_transport
+from .serializers import MeasurementIngestSerializer
+from .services import OPEN_ALERT_STATUSES, IngestReading, store_measurements
+
+SENSORS = 40
+READINGS_PER_SENSOR = 1500
+ALERTS = 20000
+AUDIT_ENTRIES = 30000
+AUDIT_ACTIONS = [
+    "measurement.created",
+    "alert.created",
+    "alert.updated",
+    "alert.acknowledged",
+    "alert.resolved",
+    "sensor.updated",
+    "ticket.created",
+    "ticket.updated",
+]
+
+
+def _plan_nodes(plan):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _plan_nodes(child)
+
+
+@unittest.skipUnless(connection.vendor == "postgresql", "query plans are PostgreSQL's")
+class ListQueryPlanTests(TestCase):
+    """The hot list filters must stay index scans as the tables grow."""
+
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(16)
+        now = timezone.now()
+        cls.admin = User.objects.create_superuser("plans", "plans@example.com", "x")
+        cls.sensors = Sensor.objects.bulk_create(
+            Sensor(
+                name=f"Sensor {index}",
+                location=f"Room {index % 8}",
+                serial_number=f"PLAN-{index}",
+                token=f"plan-token-{index}",
+                threshold_min=2,
+                threshold_max=8,
+            )
+            for index in range(SENSORS)
+        )
+
+        measurements = [
+            Measurement(
+                sensor=sensor,
+                temperature=round(rng.uniform(1, 10), 2),
+                humidity=round(rng.uniform(30, 70), 2),
+                recorded_at=now - timedelta(minutes=20 * reading),
+                status=rng.choices(
+                    list(Measurement.Status), weights=[94, 5, 1]
+                )[0],
+            )
+            for sensor in cls.sensors
+            for reading in range(READINGS_PER_SENSOR)
+        ]
+        Measurement.objects.bulk_create(measurements, batch_size=5000)
+
+        alerts = []
+        for index in range(ALERTS):
+            measurement = rng.choice(measurements)
+            alerts.append(
+                Alert(
+                    sensor_id=measurement.sensor_id,
+                    measurement=measurement,
+                    severity=rng.choice(list(Alert.Severity)),
+                    status=rng.choices(list(Alert.Status), weights=[1, 1, 98])[0],
+                    message="Temperature out of range",
+                )
+            )
+        Alert.objects.bulk_create(alerts, batch_size=5000)
+
+        AuditLog.objects.bulk_create(
+            (
+                AuditLog(
+                    action=rng.choice(AUDIT_ACTIONS),
+                    actor=cls.admin,
+                    target_model="Measurement",
+                    target_id=str(index),
+                )
+                for index in range(AUDIT_ENTRIES)
+            ),
+            batch_size=5000,
+        )
+
+        with connection.cursor() as cursor:
+            for model in (Measurement, Alert, AuditLog):
+                cursor.execute(f"ANALYZE {model._meta.db_table}")
+
+    def setUp(self):
+        caches[settings.RESPONSE_CACHE].clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def _list_plan(self, url, model):
+        """Plan nodes of the page query a list endpoint runs on ``model``."""
+        table = model._meta.db_table
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        page_queries = [
+            query["sql"]
+            for query in queries.captured_queries
+            if query["sql"].startswith("SELECT")
+            and f'FROM "{table}"' in query["sql"]
+            and "LIMIT" in query["sql"]
+        ]
+        self.assertTrue(page_queries, f"{url} ran no page query on {table}")
+        return self._plan(page_queries[0])
+
+    def _plan(self, sql, params=()):
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return list(_plan_nodes(plan[0]["Plan"]))
+
+    def assertIndexScan(self, nodes, model, index=None):
+        table = model._meta.db_table
+        scans = [
+            node["Node Type"] for node in nodes if node.get("Relation Name") == table
+        ]
+        self.assertTrue(scans, f"{table} is not scanned")
+        self.assertNotIn("Seq Scan", scans, f"sequential scan on {table}")
+        if index is not None:
+            self.assertIn(index, {node.get("Index Name") for node in nodes})
+
+    def test_measurements_latest(self):
+        nodes = self._list_plan("/api/measurements/", Measurement)
+        self.assertIndexScan(nodes, Measurement, "measurement_recorded_idx")
+
+    def test_measurements_by_sensor(self):
+        sensor = self.sensors[0]
+        nodes = self._list_plan(f"/api/measurements/?sensor={sensor.id}", Measurement)
+        self.assertIndexScan(
+            nodes, Measurement, "unique_measurement_sensor_recorded_at"
+        )
+
+    def test_measurements_deep_page(self):
+        url = "/api/measurements/?page_size=100"
+        for _ in range(20):
+            url = self.client.get(url).data["next"]
+        nodes = self._list_plan(url, Measurement)
+        self.assertIndexScan(nodes, Measurement, "measurement_recorded_idx")
+
+    def test_measurements_by_status(self):
+        nodes = self._list_plan("/api/measurements/?status=critical", Measurement)
+        self.assertIndexScan(nodes, Measurement, "measurement_status_idx")
+
+    def test_alerts_latest(self):
+        nodes = self._list_plan("/api/alerts/", Alert)
+        self.assertIndexScan(nodes, Alert)
+
+    def test_open_alerts(self):
+        nodes = self._list_plan("/api/alerts/?status=open", Alert)
+        self.assertIndexScan(nodes, Alert)
+
+    def test_alerts_by_sensor_and_status(self):
+        sensor = self.sensors[0]
+        nodes = self._list_plan(
+            f"/api/alerts/?sensor={sensor.id}&status=resolved", Alert
+        )
+        self.assertIndexScan(nodes, Alert)
+
+    def test_open_alerts_of_sensors(self):
+        queryset = Alert.objects.filter(
+            sensor_id__in=[sensor.id for sensor in self.sensors[:3]],
+            status__in=OPEN_ALERT_STATUSES,
+        ).order_by("created_at")
+        sql, params = queryset.query.sql_with_params()
+        self.assertIndexScan(
+            self._plan(sql, params), Alert, "alert_open_sensor_idx"
+        )
+
+    def test_audit_logs_latest(self):
+        nodes = self._list_plan("/api/audit-logs/", AuditLog)
+        self.assertIndexScan(nodes, AuditLog, "auditlog_created_idx")
+
+    def test_audit_logs_by_action(self):
+        nodes = self._list_plan("/api/audit-logs/?action=alert.resolved", AuditLog)
+        self.assertIndexScan(nodes, AuditLog, "auditlog_action_idx")
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser("pages", "pages@example.com", "x")
+        sensors = Sensor.objects.bulk_create(
+            Sensor(
+                name=f"Sensor {index}",
+                location="Room",
+                serial_number=f"PAGE-{index}",
+                token=f"page-token-{index}",
+                threshold_min=2,
+                threshold_max=8,
+            )
+            for index in range(4)
+        )
+        now = timezone.now()
+        # Four readings share every timestamp, so pages split on ties.
+        cls.measurements = Measurement.objects.bulk_create(
+            Measurement(
+                sensor=sensors[index % 4],
+                temperature=5,
+                humidity=50,
+                recorded_at=now - timedelta(minutes=index // 4),
+            )
+            for index in range(53)
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def _newest_first(self):
+        ordered = sorted(
+            self.measurements, key=lambda m: (m.recorded_at, m.id), reverse=True
+        )
+        return [str(measurement.id) for measurement in ordered]
+
+    def _walk(self, url, link):
+        ids, pages = [], []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append(response.data)
+            ids.extend(row["id"] for row in response.data["results"])
+            url = response.data[link]
+        return ids, pages
+
+    def test_forward(self):
+        ids, pages = self._walk("/api/measurements/?page_size=10", "next")
+        self.assertEqual(ids, self._newest_first())
+        self.assertEqual(len(pages), 6)
+        self.assertIsNone(pages[0]["previous"])
+        self.assertNotIn("count", pages[0])
+
+    def test_backward(self):
+        _, pages = self._walk("/api/measurements/?page_size=10", "next")
+        ids, _ = self._walk(pages[-1]["previous"], "previous")
+        expected = self._newest_first()[:50]
+        self.assertEqual(sorted(ids), sorted(expected))
+        self.assertEqual(ids[:10], expected[40:])
+
+    def test_ascending(self):
+        ids, _ = self._walk("/api/measurements/?page_size=7&ordering=recorded_at", "next")
+        self.assertEqual(ids, self._newest_first()[::-1])
+
+    def test_unsupported_ordering(self):
+        for ordering in ("temperature", "recorded_at,id", "-created_at"):
+            with self.subTest(ordering=ordering):
+                response = self.client.get(f"/api/measurements/?ordering={ordering}")
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(
+                    response.data,
+                    {"ordering": ["Only recorded_at and -recorded_at are supported."]},
+                )
+        response = self.client.get("/api/alerts/?ordering=severity")
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get("/api/measurements/?ordering=-recorded_at")
+        self.assertEqual(response.status_code, 200)
+
+    def test_approximate_count(self):
+        response = self.client.get("/api/measurements/?count=approximate")
+        self.assertGreater(response.data["count"], 0)
+
+    def test_invalid_cursor(self):
+        response = self.client.get("/api/measurements/?cursor=nonsense")
+        self.assertEqual(response.status_code, 404)
+
+
+class SensorStateTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser("states", "states@example.com", "x")
+        self.sensors = [
+            Sensor.objects.create(
+                name=f"Sensor {index}",
+                serial_number=f"STATE-{index}",
+                token=f"state-token-{index}",
+            )
+            for index in range(3)
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def _states(self):
+        return sorted(
+            (
+                state.sensor_id,
+                state.last_recorded_at,
+                state.last_temperature,
+                state.last_status,
+                state.last_out_of_range_at,
+                state.reading_count,
+                state.out_of_range_count,
+            )
+            for state in SensorState.objects.all()
+        )
+
+    def test_out_of_order_batches_match_rebuild(self):
+        rng = random.Random(21)
+        now = timezone.now()
+        readings = [
+            IngestReading(
+                sensor=self.sensors[index % 2],
+                temperature=rng.choice([1, 5, 9.5]),
+                humidity=50,
+                recorded_at=now - timedelta(minutes=rng.randrange(5000)),
+            )
+            for index in range(200)
+        ]
+        for start in range(0, len(readings), 30):
+            store_measurements(readings[start : start + 30])
+        store_measurements(readings[:40])
+
+        states = self._states()
+        self.assertEqual(
+            sum(state[5] for state in states), Measurement.objects.count()
+        )
+        rebuild_sensor_states()
+        self.assertEqual(self._states(), states)
+
+    def test_overview_is_one_query(self):
+        store_measurements(
+            [IngestReading(sensor=self.sensors[0], temperature=9, humidity=50)]
+        )
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/sensors/states/")
+        by_name = {row["name"]: row["state"] for row in response.data}
+        self.assertEqual(by_name["Sensor 0"]["last_status"], "warning")
+        self.assertIsNone(by_name["Sensor 1"])
+
+
+class DashboardSummaryTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser("summary", "summary@example.com", "x")
+        self.sensor = Sensor.objects.create(
+            name="Fridge", serial_number="SUMMARY-1", token="summary-token"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def _store(self, temperatures):
+        now = timezone.now()
+        with self.captureOnCommitCallbacks(execute=True):
+            store_measurements(
+                [
+                    IngestReading(
+                        sensor=self.sensor,
+                        temperature=temperature,
+                        humidity=50,
+                        recorded_at=now - timedelta(seconds=index),
+                    )
+                    for index, temperature in enumerate(temperatures)
+                ]
+            )
+
+    def test_counts_in_one_cached_query(self):
+        self._store([5, 5, 12])
+        with self.assertNumQueries(1):
+            summary = self.client.get("/api/dashboard/summary/").data
+        self.assertEqual(summary["measurements_today"], 3)
+        self.assertEqual(summary["alerts_24h"], 1)
+        self.assertEqual(summary["open_tickets"], 1)
+        self.assertEqual(summary["last_alert"]["sensor_name"], "Fridge")
+        with self.assertNumQueries(0):
+            self.client.get("/api/dashboard/summary/")
+
+    def test_ingest_invalidates(self):
+        self.client.get("/api/dashboard/summary/")
+        self._store([5, 6])
+        summary = self.client.get("/api/dashboard/summary/").data
+        self.assertEqual(summary["measurements_today"], 2)
+
+
+class ResponseCacheTests(TestCase):
+    def setUp(self):
+        caches[settings.RESPONSE_CACHE].clear()
+        self.admin = User.objects.create_superuser("cache", "cache@example.com", "x")
+        self.operator = User.objects.create_user("operator", "op@example.com", "x")
+        self.sensor = Sensor.objects.create(
+            name="Fridge", serial_number="CACHE-1", token="cache-token"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_not_modified_without_queries(self):
+        etag = self.client.get("/api/sensors/")["ETag"]
+        with self.assertNumQueries(0):
+            response = self.client.get("/api/sensors/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_change_bumps_version(self):
+        etag = self.client.get("/api/sensors/")["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(
+                f"/api/sensors/{self.sensor.id}/", {"name": "Freezer"}, format="json"
+            )
+        response = self.client.get("/api/sensors/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["results"][0]["name"], "Freezer")
+
+    def test_ingest_bumps_alerts(self):
+        etag = self.client.get("/api/alerts/")["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            store_measurements(
+                [IngestReading(sensor=self.sensor, temperature=12, humidity=50)]
+            )
+        response = self.client.get("/api/alerts/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(len(response.data["results"]), 1)
+
+    def test_roles_do_not_share_responses(self):
+        etag = self.client.get("/api/sensors/")["ETag"]
+        operator = APIClient()
+        operator.force_authenticate(self.operator)
+        response = operator.get("/api/sensors/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+
+class SparseFieldsTests(TestCase):
+    def setUp(self):
+        caches[settings.RESPONSE_CACHE].clear()
+        self.admin = User.objects.create_superuser("fields", "fields@example.com", "x")
+        self.sensor = Sensor.objects.create(
+            name="Fridge", serial_number="FIELDS-1", token="fields-token"
+        )
+        store_measurements(
+            [IngestReading(sensor=self.sensor, temperature=12, humidity=50)]
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_relations_are_ids_by_default(self):
+        alert = self.client.get("/api/alerts/").data["results"][0]
+        self.assertEqual(alert["sensor"], self.sensor.id)
+        self.assertIsInstance(alert["measurement"], uuid.UUID)
+
+    def test_expand(self):
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/alerts/?expand=sensor,measurement")
+        alert = response.data["results"][0]
+        self.assertEqual(alert["sensor"]["name"], "Fridge")
+        self.assertNotIn("token", alert["sensor"])
+        self.assertNotIn("raw_payload", alert["measurement"])
+
+    def test_fields(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/audit-logs/?fields=id,action")
+        self.assertEqual(
+            set(response.data["results"][0]), {"id", "action"}
+        )
+        self.assertNotIn("payload", queries.captured_queries[-1]["sql"])
+
+
+class FastListTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser("fast", "fast@example.com", "x")
+        sensors = [
+            Sensor.objects.create(
+                name=f"Fast {index}", serial_number=f"FAST-{index}", token=f"fast-{index}"
+            )
+            for index in range(3)
+        ]
+        now = timezone.now()
+        for offset in range(5):
+            store_measurements(
+                [
+                    IngestReading(
+                        sensor=sensor,
+                        temperature=3.456 + index * 5,
+                        humidity=50.1,
+                        recorded_at=now - timedelta(minutes=offset, microseconds=offset),
+                        raw_payload={"note": "é", "values": [1, 2.5, None]},
+                    )
+                    for index, sensor in enumerate(sensors)
+                ],
+                actor=self.admin if offset % 2 else None,
+            )
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def assertSameList(self, url):
+        expected = json.loads(self.client.get(url).content)
+        separator = "&" if "?" in url else "?"
+        response = self.client.get(f"{url}{separator}fast=true")
+        self.assertEqual(response.status_code, 200)
+        actual = json.loads(response.content)
+        self.assertEqual(actual["results"], expected["results"])
+        self.assertEqual(list(actual["results"][0]), list(expected["results"][0]))
+        self.assertEqual(list(actual), list(expected))
+        return actual
+
+    def test_matches_serializer(self):
+        for url in [
+            "/api/measurements/",
+            "/api/measurements/?fields=id,sensor,temperature,recorded_at",
+            "/api/audit-logs/",
+            "/api/audit-logs/?fields=action,actor,created_at&count=approximate",
+        ]:
+            with self.subTest(url=url):
+                self.assertSameList(url)
+
+    def test_cursor_pages(self):
+        seen = []
+        url = "/api/measurements/?fast=true&page_size=4"
+        while url:
+            body = json.loads(self.client.get(url).content)
+            seen += [row["id"] for row in body["results"]]
+            url = body["next"]
+        self.assertEqual(len(set(seen)), Measurement.objects.count())
+
+    def test_expand_uses_serializer(self):
+        response = self.client.get("/api/measurements/?fast=true&expand=sensor")
+        self.assertIn("name", response.data["results"][0]["sensor"])
+
+
+class SeriesTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser("series", "series@example.com", "x")
+        self.sensor = Sensor.objects.create(
+            name="Series", serial_number="SERIES-1", token="series-token"
+        )
+        self.end = timezone.now().replace(second=0, microsecond=0)
+        self.start = self.end - timedelta(hours=3)
+        store_measurements(
+            [
+                IngestReading(
+                    sensor=self.sensor,
+                    temperature=4 + (minute % 7) / 2,
+                    humidity=50,
+                    recorded_at=self.start + timedelta(minutes=minute),
+                )
+                for minute in range(180)
+            ]
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def get(self, **params):
+        params = {
+            "sensor": self.sensor.id,
+            "from": self.start.isoformat(),
+            "to": self.end.isoformat(),
+            **params,
+        }
+        response = self.client.get("/api/measurements/series/", params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return json.loads(response.content)
+
+    def test_response_shape(self):
+        # The frontend reads the series from the top level of the response.
+        body = self.get(points=500)
+        self.assertEqual(
+            list(body),
+            [
+                "sensor",
+                "from",
+                "to",
+                "mode",
+                "resolution",
+                "bucket_seconds",
+                "timestamps",
+                "temperature",
+                "humidity",
+            ],
+        )
+        self.assertEqual(body["sensor"], str(self.sensor.id))
+        self.assertEqual(body["mode"], "raw")
+        self.assertEqual(len(body["timestamps"]), 180)
+
+    def test_lttb(self):
+        body = self.get(mode="lttb", points=20)
+        self.assertEqual(body["mode"], "lttb")
+        self.assertEqual(len(body["timestamps"]), 20)
+        self.assertEqual(body["timestamps"][0], int(self.start.timestamp() * 1000))
+        self.assertEqual(body["timestamps"], sorted(body["timestamps"]))
+        # The peaks of every bucket are kept.
+        self.assertEqual(max(body["temperature"]), 7.0)
+
+    def test_lttb_two_points(self):
+        body = self.get(mode="lttb", points=2)
+        self.assertEqual(len(body["timestamps"]), 2)
+        self.assertEqual(
+            body["timestamps"][-1],
+            int((self.end - timedelta(minutes=1)).timestamp() * 1000),
+        )
+
+    def test_aggregate_buckets(self):
+        body = self.get(mode="aggregate", points=10)
+        self.assertEqual(body["mode"], "aggregate")
+        self.assertLessEqual(len(body["timestamps"]), 10)
+        self.assertEqual(body["bucket_seconds"] % 300, 0)
+        self.assertEqual(sum(body["count"]), 180)
+        self.assertEqual(max(body["temperature_max"]), 7.0)
+        self.assertEqual(min(body["temperature_min"]), 4.0)
+        widths = {b - a for a, b in zip(body["timestamps"], body["timestamps"][1:])}
+        self.assertEqual(widths, {body["bucket_seconds"] * 1000})
+
+
+class WindowRuleTests(TestCase):
+    def setUp(self):
+        self.sensor = Sensor.objects.create(
+            name="Window", serial_number="WINDOW-1", token="window-token"
+        )
+        self.rule = AlertRule.objects.create(
+            name="30 minutes", sensor=self.sensor, window_minutes=30
+        )
+        # Rule signals refresh the index on commit, which tests never reach.
+        rule_index.invalidate()
+        self.addCleanup(rule_index.invalidate)
+        self.start = timezone.now().replace(second=0, microsecond=0) - timedelta(
+            hours=1
+        )
+
+    def store(self, minute, temperature):
+        reading = IngestReading(
+            sensor=self.sensor,
+            temperature=temperature,
+            humidity=50,
+            recorded_at=self.start + timedelta(minutes=minute),
+        )
+        return store_measurements([reading])[0]
+
+    def test_fires_once_the_window_has_elapsed(self):
+        for minute in (0, 10, 20):
+            self.assertEqual(self.store(minute, 10).alerts, [])
+        alerts = self.store(30, 10).alerts
+        self.assertEqual([alert.rule_id for alert in alerts], [self.rule.id])
+
+    def test_back_in_range_restarts_the_window(self):
+        self.store(0, 10)
+        self.store(20, 5)
+        self.assertEqual(self.store(30, 10).alerts, [])
+        self.assertEqual(self.store(60, 10).alerts[0].rule_id, self.rule.id)
+
+    def test_late_readings_are_ignored(self):
+        self.store(0, 10)
+        self.store(20, 5)
+        # Arrives after the reading at 20 minutes: it neither extends the
+        # first excursion nor starts a new one.
+        self.assertEqual(self.store(15, 10).alerts, [])
+        self.assertEqual(self.store(40, 10).alerts, [])
+        self.assertEqual(Alert.objects.count(), 0)
+
+    def test_state_changed_by_another_worker(self):
+        self.store(0, 10)
+        # Another worker ended the excursion; this process still caches it.
+        ExcursionState.objects.filter(sensor=self.sensor, rule=self.rule).update(
+            breach_started_at=None,
+            last_recorded_at=self.start + timedelta(minutes=20),
+        )
+        self.assertEqual(self.store(35, 10).alerts, [])
+        self.assertEqual(self.store(65, 10).alerts[0].rule_id, self.rule.id)
+
+    def test_excursion_started_by_another_worker(self):
+        self.store(0, 5)
+        ExcursionState.objects.update_or_create(
+            sensor=self.sensor,
+            rule=self.rule,
+            defaults={
+                "breach_started_at": self.start + timedelta(minutes=10),
+                "last_recorded_at": self.start + timedelta(minutes=10),
+            },
+        )
+        self.assertEqual(self.store(40, 10).alerts[0].rule_id, self.rule.id)
+
+    @unittest.skipUnless(connection.features.has_select_for_update, "needs row locks")
+    def test_window_state_is_read_under_the_sensor_lock(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.store(0, 10)
+        sql = [query["sql"] for query in queries.captured_queries]
+        lock = next(
+            index
+            for index, query in enumerate(sql)
+            if '"monitoring_sensor"' in query and "FOR UPDATE" in query
+        )
+        state = next(
+            index
+            for index, query in enumerate(sql)
+            if query.startswith("SELECT") and '"monitoring_excursionstate"' in query
+        )
+        self.assertLess(lock, state)
+
+    def test_batch_is_evaluated_in_recorded_at_order(self):
+        readings = [
+            IngestReading(
+                sensor=self.sensor,
+                temperature=10,
+                humidity=50,
+                recorded_at=self.start + timedelta(minutes=minute),
+            )
+            for minute in (30, 0, 15)
+        ]
+        results = store_measurements(readings)
+        self.assertEqual([len(result.alerts) for result in results], [1, 0, 0])
+
+    def test_create_through_the_api(self):
+        admin = User.objects.create_superuser("window", "window@example.com", "x")
+        client = APIClient()
+        client.force_authenticate(admin)
+        response = client.post(
+            "/api/measurements/",
+            {
+                "sensor": str(self.sensor.id),
+                "temperature": "4.50",
+                "humidity": "61.00",
+                "recorded_at": self.start.isoformat(),
+                "sequence": 1,
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+        measurement = Measurement.objects.get()
+        self.assertEqual(measurement.raw_payload["sensor"], str(self.sensor.id))
+        self.assertEqual(measurement.raw_payload["temperature"], "4.50")
+
+
+class SensorCacheTests(TestCase):
+    def setUp(self):
+        sensor_cache.clear()
+        self.addCleanup(sensor_cache.clear)
+        self.sensor = Sensor.objects.create(
+            name="Cached", serial_number="CACHE-1", token="cache-token"
+        )
+
+    def test_hits_and_misses(self):
+        cache = SensorTokenCache(max_size=2, ttl=60)
+        with self.assertNumQueries(1):
+            self.assertEqual(cache.get("cache-token").id, self.sensor.id)
+            self.assertEqual(cache.get("cache-token").id, self.sensor.id)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+        with self.assertNumQueries(1):
+            found = cache.get_many(["cache-token", "other", "another"])
+        self.assertEqual(found["cache-token"].id, self.sensor.id)
+        self.assertIsNone(found["other"])
+        self.assertEqual((cache.hits, cache.misses), (2, 3))
+        self.assertEqual(cache.stats()["size"], 2)
+        self.assertEqual(cache.stats()["hit_ratio"], 0.4)
+
+    def test_entries_expire(self):
+        cache = SensorTokenCache(max_size=10, ttl=60)
+        cache.get("cache-token")
+        later = time.monotonic() + 61
+        with mock.patch("monitoring.sensor_cache.time.monotonic", return_value=later):
+            with self.assertNumQueries(1):
+                cache.get("cache-token")
+        self.assertEqual(cache.misses, 2)
+
+    def test_unknown_tokens_are_cached(self):
+        self.assertIsNone(sensor_cache.get("not-yet"))
+        with self.assertNumQueries(0):
+            self.assertIsNone(sensor_cache.get("not-yet"))
+
+        sensor = Sensor.objects.create(
+            name="Late", serial_number="CACHE-2", token="not-yet"
+        )
+        self.assertEqual(sensor_cache.get("not-yet").id, sensor.id)
+
+    def test_save_and_delete_invalidate(self):
+        self.assertEqual(sensor_cache.get("cache-token").threshold_max, 8.0)
+        self.sensor.threshold_max = 12
+        self.sensor.save()
+        self.assertEqual(sensor_cache.get("cache-token").threshold_max, 12.0)
+
+        self.sensor.token = "renamed-token"
+        self.sensor.save()
+        self.assertIsNone(sensor_cache.get("cache-token"))
+        self.assertEqual(sensor_cache.get("renamed-token").id, self.sensor.id)
+
+        self.sensor.delete()
+        self.assertIsNone(sensor_cache.get("renamed-token"))
+
+    def test_deactivated_sensor_is_rejected_at_once(self):
+        client = APIClient()
+        reading = {"sensor_token": "cache-token", "temperature": 4.5, "humidity": 60}
+        response = client.post("/api/ingest/", reading, format="json")
+        self.assertEqual(response.status_code, 201)
+
+        self.sensor.is_active = False
+        self.sensor.save()
+        response = client.post("/api/ingest/", reading, format="json")
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.data, {"detail": "Sensor is inactive"})
+        self.assertEqual(Measurement.objects.count(), 1)
+
+
+class RuleIndexTests(TestCase):
+    def setUp(self):
+        self.sensor = Sensor.objects.create(
+            name="Indexed", serial_number="INDEX-1", token="index-token"
+        )
+        self.rule = AlertRule.objects.create(name="Cold chain", sensor=self.sensor)
+        self.channel = Channel.objects.create(
+            name="Ops", channel_type="email", target="ops@example.com"
+        )
+        rule_index.invalidate()
+        self.addCleanup(rule_index.invalidate)
+
+    def compiled(self):
+        return {rule.id: rule for rule in rule_index.rules_for(self.sensor.id)}
+
+    def store(self, temperature):
+        reading = IngestReading(
+            sensor=self.sensor,
+            temperature=temperature,
+            humidity=50,
+            recorded_at=timezone.now(),
+        )
+        return store_measurements([reading])[0]
+
+    def test_warm_index_runs_no_rule_queries(self):
+        self.store(10)
+        builds = rule_index.builds
+        with CaptureQueriesContext(connection) as queries:
+            alerts = self.store(12).alerts
+        self.assertEqual([alert.rule_id for alert in alerts], [self.rule.id])
+        self.assertEqual(rule_index.builds, builds)
+        self.assertFalse(
+            [
+                query["sql"]
+                for query in queries.captured_queries
+                if '"monitoring_alertrule' in query["sql"]
+            ]
+        )
+
+    def test_rule_changes_refresh_the_index(self):
+        self.assertEqual(list(self.compiled()), [self.rule.id])
+        builds = rule_index.builds
+
+        with self.captureOnCommitCallbacks(execute=True):
+            added = AlertRule.objects.create(name="Everywhere", max_temp=30)
+        self.assertEqual(set(self.compiled()), {self.rule.id, added.id})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.rule.max_temp = 12
+            self.rule.save()
+        self.assertEqual(self.compiled()[self.rule.id].max_temp, 12.0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            added.is_active = False
+            added.save()
+        self.assertEqual(list(self.compiled()), [self.rule.id])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.rule.delete()
+        self.assertEqual(self.compiled(), {})
+        self.assertEqual(rule_index.builds, builds)
+
+    def test_channel_links_refresh_the_index(self):
+        self.assertEqual(self.compiled()[self.rule.id].channels, ())
+        builds = rule_index.builds
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.rule.channels.add(self.channel)
+        self.assertEqual(
+            [channel.id for channel in self.compiled()[self.rule.id].channels],
+            [self.channel.id],
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.channel.target = "night@example.com"
+            self.channel.save()
+        self.assertEqual(
+            self.compiled()[self.rule.id].channels[0].target, "night@example.com"
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.channel.alertrule_set.remove(self.rule)
+        self.assertEqual(self.compiled()[self.rule.id].channels, ())
+        self.assertEqual(rule_index.builds, builds)
+
+
+class AuditTests(TransactionTestCase):
+    def entries(self, count, action="sensor.updated"):
+        return [build_audit_entry(action=action) for _ in range(count)]
+
+    def test_sampled_actions(self):
+        policy = AuditPolicy({"measurement.created": 0.25, "alert.updated": 0})
+        entries = self.entries(4, "measurement.created") + self.entries(
+            2, "alert.updated"
+        )
+        draws = [0.1, 0.3, 0.2, 0.9]
+        with mock.patch("monitoring.audit.random.random", side_effect=draws):
+            kept = policy.apply(entries + self.entries(2))
+        self.assertEqual(
+            [entry.action for entry in kept],
+            ["measurement.created"] * 2 + ["sensor.updated"] * 2,
+        )
+        self.assertEqual(
+            [entry.payload for entry in kept], [{"sample_rate": 0.25}] * 2 + [{}] * 2
+        )
+
+    def test_sampling_rate_holds(self):
+        random.seed(7)
+        kept = AuditPolicy({"sensor.updated": 0.1}).apply(self.entries(5000))
+        self.assertAlmostEqual(len(kept) / 5000, 0.1, delta=0.02)
+
+    def test_middleware_flushes_after_the_response(self):
+        def view(request):
+            for _ in range(3):
+                record_audit(action="sensor.updated")
+            self.assertEqual(AuditLog.objects.count(), 0)
+            return "response"
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(AuditBufferMiddleware(view)(None), "response")
+        self.assertEqual(AuditLog.objects.count(), 3)
+        inserts = [q for q in queries.captured_queries if q["sql"].startswith("INSERT")]
+        self.assertEqual(len(inserts), 1)
+
+    def test_middleware_flushes_when_the_view_raises(self):
+        def view(request):
+            record_audit(action="sensor.updated")
+            raise RuntimeError("boom")
+
+        with self.assertRaises(RuntimeError):
+            AuditBufferMiddleware(view)(None)
+        self.assertEqual(AuditLog.objects.count(), 1)
+
+    @override_settings(AUDIT_BUFFER_MAX_SIZE=2)
+    def test_full_buffer_is_flushed_early(self):
+        with buffered_audit():
+            write_audit_entries(self.entries(1))
+            self.assertEqual(AuditLog.objects.count(), 0)
+            write_audit_entries(self.entries(1))
+            self.assertEqual(AuditLog.objects.count(), 2)
+            write_audit_entries(self.entries(1))
+        self.assertEqual(AuditLog.objects.count(), 3)
+
+    def test_atomic_blocks_write_at_once(self):
+        with buffered_audit():
+            with transaction.atomic():
+                with self.assertNumQueries(1):
+                    write_audit_entries(self.entries(3))
+                self.assertEqual(AuditLog.objects.count(), 3)
+        self.assertEqual(AuditLog.objects.count(), 3)
+
+    def test_rolled_back_entries_are_not_written(self):
+        with buffered_audit():
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                record_audit(action="sensor.updated")
+                raise RuntimeError("rolled back")
+        self.assertEqual(AuditLog.objects.count(), 0)
+
+
+class DuplicateReadingTests(TestCase):
+    def setUp(self):
+        self.sensor = Sensor.objects.create(
+            name="Retry", serial_number="RETRY-1", token="retry-token"
+        )
+        self.recorded_at = timezone.now().replace(microsecond=0) - timedelta(hours=1)
+        self.admin = User.objects.create_superuser("retry", "retry@example.com", "x")
+        self.client = APIClient()
+
+    def reading(self, **values):
+        return {
+            "sensor_token": "retry-token",
+            "temperature": 4.5,
+            "humidity": 60,
+            "recorded_at": self.recorded_at.isoformat(),
+            **values,
+        }
+
+    def test_same_recorded_at_is_skipped(self):
+        first = self.client.post("/api/ingest/", self.reading(), format="json")
+        again = self.client.post("/api/ingest/", self.reading(), format="json")
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(again.status_code, 200)
+        self.assertTrue(again.data["duplicate"])
+        self.assertEqual(Measurement.objects.count(), 1)
+        self.assertEqual(SensorState.objects.get().reading_count, 1)
+
+    def test_same_sequence_is_skipped(self):
+        later = (self.recorded_at + timedelta(minutes=5)).isoformat()
+        duplicates = ingest_limiter.duplicates
+        response = self.client.post(
+            "/api/ingest/batch/",
+            [
+                self.reading(sequence=7),
+                self.reading(sequence=7, recorded_at=later),
+                self.reading(sequence=8, recorded_at=later),
+            ],
+            format="json",
+        )
+        self.assertEqual(
+            [item["status"] for item in response.data["results"]],
+            ["created", "duplicate", "created"],
+        )
+        self.assertEqual(Measurement.objects.count(), 2)
+        self.assertEqual(ingest_limiter.duplicates, duplicates + 1)
+
+    def test_sequence_counter_reset(self):
+        before_reboot = self.recorded_at - timedelta(days=3)
+        store_measurements(
+            [
+                IngestReading(
+                    sensor=self.sensor,
+                    temperature=4,
+                    humidity=50,
+                    recorded_at=before_reboot + timedelta(minutes=sequence),
+                    sequence=sequence,
+                )
+                for sequence in (1, 2)
+            ]
+        )
+        with self.assertLogs("monitoring.services", "WARNING"):
+            response = self.client.post(
+                "/api/ingest/batch/",
+                [self.reading(sequence=1), self.reading(sequence=1)],
+                format="json",
+            )
+        self.assertEqual(
+            [item["status"] for item in response.data["results"]],
+            ["created", "duplicate"],
+        )
+        self.assertEqual(
+            sorted(
+                Measurement.objects.values_list("sequence", flat=True),
+                key=lambda sequence: sequence or 0,
+            ),
+            [None, 1, 2],
+        )
+        self.assertEqual(
+            Measurement.objects.get(sequence=1).recorded_at, self.recorded_at
+        )
+
+    @override_settings(INGEST_SEQUENCE_WINDOW_HOURS=0)
+    def test_sequences_without_a_window(self):
+        store_measurements(
+            [
+                IngestReading(
+                    sensor=self.sensor,
+                    temperature=4,
+                    humidity=50,
+                    recorded_at=self.recorded_at - timedelta(days=300),
+                    sequence=1,
+                )
+            ]
+        )
+        response = self.client.post(
+            "/api/ingest/", self.reading(sequence=1), format="json"
+        )
+        self.assertTrue(response.data["duplicate"])
+        self.assertEqual(Measurement.objects.count(), 1)
+
+    def test_sequence_must_fit_in_a_bigint(self):
+        for url in ("/api/ingest/", "/api/ingest/fast/"):
+            with self.subTest(url=url):
+                response = self.client.post(
+                    url, self.reading(sequence=2**63), format="json"
+                )
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(
+                    json.loads(response.content)["sequence"],
+                    ["Ensure this value is less than or equal to 9223372036854775807."],
+                )
+        self.assertFalse(Measurement.objects.exists())
+
+    def test_api_create_without_sequence(self):
+        self.client.force_authenticate(self.admin)
+        payload = {
+            "sensor": str(self.sensor.id),
+            "temperature": "4.50",
+            "humidity": "61.00",
+            "recorded_at": self.recorded_at.isoformat(),
+        }
+        response = self.client.post("/api/measurements/", payload, format="json")
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertIsNone(response.data["sequence"])
+        again = self.client.post("/api/measurements/", payload, format="json")
+        self.assertEqual(again.status_code, 409)
+
+    def test_api_update_keeps_sequences_unique(self):
+        self.client.force_authenticate(self.admin)
+        store_measurements(
+            [
+                IngestReading(
+                    sensor=self.sensor,
+                    temperature=4,
+                    humidity=50,
+                    recorded_at=self.recorded_at + timedelta(minutes=minute),
+                    sequence=minute,
+                )
+                for minute in (1, 2)
+            ]
+        )
+        measurement = Measurement.objects.get(sequence=2)
+        response = self.client.patch(
+            f"/api/measurements/{measurement.id}/", {"sequence": 1}, format="json"
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class BatchIngestTests(TestCase):
+    def setUp(self):
+        Sensor.objects.create(
+            name="Batch", serial_number="BATCH-1", token="batch-token"
+        )
+        Sensor.objects.create(
+            name="Retired",
+            serial_number="BATCH-2",
+            token="retired-token",
+            is_active=False,
+        )
+        self.client = APIClient()
+
+    def post(self, readings):
+        return self.client.post("/api/ingest/batch/", readings, format="json")
+
+    def reading(self, **values):
+        return {
+            "sensor_token": "batch-token",
+            "temperature": 4.5,
+            "humidity": 60,
+            **values,
+        }
+
+    def test_status_per_item(self):
+        response = self.post(
+            [
+                self.reading(),
+                self.reading(temperature="warm"),
+                self.reading(sensor_token="unknown"),
+                self.reading(sensor_token="retired-token"),
+                self.reading(temperature=1000),
+                self.reading(humidity=-1000),
+            ]
+        )
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(
+            [item["status"] for item in response.data["results"]],
+            ["created", "rejected", "rejected", "rejected", "rejected", "rejected"],
+        )
+        results = response.data["results"]
+        self.assertEqual(
+            results[1]["errors"], {"temperature": ["A valid number is required."]}
+        )
+        self.assertEqual(results[2]["errors"], {"detail": "Unknown sensor token"})
+        self.assertEqual(results[3]["errors"], {"detail": "Sensor is inactive"})
+        self.assertEqual(
+            results[4]["errors"],
+            {"temperature": ["Ensure this value is less than or equal to 999.99."]},
+        )
+        self.assertEqual(
+            results[5]["errors"],
+            {"humidity": ["Ensure this value is greater than or equal to -999.99."]},
+        )
+        self.assertEqual(
+            (response.data["created"], response.data["rejected"]), (1, 5)
+        )
+        self.assertEqual(Measurement.objects.count(), 1)
+
+    def test_non_finite_values_are_rejected(self):
+        for values in (
+            {"temperature": "nan"},
+            {"humidity": "NaN"},
+            {"temperature": "inf"},
+            {"humidity": "-Infinity"},
+        ):
+            with self.subTest(values=values):
+                response = self.client.post(
+                    "/api/ingest/", self.reading(**values), format="json"
+                )
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(
+                    response.data,
+                    {name: ["A valid number is required."] for name in values},
+                )
+        self.assertFalse(Measurement.objects.exists())
+
+        response = self.post(
+            [
+                self.reading(),
+                self.reading(temperature="nan"),
+                self.reading(humidity="inf"),
+            ]
+        )
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(
+            [item.get("errors") for item in response.data["results"]],
+            [
+                None,
+                {"temperature": ["A valid number is required."]},
+                {"humidity": ["A valid number is required."]},
+            ],
+        )
+        self.assertEqual(Measurement.objects.count(), 1)
+
+    def test_all_rejected(self):
+        response = self.post([self.reading(sensor_token="unknown"), {}])
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Measurement.objects.exists())
+
+    def test_envelope_and_empty_batch(self):
+        response = self.post({"readings": [self.reading()]})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.post([]).status_code, 400)
+
+    def test_untimed_readings_are_all_stored(self):
+        response = self.post([self.reading(), self.reading(), self.reading()])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            (response.data["created"], response.data["duplicates"]), (3, 0)
+        )
+        self.assertEqual(
+            len(set(Measurement.objects.values_list("recorded_at", flat=True))), 3
+        )
+
+
+class _DatagramClient(asyncio.DatagramProtocol):
+    def __init__(self) -> None:
+        self.replies: asyncio.Queue = asyncio.Queue()
+
+    def datagram_received(self, data, addr) -> None:
+        self.replies.put_nowait(data)
+
+
+class ListenerTests(TransactionTestCase):
+    def setUp(self):
+        Sensor.objects.create(
+            name="Gateway", serial_number="LISTENER-1", token="listener-token"
+        )
+
+    def exchange(self, protocol: str, payload: bytes):
+        """Send ``payload`` to a listener; the reply, or ``None`` without one."""
+
+        async def run():
+            listener = IngestListener(
+                MicroBatcher(max_size=10, max_delay=0.01, max_pending=100)
+            )
+            addresses = dict(await listener.start("127.0.0.1", udp_port=0, tcp_port=0))
+            try:
+                if protocol == "tcp":
+                    reader, writer = await asyncio.open_connection(*addresses["tcp"])
+                    writer.write(payload + b"\n")
+                    reply = await asyncio.wait_for(reader.readline(), 5)
+                    writer.close()
+                    return json.loads(reply)
+                loop = asyncio.get_running_loop()
+                transport, client = await loop.create_datagram_endpoint(
+                    _DatagramClient, remote_addr=addresses["udp"]
+                )
+                transport.sendto(payload)
+                try:
+                    return json.loads(await asyncio.wait_for(client.replies.get(), 1))
+                except asyncio.TimeoutError:
+                    return None
+                finally:
+                    transport.close()
+            finally:
+                await listener.close()
+
+        return asyncio.run(run())
+
+    def reading(self, **values) -> bytes:
+        reading = {"sensor_token": "listener-token", "temperature": 4.5, "humidity": 60}
+        return json.dumps({**reading, **values}).encode()
+
+    def test_udp_reply_is_cut_down_to_the_counts(self):
+        reply = self.exchange("udp", self.reading())
+        self.assertEqual(reply, {"created": 1, "duplicates": 0, "rejected": 0})
+        self.assertEqual(Measurement.objects.count(), 1)
+
+    def test_udp_reply_with_results_when_it_fits(self):
+        reply = self.exchange("udp", self.reading(note="x" * 300))
+        self.assertEqual(reply["results"][0]["status"], "created")
+
+    def test_udp_never_amplifies(self):
+        self.assertIsNone(self.exchange("udp", b"[{},{},{}]"))
+        self.assertIsNone(self.exchange("udp", b"{"))
+        self.assertEqual(
+            self.exchange("udp", b"[" + b"{}," * 50 + b"{}]"),
+            {"created": 0, "duplicates": 0, "rejected": 51},
+        )
+        self.assertFalse(Measurement.objects.exists())
+
+    def test_tcp_reply_has_every_result(self):
+        reply = self.exchange("tcp", b"[" + self.reading() + b", {}]")
+        self.assertEqual(
+            [item["status"] for item in reply["results"]], ["created", "rejected"]
+        )
+        self.assertEqual(
+            reply["results"][1]["errors"]["temperature"], ["This field is required."]
+        )
+
+
+class RefusingEmailBackend(EmailBackend):
+    """Locmem backend refusing mail to ``refused@example.com``."""
+
+    def send_messages(self, messages):
+        for message in messages:
+            if "refused@example.com" in message.to:
+                raise smtplib.SMTPRecipientsRefused(
+                    {"refused@example.com": (550, b"Mailbox unavailable")}
+                )
+        return super().send_messages(messages)
+
+
+@override_settings(
+    EMAIL_BACKEND="monitoring.tests.RefusingEmailBackend",
+    TELEGRAM_BOT_TOKEN="",
+    TELEGRAM_CHAT_ID="",
+)
+class NotificationDispatchTests(TestCase):
+    def setUp(self):
+        sensor = Sensor.objects.create(
+            name="Notify", serial_number="NOTIFY-1", token="notify-token"
+        )
+        store_measurements([IngestReading(sensor=sensor, temperature=12, humidity=50)])
+        self.alert = Alert.objects.get()
+        NotificationOutbox.objects.all().delete()
+        smtp_transport.close()
+        self.addCleanup(smtp_transport.close)
+        self.dispatcher = NotificationDispatcher(max_workers=2, max_attempts=3)
+        self.addCleanup(self.dispatcher.close)
+
+    def queue(self, channel_type, target=""):
+        return NotificationOutbox.objects.create(
+            alert=self.alert,
+            channel_type=channel_type,
+            target=target,
+            subject="Alert",
+            body="Too warm",
+        )
+
+    def test_emails_succeed_or_fail_one_by_one(self):
+        sent = self.queue("email", "ops@example.com")
+        refused = self.queue("email", "refused@example.com")
+        also_sent = self.queue("email", "qa@example.com")
+        with self.assertLogs("monitoring.dispatcher", "WARNING"):
+            counts = self.dispatcher.dispatch_once()
+        self.assertEqual(counts, {"sent": 2, "retried": 1, "failed": 0})
+        self.assertEqual(
+            sorted(message.to[0] for message in mail.outbox),
+            ["ops@example.com", "qa@example.com"],
+        )
+        for entry in (sent, also_sent):
+            entry.refresh_from_db()
+            self.assertEqual(entry.status, NotificationOutbox.Status.SENT)
+        refused.refresh_from_db()
+        self.assertEqual(refused.status, NotificationOutbox.Status.PENDING)
+        self.assertIn("SMTPRecipientsRefused", refused.last_error)
+
+        # The retry only sends the refused message again.
+        NotificationOutbox.objects.filter(pk=refused.pk).update(
+            next_attempt_at=timezone.now()
+        )
+        with self.assertLogs("monitoring.dispatcher", "WARNING"):
+            self.dispatcher.dispatch_once()
+        self.assertEqual(len(mail.outbox), 2)
+
+    def test_unconfigured_channel_fails_at_once(self):
+        entry = self.queue("telegram")
+        with self.assertLogs("monitoring.dispatcher", "WARNING") as logs:
+            counts = self.dispatcher.dispatch_once()
+        self.assertIn("Telegram bot token or chat id not set", logs.output[0])
+        self.assertEqual(counts, {"sent": 0, "retried": 0, "failed": 1})
+        entry.refresh_from_db()
+        self.assertEqual(entry.status, NotificationOutbox.Status.FAILED)
+        self.assertEqual(entry.attempts, 1)
+        self.assertIn("not set", entry.last_error)
+
+    def test_dispatcher_survives_errors(self):
+        stop = threading.Event()
+        calls = []
+
+        def dispatch_once():
+            calls.append(None)
+            if len(calls) == 1:
+                raise OperationalError("database is down")
+            stop.set()
+            return {"sent": 0, "retried": 0, "failed": 0}
+
+        with mock.patch.object(
+            self.dispatcher, "dispatch_once", dispatch_once
+        ), self.assertLogs("monitoring.dispatcher", "ERROR") as logs:
+            self.dispatcher.run_forever(interval=0.001, stop=stop)
+        self.assertEqual(len(calls), 2)
+        self.assertIn("Dispatching notifications failed", logs.output[0])
+
+
+class SpoolTests(TestCase):
+    def setUp(self):
+        Sensor.objects.create(
+            name="Spool", serial_number="SPOOL-1", token="spool-token"
+        )
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        self.spool = IngestSpool(
+            self.directory,
+            segment_bytes=64 * 1024,
+            segment_seconds=3600,
+            sync_records=1,
+            sync_interval=3600,
+        )
+        self.addCleanup(self.spool._abandon)
+        self.loader = SpoolLoader(self.directory, batch_size=2, segment_seconds=3600)
+        self.start = timezone.now() - timedelta(hours=1)
+
+    def append(self, *minutes):
+        for minute in minutes:
+            self.spool.append_reading(
+                sensor_token="spool-token",
+                temperature=4.5,
+                humidity=60,
+                recorded_at=self.start + timedelta(minutes=minute),
+            )
+
+    def files(self):
+        return sorted(path.suffix for path in self.directory.iterdir())
+
+    def test_loads_an_open_segment_incrementally(self):
+        self.append(0, 1, 2)
+        self.assertEqual(self.loader.drain_once(), 3)
+        self.append(3)
+        # Resumes at the committed offset: nothing is stored twice.
+        self.assertEqual(self.loader.drain_once(), 1)
+        self.assertEqual(self.loader.drain_once(), 0)
+        self.assertEqual(Measurement.objects.count(), 4)
+        self.assertEqual(self.files(), [".open"])
+
+        self.spool.close()
+        self.assertEqual(self.loader.drain_once(), 0)
+        self.assertEqual(self.files(), [])
+        self.assertFalse(SpoolCursor.objects.exists())
+
+    def test_stalled_writer_keeps_its_segment(self):
+        self.append(0)
+        self.loader.abandon_after = -1
+        self.loader.drain_once()
+        self.assertEqual(self.files(), [".open"])
+        self.append(1)
+        self.spool.close()
+        self.loader.drain_once()
+        self.assertEqual(Measurement.objects.count(), 2)
+        self.assertEqual(self.files(), [])
+
+    def test_segment_of_a_dead_writer_is_reclaimed(self):
+        self.append(0, 1)
+        # What the kernel does when the writer process dies.
+        self.spool._abandon()
+        self.loader.abandon_after = -1
+        self.assertEqual(self.loader.drain_once(), 2)
+        self.assertEqual(self.files(), [])
+
+    def test_new_segment_after_an_io_error(self):
+        self.append(0)
+        with mock.patch.object(
+            self.spool._segment, "sync", side_effect=OSError("disk gone")
+        ):
+            with self.assertRaises(OSError):
+                self.append(1)
+        self.append(2)
+        self.spool.close()
+        self.assertEqual(self.files(), [".open", ".seg"])
+        self.loader.abandon_after = -1
+        self.loader.drain_once()
+        self.assertEqual(Measurement.objects.count(), 3)
+        self.assertEqual(self.files(), [])
+
+    def test_flusher_survives_errors(self):
+        self.spool.sync_interval = 0.001
+        with mock.patch.object(
+            self.spool, "_flush", side_effect=OSError("disk gone")
+        ) as flush, self.assertLogs("monitoring.spool", "ERROR"):
+            self.append(0)
+            deadline = time.monotonic() + 5
+            while flush.call_count < 3 and time.monotonic() < deadline:
+                time.sleep(0.01)
+        self.assertGreaterEqual(flush.call_count, 3)
+
+    def test_poison_records_are_dead_lettered(self):
+        self.append(0)
+        self.spool.append(
+            {
+                "sensor_token": "spool-token",
+                "temperature": 4.5,
+                "humidity": 60,
+                "recorded_at": "yesterday",
+                "raw_payload": {},
+            }
+        )
+        self.spool.append(
+            {
+                "sensor_token": "spool-token",
+                "temperature": float("nan"),
+                "humidity": 60,
+                "recorded_at": self.start.isoformat(),
+                "raw_payload": {},
+            }
+        )
+        self.append(1, 2)
+        self.spool.close()
+
+        with self.assertLogs("monitoring.spool", "ERROR"):
+            self.assertEqual(self.loader.drain_once(), 5)
+        self.assertEqual(Measurement.objects.count(), 3)
+        self.assertEqual(self.loader.dead_lettered, 2)
+        self.assertEqual(self.files(), [".jsonl"])
+        entries = [
+            json.loads(line)
+            for line in (self.directory / DEAD_LETTER_NAME).read_text().splitlines()
+        ]
+        self.assertEqual(
+            [entry["record"]["recorded_at"] for entry in entries],
+            ["yesterday", self.start.isoformat()],
+        )
+
+    def test_loader_survives_errors(self):
+        stop = threading.Event()
+        calls = []
+
+        def drain_once():
+            calls.append(None)
+            if len(calls) == 1:
+                raise OperationalError("database is down")
+            stop.set()
+            return 0
+
+        with mock.patch.object(self.loader, "drain_once", drain_once), self.assertLogs(
+            "monitoring.spool", "ERROR"
+        ):
+            self.loader.run_forever(interval=0.001, stop=stop)
+        self.assertEqual(len(calls), 2)
+
+    def test_batch_endpoint_spools(self):
+        client = APIClient()
+        with override_settings(INGEST_MODE="spool"), mock.patch(
+            "monitoring.views.ingest_spool", self.spool
+        ):
+            response = client.post(
+                "/api/ingest/batch/",
+                [
+                    {"sensor_token": "spool-token", "temperature": 4.5, "humidity": 60},
+                    {"sensor_token": "spool-token", "temperature": 5.5, "humidity": 60},
+                    {"sensor_token": "unknown", "temperature": 4.5, "humidity": 60},
+                ],
+                format="json",
+            )
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(
+            [item["status"] for item in response.data["results"]],
+            ["queued", "queued", "rejected"],
+        )
+        self.assertEqual(response.data["queued"], 2)
+        self.assertFalse(Measurement.objects.exists())
+        self.assertEqual(self.loader.drain_once(), 2)
+        self.assertEqual(Measurement.objects.count(), 2)
+
+
+@override_settings(ALERT_INCIDENT_MODE=True)
+class IncidentTests(TestCase):
+    def setUp(self):
+        self.sensor = Sensor.objects.create(
+            name="Incident", serial_number="INCIDENT-1", token="incident-token"
+        )
+        rule_index.invalidate()
+        self.addCleanup(rule_index.invalidate)
+        self.start = timezone.now() - timedelta(hours=1)
+
+    def store(self, minute, temperature):
+        reading = IngestReading(
+            sensor=self.sensor,
+            temperature=temperature,
+            humidity=50,
+            recorded_at=self.start + timedelta(minutes=minute),
+        )
+        return store_measurements([reading])[0]
+
+    def test_breaches_update_the_open_incident(self):
+        first = self.store(0, 10).alerts[0]
+        self.assertEqual(self.store(5, 12).alerts[0].id, first.id)
+        self.store(10, 9)
+
+        alert = Alert.objects.get()
+        self.assertEqual(alert.occurrences, 3)
+        self.assertEqual(float(alert.peak_temperature), 12)
+        self.assertEqual(alert.last_seen_at, self.start + timedelta(minutes=10))
+        self.assertEqual(alert.tickets.count(), 1)
+        self.assertEqual(AuditLog.objects.filter(action="alert.created").count(), 1)
+
+    def test_back_in_range_resolves_the_incident(self):
+        alert = self.store(0, 10).alerts[0]
+        # Late normal readings do not resolve a newer breach.
+        self.store(-5, 4)
+        self.assertIn(Alert.objects.get().status, OPEN_ALERT_STATUSES)
+
+        self.store(5, 4)
+        alert.refresh_from_db()
+        self.assertEqual(alert.status, Alert.Status.RESOLVED)
+        self.assertEqual(alert.resolved_at, self.start + timedelta(minutes=5))
+        self.assertTrue(
+            AuditLog.objects.filter(
+                action="alert.autoresolved", target_id=str(alert.id)
+            ).exists()
+        )
+        self.assertNotEqual(self.store(10, 10).alerts[0].id, alert.id)
+        self.assertEqual(Alert.objects.count(), 2)
+
+    @unittest.skipUnless(connection.features.has_select_for_update, "needs row locks")
+    def test_locks_the_sensor_rows(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.store(0, 10)
+        self.assertTrue(
+            any(
+                '"monitoring_sensor"' in query["sql"] and "FOR UPDATE" in query["sql"]
+                for query in queries.captured_queries
+            )
+        )
+
+
+class BinaryReadingTests(TestCase):
+    def setUp(self):
+        self.sensor = Sensor.objects.create(
+            name="Binary", serial_number="BINARY-1", token="binary-token"
+        )
+        self.start = (timezone.now() - timedelta(hours=1)).replace(microsecond=0)
+        self.readings = [
+            (self.start, 4.5, 61.2),
+            (self.start + timedelta(seconds=90), -18.25, 0),
+            (self.start + timedelta(minutes=20), 7.99, 99.99),
+        ]
+
+    def test_round_trip(self):
+        decoded = decode_readings(encode_readings("binary-token", self.readings))
+        self.assertEqual(
+            decoded,
+            [
+                {
+                    "sensor_token": "binary-token",
+                    "temperature": temperature,
+                    "humidity": humidity,
+                    "recorded_at": recorded_at,
+                }
+                for recorded_at, temperature, humidity in self.readings
+            ],
+        )
+
+    def test_sequence_numbers(self):
+        packet = encode_readings("binary-token", self.readings, sequence=41)
+        self.assertTrue(packet[3] & FLAG_SEQUENCE)
+        self.assertEqual(
+            [reading["sequence"] for reading in decode_readings(packet)], [41, 42, 43]
+        )
+
+    def test_malformed_packets(self):
+        packet = encode_readings("binary-token", self.readings)
+        for payload, message in (
+            (packet[: HEADER.size - 1], "shorter than its header"),
+            (b"XX" + packet[2:], "unknown packet format"),
+            (packet[:-1], "expected 3 readings"),
+            (packet + b"\0", "expected 3 readings"),
+        ):
+            with self.subTest(message=message):
+                with self.assertRaisesMessage(ValueError, message):
+                    decode_readings(payload)
+        with self.assertRaises(ValueError):
+            encode_readings("binary-token", list(reversed(self.readings)))
+
+    def test_batch_endpoint(self):
+        client = APIClient()
+        response = client.post(
+            "/api/ingest/batch/",
+            encode_readings("binary-token", self.readings, sequence=1),
+            content_type=MEDIA_TYPE,
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(
+            list(
+                Measurement.objects.order_by("recorded_at").values_list(
+                    "sequence", "recorded_at"
+                )
+            ),
+            [(index + 1, item[0]) for index, item in enumerate(self.readings)],
+        )
+
+        response = client.post("/api/ingest/batch/", b"CC\x01", content_type=MEDIA_TYPE)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("Binary packet error", response.data["detail"])
+
+    def test_single_reading_endpoint(self):
+        client = APIClient()
+        response = client.post(
+            "/api/ingest/",
+            encode_readings("binary-token", self.readings[:1]),
+            content_type=MEDIA_TYPE,
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+        response = client.post(
+            "/api/ingest/",
+            encode_readings("binary-token", self.readings[1:]),
+            content_type=MEDIA_TYPE,
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Measurement.objects.count(), 1)
+
+
+class IngestThrottlingTests(TestCase):
+    def setUp(self):
+        for token in ("throttle-a", "throttle-b"):
+            Sensor.objects.create(name=token, serial_number=token, token=token)
+        for name, value in (
+            ("store", LocalBucketStore(max_size=10)),
+            ("burst", 3),
+            ("rate", 6 / 60),
+        ):
+            patcher = mock.patch.object(ingest_limiter, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.client = APIClient()
+
+    def ingest(self, token, url="/api/ingest/"):
+        return self.client.post(
+            url,
+            {"sensor_token": token, "temperature": 4.5, "humidity": 60},
+            format="json",
+        )
+
+    def test_token_is_throttled_after_its_burst(self):
+        throttled = ingest_limiter.throttled
+        for url in ("/api/ingest/", "/api/ingest/fast/", "/api/ingest/"):
+            self.assertEqual(self.ingest("throttle-a", url).status_code, 201)
+        for url in ("/api/ingest/", "/api/ingest/fast/"):
+            with self.subTest(url=url):
+                response = self.ingest("throttle-a", url)
+                self.assertEqual(response.status_code, 429)
+                self.assertEqual(response["Retry-After"], "10")
+        self.assertEqual(ingest_limiter.throttled - throttled, 2)
+        # Other sensors keep their own bucket.
+        self.assertEqual(self.ingest("throttle-b").status_code, 201)
+        self.assertEqual(Measurement.objects.count(), 4)
+
+    def test_batch_spends_one_request_per_token(self):
+        readings = [
+            {"sensor_token": token, "temperature": 4.5, "humidity": 60}
+            for token in ("throttle-a", "throttle-a", "throttle-b")
+        ]
+        for _ in range(3):
+            response = self.client.post("/api/ingest/batch/", readings, format="json")
+            self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.ingest("throttle-b").status_code, 429)
+        response = self.client.post("/api/ingest/batch/", readings, format="json")
+        self.assertEqual(response.status_code, 429)
+
+    def test_throttled_batch_spends_no_token(self):
+        for _ in range(3):
+            self.assertEqual(self.ingest("throttle-b").status_code, 201)
+        readings = [
+            {"sensor_token": token, "temperature": 4.5, "humidity": 60}
+            for token in ("throttle-a", "throttle-b")
+        ]
+        response = self.client.post("/api/ingest/batch/", readings, format="json")
+        self.assertEqual(response.status_code, 429)
+        for _ in range(3):
+            self.assertEqual(self.ingest("throttle-a").status_code, 201)
+
+    def test_stores_take_from_all_buckets_or_none(self):
+        for store in (LocalBucketStore(max_size=10), CacheBucketStore("default")):
+            with self.subTest(store=type(store).__name__):
+                a, b = uuid.uuid4().hex, uuid.uuid4().hex
+                self.assertEqual(store.take([a], capacity=1, rate=0.1), 0)
+                self.assertAlmostEqual(
+                    store.take([b, a], capacity=1, rate=0.1), 10, delta=0.1
+                )
+                self.assertEqual(store.take([b], capacity=1, rate=0.1), 0)
+
+    def test_disabled_without_a_refill_rate(self):
+        with mock.patch.object(ingest_limiter, "rate", 0):
+            for _ in range(5):
+                self.assertEqual(self.ingest("throttle-a").status_code, 201)
+
+    def test_sheds_writes_when_overloaded(self):
+        shed = ingest_limiter.shed
+        with mock.patch.object(ingest_limiter, "max_inflight", 1), mock.patch.object(
+            ingest_limiter, "inflight", 1
+        ):
+            for url in ("/api/ingest/", "/api/ingest/fast/"):
+                with self.subTest(url=url):
+                    response = self.ingest("throttle-a", url)
+                    self.assertEqual(response.status_code, 503)
+                    self.assertEqual(response["Retry-After"], "1")
+        self.assertEqual(ingest_limiter.shed - shed, 2)
+        self.assertFalse(Measurement.objects.exists())
+
+    def test_sheds_writes_when_the_database_is_busy(self):
+        database = DatabaseLoad(interval=0)
+        database.active = 40
+        readings = [
+            {"sensor_token": "throttle-a", "temperature": 4.5, "humidity": 60},
+            {"sensor_token": "throttle-b", "temperature": 4.5, "humidity": 60},
+        ]
+        with mock.patch.object(ingest_limiter, "database", database), mock.patch.object(
+            ingest_limiter, "max_database_active", 40
+        ):
+            response = self.client.post("/api/ingest/batch/", readings, format="json")
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response["Retry-After"], "1")
+            database.active = 39
+            self.assertEqual(self.ingest("throttle-a").status_code, 201)
+
+
+class RollupTests(TestCase):
+    def setUp(self):
+        self.sensor = Sensor.objects.create(
+            name="Rollup", serial_number="ROLLUP-1", token="rollup-token"
+        )
+        rule_index.invalidate()
+        self.addCleanup(rule_index.invalidate)
+        self.day = (timezone.now() - timedelta(days=2)).replace(
+            hour=0, minute=0, second=0, microsecond=0
+        )
+
+    def store(self, *readings):
+        return store_measurements(
+            [
+                IngestReading(
+                    sensor=self.sensor,
+                    temperature=temperature,
+                    humidity=50,
+                    recorded_at=self.day + timedelta(minutes=minute),
+                )
+                for minute, temperature in readings
+            ]
+        )
+
+    def rollups(self):
+        return {
+            (rollup.resolution, rollup.bucket): (
+                rollup.count,
+                rollup.out_of_range_count,
+                float(rollup.temperature_min),
+                float(rollup.temperature_max),
+                float(rollup.temperature_sum),
+            )
+            for rollup in MeasurementRollup.objects.all()
+        }
+
+    def test_readings_are_folded_into_their_buckets(self):
+        self.store((61, 4), (62, 9), (90, 5))
+        # Late and out of order: lands in buckets that already exist.
+        self.store((63, 1), (0, 6))
+        # Duplicates are not counted again.
+        self.store((62, 9))
+
+        hour = MeasurementRollup.Resolution.HOUR
+        five = MeasurementRollup.Resolution.FIVE_MINUTES
+        day = MeasurementRollup.Resolution.DAY
+        rollups = self.rollups()
+        self.assertEqual(rollups[(day, self.day)], (5, 2, 1, 9, 25))
+        self.assertEqual(rollups[(hour, self.day)], (1, 0, 6, 6, 6))
+        self.assertEqual(
+            rollups[(hour, self.day + timedelta(hours=1))], (4, 2, 1, 9, 19)
+        )
+        self.assertEqual(
+            rollups[(five, self.day + timedelta(minutes=60))], (3, 2, 1, 9, 14)
+        )
+        self.assertEqual(len(rollups), 3 + 2 + 1)
+
+    def test_rebuild_matches_the_incremental_rollups(self):
+        self.store((61, 4), (62, 9), (90, 5), (63, 1), (0, 6), (24 * 60 + 5, 3))
+        incremental = self.rollups()
+        MeasurementRollup.objects.update(count=0)
+
+        read = rebuild_rollups(self.day, self.day + timedelta(hours=2))
+        self.assertEqual(read, 5)
+        # The whole first day is recomputed, the next one is left alone.
+        next_day = self.day + timedelta(days=1)
+        rebuilt = self.rollups()
+        for key, value in incremental.items():
+            with self.subTest(key=key):
+                if key[1] < next_day:
+                    self.assertEqual(rebuilt[key], value)
+                else:
+                    self.assertEqual(rebuilt[key][0], 0)
+
+
+    def test_rebuild_keeps_rollups_of_pruned_readings(self):
+        self.store((0, 4), (24 * 60 + 5, 3), (2 * 24 * 60 + 5, 5))
+        before = self.rollups()
+        # What prune_measurements does to a month: raw rows gone, rollups kept.
+        next_day = self.day + timedelta(days=1)
+        Measurement.objects.filter(recorded_at__lt=next_day).delete()
+
+        with CaptureQueriesContext(connection) as queries:
+            read = rebuild_rollups(self.day, self.day + timedelta(days=3))
+        self.assertEqual(read, 2)
+        self.assertEqual(self.rollups(), before)
+        self.assertFalse(
+            any("LOCK TABLE" in query["sql"] for query in queries.captured_queries)
+        )
+
+    def test_rebuild_adds_no_empty_buckets(self):
+        other = Sensor.objects.create(name="Other", serial_number="ROLLUP-2")
+        self.store((0, 4))
+        rebuild_rollups(self.day - timedelta(days=1), self.day + timedelta(days=2))
+        self.assertEqual(len(self.rollups()), 3)
+        self.assertFalse(MeasurementRollup.objects.filter(count=0).exists())
+        self.assertFalse(other.rollups.exists())
+
+    def test_api_edits_adjust_rollups_in_place(self):
+        results = self.store((61, 4), (62, 9), (90, 5))
+        admin = User.objects.create_superuser("rollup", "rollup@example.com", "x")
+        client = APIClient()
+        client.force_authenticate(admin)
+        hour = MeasurementRollup.Resolution.HOUR
+        five = MeasurementRollup.Resolution.FIVE_MINUTES
+        day = MeasurementRollup.Resolution.DAY
+        one, three = self.day + timedelta(hours=1), self.day + timedelta(hours=3)
+
+        # Deleting the maximum recomputes it from the remaining readings.
+        response = client.delete(f"/api/measurements/{results[1].measurement.id}/")
+        self.assertEqual(response.status_code, 204)
+        rollups = self.rollups()
+        self.assertEqual(rollups[(hour, one)], (2, 0, 4, 5, 9))
+        self.assertEqual(rollups[(day, self.day)], (2, 0, 4, 5, 9))
+
+        # Moving the last reading of a bucket to another hour empties it.
+        response = client.patch(
+            f"/api/measurements/{results[2].measurement.id}/",
+            {"recorded_at": three.isoformat()},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        rollups = self.rollups()
+        self.assertNotIn((five, self.day + timedelta(minutes=90)), rollups)
+        self.assertEqual(rollups[(hour, one)], (1, 0, 4, 4, 4))
+        self.assertEqual(rollups[(hour, three)], (1, 0, 5, 5, 5))
+        self.assertEqual(rollups[(day, self.day)], (2, 0, 4, 5, 9))
+
+        # The incremental result is what a rebuild computes.
+        rebuild_rollups(self.day, self.day)
+        self.assertEqual(self.rollups(), rollups)
+
+
+@unittest.skipUnless(connection.vendor == "postgresql", "partitions are PostgreSQL's")
+class PartitionTests(TestCase):
+    def setUp(self):
+        self.sensor = Sensor.objects.create(
+            name="Partitioned", serial_number="PART-1", token="part-token"
+        )
+        now = timezone.now()
+        self.old_month = partitions.add_months(partitions.month_start(now), -2)
+        self.old = [
+            Measurement.objects.create(
+                sensor=self.sensor,
+                temperature=4,
+                humidity=50,
+                recorded_at=self.old_month + timedelta(days=day),
+                sequence=day,
+            )
+            for day in (1, 2)
+        ]
+        self.recent = Measurement.objects.create(
+            sensor=self.sensor, temperature=12, humidity=50, recorded_at=now
+        )
+        self.old_alert = Alert.objects.create(
+            sensor=self.sensor, measurement=self.old[0], message="Too warm"
+        )
+        self.ticket = Ticket.objects.create(alert=self.old_alert, title="Check")
+        self.recent_alert = Alert.objects.create(
+            sensor=self.sensor, measurement=self.recent, message="Too warm"
+        )
+        # Deferred foreign key checks would block ALTER TABLE.
+        with connection.cursor() as cursor:
+            cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+
+    def query(self, sql, params=()):
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+    def constraints(self):
+        return dict(
+            self.query(
+                "SELECT conname, contype FROM pg_constraint "
+                "WHERE conrelid = to_regclass(%s)",
+                [partitions.TABLE],
+            )
+        )
+
+    def indexes(self, table=partitions.TABLE):
+        return {
+            name
+            for (name,) in self.query(
+                "SELECT index_class.relname FROM pg_index "
+                "JOIN pg_class index_class ON index_class.oid = pg_index.indexrelid "
+                "WHERE pg_index.indrelid = to_regclass(%s)",
+                [table],
+            )
+        }
+
+    def rows_in(self, table):
+        return {
+            measurement_id
+            for (measurement_id,) in self.query(
+                f"SELECT id FROM {connection.ops.quote_name(table)}"
+            )
+        }
+
+    def test_convert_keeps_rows_constraints_and_indexes(self):
+        constraints = self.constraints()
+        indexes = self.indexes() - set(partitions.PARTITION_UNIQUE_INDEXES)
+
+        converted = partitions.convert_to_partitioned(months_ahead=1)
+
+        self.assertTrue(partitions.is_partitioned())
+        self.assertEqual(converted[0], partitions.partition_for(self.old_month))
+        self.assertEqual(
+            set(Measurement.objects.values_list("id", flat=True)),
+            {self.recent.id, *(measurement.id for measurement in self.old)},
+        )
+        self.assertEqual(self.constraints(), constraints)
+        self.assertLessEqual(indexes, self.indexes())
+        ((primary_key,),) = self.query(
+            "SELECT pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = to_regclass(%s) AND contype = 'p'",
+            [partitions.TABLE],
+        )
+        self.assertEqual(primary_key, "PRIMARY KEY (id, recorded_at)")
+        self.assertEqual(
+            self.query(
+                "SELECT conname FROM pg_constraint WHERE confrelid = to_regclass(%s)",
+                [partitions.TABLE],
+            ),
+            [],
+        )
+        self.assertEqual(
+            Alert.objects.get(id=self.old_alert.id).measurement_id, self.old[0].id
+        )
+        # Sequences stay unique within each month.
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Measurement.objects.create(
+                sensor=self.sensor,
+                temperature=4,
+                humidity=50,
+                recorded_at=self.old_month + timedelta(days=3),
+                sequence=1,
+            )
+
+    def test_create_partition_moves_rows_out_of_default(self):
+        partitions.convert_to_partitioned(months_ahead=0)
+        future = partitions.add_months(partitions.month_start(timezone.now()), 6)
+        later = Measurement.objects.create(
+            sensor=self.sensor, temperature=4, humidity=50, recorded_at=future
+        )
+        self.assertEqual(self.rows_in(partitions.DEFAULT_PARTITION), {later.id})
+
+        partition = partitions.create_partition(future)
+
+        self.assertEqual(partition, partitions.partition_for(future))
+        self.assertIn(partition, partitions.list_partitions())
+        self.assertEqual(self.rows_in(partitions.DEFAULT_PARTITION), set())
+        self.assertEqual(self.rows_in(partition.name), {later.id})
+        # Index names are cut to PostgreSQL's 63 characters.
+        self.assertTrue(
+            any(
+                name.startswith(f"{partition.name}_unique_measurement_sensor")
+                for name in self.indexes(partition.name)
+            )
+        )
+        self.assertIsNone(partitions.create_partition(future))
+
+    def test_detach_partition_archives_and_cascades(self):
+        partitions.convert_to_partitioned(months_ahead=0)
+        partition = partitions.partition_for(self.old_month)
+        archive_dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, archive_dir)
+
+        archive = partitions.detach_partition(partition, archive_dir=archive_dir)
+
+        self.assertEqual(archive, archive_dir / f"{partition.name}.csv.gz")
+        with gzip.open(archive, "rt", newline="") as rows:
+            archived = list(csv.DictReader(rows))
+        self.assertEqual(
+            {row["id"] for row in archived},
+            {str(measurement.id) for measurement in self.old},
+        )
+        self.assertNotIn(partition, partitions.list_partitions())
+        self.assertEqual(
+            self.query("SELECT to_regclass(%s)", [partition.name]), [(None,)]
+        )
+        self.assertEqual(
+            list(Measurement.objects.values_list("id", flat=True)), [self.recent.id]
+        )
+        self.assertEqual(
+            list(Alert.objects.values_list("id", flat=True)), [self.recent_alert.id]
+        )
+        self.assertFalse(Ticket.objects.filter(id=self.ticket.id).exists())
+
+
+class FastPathParityTests(TestCase):
+    def test_same_validation_as_the_serializer(self):
+        for case in COMPATIBILITY_CASES:
+            with self.subTest(case=case):
+                serializer = MeasurementIngestSerializer(data=case)
+                expected = (
+                    (serializer.data, None)
+                    if serializer.is_valid()
+                    else (None, json.loads(json.dumps(serializer.errors)))
+                )
+                values, errors = INGEST_SCHEMA.validate(case)
+                represented = INGEST_SCHEMA.represent(values) if values else None
+                self.assertEqual((represented, errors), expected)
+
+    def test_fast_endpoint_rejects_non_finite_values(self):
+        Sensor.objects.create(name="Parity", serial_number="PARITY-1", token="parity")
+        response = APIClient().post(
+            "/api/ingest/fast/",
+            {"sensor_token": "parity", "temperature": "nan", "humidity": 50},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.json(), {"temperature": ["A valid number is required."]}
+        )
+
+
+class AsyncIngestTests(TestCase):
+    def setUp(self):
+        Sensor.objects.create(
+            name="Async", serial_number="ASYNC-1", token="async-token"
+        )
+        Sensor.objects.create(
+            name="Async retired",
+            serial_number="ASYNC-2",
+            token="async-retired",
+            is_active=False,
+        )
+        self.recorded_at = (timezone.now() - timedelta(hours=1)).replace(microsecond=0)
+
+    def reading(self, **values):
+        return {
+            "sensor_token": "async-token",
+            "temperature": 4.5,
+            "humidity": 60,
+            "recorded_at": self.recorded_at.isoformat(),
+            **values,
+        }
+
+    async def post(self, payload):
+        response = await AsyncClient().post(
+            "/api/ingest/async/", payload, content_type="application/json"
+        )
+        return response.status_code, json.loads(response.content)
+
+    async def test_create_and_duplicate(self):
+        code, body = await self.post(self.reading())
+        self.assertEqual(code, 201, body)
+        measurement = await Measurement.objects.aget()
+        self.assertEqual(body["measurement_id"], str(measurement.id))
+        self.assertEqual(measurement.recorded_at, self.recorded_at)
+
+        code, body = await self.post(self.reading(temperature=5))
+        self.assertEqual(code, 200, body)
+        self.assertTrue(body["duplicate"])
+        self.assertEqual(await Measurement.objects.acount(), 1)
+
+    async def test_rejected_readings(self):
+        cases = [
+            (self.reading(temperature="nan"), 400, "temperature"),
+            (self.reading(sensor_token="unknown"), 400, "detail"),
+            (self.reading(sensor_token="async-retired"), 403, "detail"),
+            ("{", 400, "detail"),
+        ]
+        for payload, expected_code, field in cases:
+            with self.subTest(payload=payload):
+                code, body = await self.post(payload)
+                self.assertEqual(code, expected_code)
+                self.assertEqual(list(body), [field])
+        self.assertEqual(await Measurement.objects.acount(), 0)
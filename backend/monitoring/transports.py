@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import smtplib
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional, Sequence
+
+import requests
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from requests.adapters import HTTPAdapter
+
+
+class TransportMetrics:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+        self.messages = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    @contextmanager
+    def measure(self, messages: int = 1):
+        started = time.perf_counter()
+        failed = False
+        try:
+            yield
+        except Exception:
+            failed = True
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.calls += 1
+                self.messages += messages
+                self.errors += int(failed)
+                self.total_seconds += elapsed
+                self.max_seconds = max(self.max_seconds, elapsed)
+
+    def add_errors(self, errors: int) -> None:
+        with self._lock:
+            self.errors += errors
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "messages": self.messages,
+                "errors": self.errors,
+                "avg_ms": round(self.total_seconds / self.calls * 1000, 2)
+                if self.calls
+                else None,
+                "max_ms": round(self.max_seconds * 1000, 2),
+            }
+
+
+class HttpTransport:
+    """Keep-alive HTTP client shared by every notification of one channel type.
+
+    ``requests.Session`` pools connections per host, so once the TLS handshake
+    with an API has been paid the following notifications reuse the socket.
+    """
+
+    def __init__(self, *, pool_size: int, timeout: float) -> None:
+        self.timeout = timeout
+        self.metrics = TransportMetrics()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def post_json(
+        self, url: str, payload: dict, headers: Optional[dict] = None
+    ) -> requests.Response:
+        with self.metrics.measure():
+            response = self.session.post(
+                url, json=payload, headers=headers, timeout=self.timeout
+            )
+            response.raise_for_status()
+        return response
+
+    def close(self) -> None:
+        self.session.close()
+
+
+class SmtpTransport:
+    """Long-lived SMTP connection shared by every email notification.
+
+    The connection is opened on first use and reopened once if the server has
+    dropped it while idle.
+    """
+
+    def __init__(self) -> None:
+        self.metrics = TransportMetrics()
+        self._lock = threading.Lock()
+        self._connection = None
+
+    def _open(self):
+        if self._connection is None:
+            self._connection = get_connection(fail_silently=False)
+        self._connection.open()
+        return self._connection
+
+    def send_messages(self, messages: Sequence[EmailMessage]) -> int:
+        if not messages:
+            return 0
+        batch = list(messages)
+        with self._lock, self.metrics.measure(len(batch)):
+            try:
+                try:
+                    return self._open().send_messages(batch) or 0
+                except (smtplib.SMTPServerDisconnected, ConnectionError):
+                    self._close()
+                    return self._open().send_messages(batch) or 0
+            except Exception:
+                self._close()
+                raise
+
+    def send_each(self, messages: Sequence[EmailMessage]) -> list[Optional[Exception]]:
+        """Send ``messages`` one by one; the error of each, ``None`` once sent.
+
+        A message that fails does not stop the following ones, so a bad
+        recipient only fails (and retries) its own notification.
+        """
+        outcomes: list[Optional[Exception]] = []
+        if not messages:
+            return outcomes
+        with self._lock, self.metrics.measure(len(messages)):
+            for message in messages:
+                try:
+                    try:
+                        self._open().send_messages([message])
+                    except (smtplib.SMTPServerDisconnected, ConnectionError):
+                        self._close()
+                        self._open().send_messages([message])
+                except Exception as exc:
+                    self._close()
+                    outcomes.append(exc)
+                else:
+                    outcomes.append(None)
+        self.metrics.add_errors(sum(outcome is not None for outcome in outcomes))
+        return outcomes
+
+    def _close(self) -> None:
+        if self._connection is not None:
+            try:
+                self._connection.close()
+            except Exception:
+                pass
+            self._connection = None
+
+    def close(self) -> None:
+        with self._lock:
+            self._close()
+
+
+smtp_transport = SmtpTransport()
+http_transports = {
+    channel_type: HttpTransport(
+        pool_size=settings.NOTIFICATION_CHANNEL_CONCURRENCY.get(channel_type, 4),
+        timeout=settings.NOTIFICATION_HTTP_TIMEOUT_SECONDS,
+    )
+    for channel_type in ("telegram", "whatsapp", "webhook")
+}
+
+
+def transport_stats() -> dict:
+    stats = {"email": smtp_transport.metrics.snapshot()}
+    stats.update(
+        {name: transport.metrics.snapshot() for name, transport in http_transports.items()}
+    )
+    return stats
+
+
+def close_transports() -> None:
+    smtp_transport.close()
+    for transport in http_transports.values():
+        transport.close()
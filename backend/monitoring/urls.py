@@ -1,12 +1,18 @@
 from django.urls import include, path
+from django.views.decorators.csrf import csrf_exempt
 from rest_framework.routers import DefaultRouter
 
 from .views import (
     AlertRuleViewSet,
     AlertViewSet,
+    AsyncMeasurementIngestView,
     AuditLogViewSet,
+    DashboardSummaryView,
+    FastMeasurementIngestView,
+    MeasurementBatchIngestView,
     MeasurementIngestView,
     MeasurementViewSet,
+    MetricsView,
     SensorViewSet,
     TicketViewSet,
     UserViewSet,
@@ -23,6 +29,27 @@ router.register("users", UserViewSet, basename="user")
 
 urlpatterns = [
     path("ingest/", MeasurementIngestView.as_view(), name="measurement-ingest"),
+    path(
+        "ingest/async/",
+        csrf_exempt(AsyncMeasurementIngestView.as_view()),
+        name="measurement-ingest-async",
+    ),
+    path(
+        "ingest/fast/",
+        csrf_exempt(FastMeasurementIngestView.as_view()),
+        name="measurement-ingest-fast",
+    ),
+    path(
+        "ingest/batch/",
+        MeasurementBatchIngestView.as_view(),
+        name="measurement-ingest-batch",
+    ),
+    path("metrics/", MetricsView.as_view(), name="metrics"),
+    path(
+        "dashboard/summary/",
+        DashboardSummaryView.as_view(),
+        name="dashboard-summary",
+    ),
     path("", include(router.urls)),
 ]
 
@@ -1,29 +1,61 @@
+import copy
+from collections import Counter
+from typing import Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.db import transaction
 from django.utils import timezone
+from django.views import View
 from rest_framework import status, viewsets, mixins
 from rest_framework.decorators import action
-from rest_framework.permissions import AllowAny
+from rest_framework.exceptions import Throttled
+from rest_framework.permissions import AllowAny, IsAdminUser
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework.views import APIView
 
-from .models import Alert, AlertRule, AuditLog, Measurement, Sensor, Ticket
+from . import fastpath
+from .binary import BinaryReadings, BinaryReadingsParser
+from .audit import record_audit
+from .dashboard import get_summary
+from .excursions import excursion_tracker
+from .fastlist import FastListMixin
+from .fieldsets import SparseFieldsViewMixin
+from .models import Alert, AlertRule, AuditLog, Channel, Measurement, Sensor, Ticket
+from .pagination import KeysetPagination
 from .permissions import IsAdminOrReadOnly
+from .ratelimit import IngestOverloaded, SensorTokenThrottle, ingest_limiter
+from .response_cache import CachedResponseMixin
+from .rollups import add_to_rollups, remove_from_rollups
+from .rule_index import rule_index
+from .sensor_cache import sensor_cache
+from .sensor_states import rebuild_sensor_states
 from .serializers import (
     AlertRuleSerializer,
     AlertSerializer,
     AuditLogSerializer,
+    MeasurementBatchIngestSerializer,
     MeasurementIngestSerializer,
     MeasurementSerializer,
+    MeasurementSeriesQuerySerializer,
     SensorSerializer,
+    SensorStateListSerializer,
     TicketSerializer,
     UserSerializer,
 )
-from .services import record_audit, store_measurement
+from .series import build_series
+from .services import stamp_untimed, store_measurement, store_validated_readings
+from .spool import ingest_spool
+from .transports import transport_stats
 
 User = get_user_model()
 
 
-class SensorViewSet(viewsets.ModelViewSet):
+class SensorViewSet(
+    CachedResponseMixin, SparseFieldsViewMixin, viewsets.ModelViewSet
+):
     queryset = Sensor.objects.all()
     serializer_class = SensorSerializer
     permission_classes = [IsAdminOrReadOnly]
@@ -43,70 +75,362 @@ class SensorViewSet(viewsets.ModelViewSet):
         record_audit(action="sensor.deleted", actor=self.request.user, target=instance)
         super().perform_destroy(instance)
 
+    @action(detail=False, methods=["get"])
+    def states(self, request):
+        """Every sensor with its latest reading, in one query."""
+        sensors = self.filter_queryset(self.get_queryset()).select_related("state")
+        return Response(SensorStateListSerializer(sensors, many=True).data)
+
 
-class MeasurementViewSet(viewsets.ModelViewSet):
-    queryset = Measurement.objects.select_related("sensor")
+class MeasurementViewSet(
+    FastListMixin, SparseFieldsViewMixin, viewsets.ModelViewSet
+):
+    queryset = Measurement.objects.all()
     serializer_class = MeasurementSerializer
-    filterset_fields = ["sensor", "status"]
+    pagination_class = KeysetPagination
+    cursor_field = "recorded_at"
+    # Bounding recorded_at lets PostgreSQL skip monthly partitions.
+    filterset_fields = {
+        "sensor": ["exact"],
+        "status": ["exact"],
+        "recorded_at": ["gte", "lt"],
+    }
     search_fields = ["sensor__name"]
     ordering_fields = ["recorded_at"]
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
+        # validated_data holds the Sensor instance and Decimals, which do not
+        # fit in a JSONField; keep the submitted values instead.
+        raw_payload = {
+            name: request.data[name]
+            for name in serializer.validated_data
+            if name in request.data
+        }
         result = store_measurement(
             sensor=serializer.validated_data["sensor"],
             temperature=float(serializer.validated_data["temperature"]),
             humidity=float(serializer.validated_data["humidity"]),
             recorded_at=serializer.validated_data.get("recorded_at") or timezone.now(),
             actor=request.user,
-            raw_payload=serializer.validated_data,
+            raw_payload=raw_payload,
+            sequence=serializer.validated_data.get("sequence"),
         )
+        if result.duplicate:
+            return Response(
+                {"detail": "This reading is already recorded"},
+                status=status.HTTP_409_CONFLICT,
+            )
         output = self.get_serializer(result.measurement)
         headers = self.get_success_headers(output.data)
         return Response(output.data, status=status.HTTP_201_CREATED, headers=headers)
 
+    @action(detail=False, methods=["get"])
+    def series(self, request):
+        query = MeasurementSeriesQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+        series = build_series(
+            params["sensor"].id,
+            params["from"],
+            params["to"],
+            points=params["points"],
+            mode=params["mode"],
+        )
+        return Response(
+            {
+                "sensor": str(params["sensor"].id),
+                "from": params["from"],
+                "to": params["to"],
+                **series,
+            }
+        )
+
     def perform_update(self, serializer):
-        instance = serializer.save()
+        before = copy.copy(serializer.instance)
+        with transaction.atomic():
+            instance = serializer.save()
+            remove_from_rollups([before])
+            add_to_rollups([instance])
+        rebuild_sensor_states(list({before.sensor_id, instance.sensor_id}))
         record_audit(action="measurement.updated", actor=self.request.user, target=instance)
 
     def perform_destroy(self, instance):
         record_audit(action="measurement.deleted", actor=self.request.user, target=instance)
-        super().perform_destroy(instance)
+        with transaction.atomic():
+            super().perform_destroy(instance)
+            remove_from_rollups([instance])
+        rebuild_sensor_states([instance.sensor_id])
+
+
+def _sensor_error(sensor) -> Optional[tuple[dict, int]]:
+    if sensor is None:
+        return {"detail": "Unknown sensor token"}, status.HTTP_400_BAD_REQUEST
+    if not sensor.is_active:
+        return {"detail": "Sensor is inactive"}, status.HTTP_403_FORBIDDEN
+    return None
+
+
+def _ingest(sensor, values: dict, raw_payload: dict) -> tuple[dict, int]:
+    """Spool or store one validated reading; returns the response body and status.
+
+    Raises :class:`IngestOverloaded` when too many writes are already queued.
+    """
+    recorded_at = values.get("recorded_at") or timezone.now()
+    with ingest_limiter.write_slot():
+        return _spool_or_store(sensor, values, raw_payload, recorded_at)
+
+
+def _spool_or_store(sensor, values: dict, raw_payload: dict, recorded_at):
+    if settings.INGEST_MODE == "spool":
+        ingest_spool.append_reading(
+            sensor_token=sensor.token,
+            temperature=values["temperature"],
+            humidity=values["humidity"],
+            recorded_at=recorded_at,
+            raw_payload=raw_payload,
+            sequence=values.get("sequence"),
+        )
+        ingest_limiter.record(accepted=1)
+        return {"status": "queued"}, status.HTTP_202_ACCEPTED
+
+    result = store_measurement(
+        sensor=sensor,
+        temperature=values["temperature"],
+        humidity=values["humidity"],
+        recorded_at=recorded_at,
+        actor=None,
+        raw_payload=raw_payload,
+        sequence=values.get("sequence"),
+    )
+    ingest_limiter.record(accepted=1, duplicates=int(result.duplicate))
+    if result.duplicate:
+        return (
+            {"measurement_id": None, "alerts": [], "duplicate": True},
+            status.HTTP_200_OK,
+        )
+    return (
+        {
+            "measurement_id": result.measurement.id,
+            "alerts": [str(alert.id) for alert in result.alerts],
+        },
+        status.HTTP_201_CREATED,
+    )
+
+
+def _spool_validated_readings(items: list[tuple[dict, dict]]) -> list[dict]:
+    """Spool readings that passed the ingest schema, for ``INGEST_MODE=spool``.
+
+    Returns one outcome per item like :func:`store_validated_readings`, with
+    ``{"status": "queued"}`` for spooled readings.
+    """
+    sensors = sensor_cache.get_many(values["sensor_token"] for values, _ in items)
+    recorded_at = stamp_untimed(
+        [(values["sensor_token"], values.get("recorded_at")) for values, _ in items],
+        timezone.now(),
+    )
+    outcomes: list[dict] = []
+    for (values, raw_payload), timestamp in zip(items, recorded_at):
+        error = _sensor_error(sensors.get(values["sensor_token"]))
+        if error:
+            outcomes.append({"status": "rejected", "errors": error[0]})
+            continue
+        ingest_spool.append_reading(
+            sensor_token=values["sensor_token"],
+            temperature=values["temperature"],
+            humidity=values["humidity"],
+            recorded_at=timestamp,
+            raw_payload=raw_payload,
+            sequence=values.get("sequence"),
+        )
+        outcomes.append({"status": "queued"})
+    return outcomes
+
+
+INGEST_PARSER_CLASSES = [*api_settings.DEFAULT_PARSER_CLASSES, BinaryReadingsParser]
 
 
 class MeasurementIngestView(APIView):
     permission_classes = [AllowAny]
+    parser_classes = INGEST_PARSER_CLASSES
+    throttle_classes = [SensorTokenThrottle]
 
     def post(self, request):
-        serializer = MeasurementIngestSerializer(data=request.data)
+        data = request.data
+        if isinstance(data, BinaryReadings):
+            if len(data) != 1:
+                return Response(
+                    {"detail": "Send multi-reading packets to /api/ingest/batch/"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            data = data[0]
+        serializer = MeasurementIngestSerializer(data=data)
         serializer.is_valid(raise_exception=True)
+        sensor = sensor_cache.get(serializer.validated_data["sensor_token"])
+        body, code = _sensor_error(sensor) or _ingest(
+            sensor, serializer.validated_data, serializer.data
+        )
+        return Response(body, status=code)
+
+
+class FastMeasurementIngestView(View):
+    """:class:`MeasurementIngestView` without DRF request parsing and rendering.
+
+    The body is decoded with orjson and checked against
+    :data:`~monitoring.fastpath.INGEST_SCHEMA`, which returns the same errors
+    as the serializer, and the response is encoded directly.
+    """
+
+    http_method_names = ["post"]
+
+    def post(self, request):
         try:
-            sensor = Sensor.objects.get(token=serializer.validated_data["sensor_token"])
-        except Sensor.DoesNotExist:
-            return Response(
-                {"detail": "Unknown sensor token"}, status=status.HTTP_400_BAD_REQUEST
+            data = fastpath.parse_json(request.body)
+        except fastpath.ParseError as exc:
+            return fastpath.json_response(
+                {"detail": str(exc)}, status.HTTP_400_BAD_REQUEST
+            )
+        values, errors = fastpath.INGEST_SCHEMA.validate(data)
+        if errors:
+            return fastpath.json_response(errors, status.HTTP_400_BAD_REQUEST)
+        wait = ingest_limiter.check([values["sensor_token"]])
+        if wait:
+            return fastpath.exception_response(Throttled(wait))
+        sensor = sensor_cache.get(values["sensor_token"])
+        try:
+            body, code = _sensor_error(sensor) or _ingest(
+                sensor, values, fastpath.INGEST_SCHEMA.represent(values)
             )
+        except IngestOverloaded as exc:
+            return fastpath.exception_response(exc)
+        return fastpath.json_response(body, code)
 
-        result = store_measurement(
-            sensor=sensor,
-            temperature=serializer.validated_data["temperature"],
-            humidity=serializer.validated_data["humidity"],
-            recorded_at=serializer.validated_data.get("recorded_at") or timezone.now(),
-            actor=None,
-            raw_payload=serializer.validated_data,
-        )
+
+class AsyncMeasurementIngestView(View):
+    """Async twin of :class:`FastMeasurementIngestView` for ASGI deployments.
+
+    The sensor lookup uses the async ORM and the transactional write runs in
+    the thread pool, so one worker can hold many slow sensor connections open
+    without blocking. Notifications are delivered by the outbox dispatcher.
+    """
+
+    http_method_names = ["post"]
+
+    async def post(self, request):
+        try:
+            data = fastpath.parse_json(request.body)
+        except fastpath.ParseError as exc:
+            return fastpath.json_response(
+                {"detail": str(exc)}, status.HTTP_400_BAD_REQUEST
+            )
+        values, errors = fastpath.INGEST_SCHEMA.validate(data)
+        if errors:
+            return fastpath.json_response(errors, status.HTTP_400_BAD_REQUEST)
+        wait = ingest_limiter.check([values["sensor_token"]])
+        if wait:
+            return fastpath.exception_response(Throttled(wait))
+        sensor = await sensor_cache.aget(values["sensor_token"])
+        error = _sensor_error(sensor)
+        if error:
+            return fastpath.json_response(*error)
+        # The slot is taken before waiting for the database thread, so
+        # requests queued behind a slow database count towards the limit.
+        try:
+            with ingest_limiter.write_slot():
+                body, code = await sync_to_async(_spool_or_store)(
+                    sensor,
+                    values,
+                    fastpath.INGEST_SCHEMA.represent(values),
+                    values.get("recorded_at") or timezone.now(),
+                )
+        except IngestOverloaded as exc:
+            return fastpath.exception_response(exc)
+        return fastpath.json_response(body, code)
+
+
+class MeasurementBatchIngestView(APIView):
+    permission_classes = [AllowAny]
+    parser_classes = INGEST_PARSER_CLASSES
+    throttle_classes = [SensorTokenThrottle]
+
+    def post(self, request):
+        data = request.data
+        if isinstance(data, list):
+            data = {"readings": data}
+        envelope = MeasurementBatchIngestSerializer(data=data)
+        envelope.is_valid(raise_exception=True)
+        items = envelope.validated_data["readings"]
+
+        results: list[dict] = [{"index": index} for index in range(len(items))]
+        indexes: list[int] = []
+        validated: list[tuple[dict, dict]] = []
+        for index, item in enumerate(items):
+            values, errors = fastpath.INGEST_SCHEMA.validate(item)
+            if errors:
+                results[index].update(status="rejected", errors=errors)
+            else:
+                indexes.append(index)
+                validated.append((values, fastpath.INGEST_SCHEMA.represent(values)))
+
+        spool = settings.INGEST_MODE == "spool"
+        if validated:
+            with ingest_limiter.write_slot(len(validated)):
+                if spool:
+                    outcomes = _spool_validated_readings(validated)
+                else:
+                    outcomes = store_validated_readings(validated)
+            for index, outcome in zip(indexes, outcomes):
+                results[index].update(outcome)
+
+        counts = Counter(result["status"] for result in results)
+        stored = counts["created"] + counts["duplicate"] + counts["queued"]
+        ingest_limiter.record(accepted=stored, duplicates=counts["duplicate"])
+        if not stored:
+            response_status = status.HTTP_400_BAD_REQUEST
+        elif counts["rejected"]:
+            response_status = status.HTTP_207_MULTI_STATUS
+        elif spool:
+            response_status = status.HTTP_202_ACCEPTED
+        else:
+            response_status = status.HTTP_201_CREATED
+        body = {
+            "created": counts["created"],
+            "duplicates": counts["duplicate"],
+            "rejected": counts["rejected"],
+            "results": results,
+        }
+        if spool:
+            body["queued"] = counts["queued"]
+        return Response(body, status=response_status)
+
+
+class MetricsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
         return Response(
             {
-                "measurement_id": result.measurement.id,
-                "alerts": [str(alert.id) for alert in result.alerts],
-            },
-            status=status.HTTP_201_CREATED,
+                "sensor_cache": sensor_cache.stats(),
+                "rule_index": rule_index.stats(),
+                "excursions": excursion_tracker.stats(),
+                "transports": transport_stats(),
+                "spool": ingest_spool.stats(),
+                "ingest": ingest_limiter.stats(),
+            }
         )
 
 
-class AlertRuleViewSet(viewsets.ModelViewSet):
-    queryset = AlertRule.objects.select_related("sensor")
+class DashboardSummaryView(APIView):
+    def get(self, request):
+        return Response(get_summary())
+
+
+class AlertRuleViewSet(
+    CachedResponseMixin, SparseFieldsViewMixin, viewsets.ModelViewSet
+):
+    queryset = AlertRule.objects.all()
+    cache_models = (Sensor, Channel)
     serializer_class = AlertRuleSerializer
     permission_classes = [IsAdminOrReadOnly]
     filterset_fields = ["sensor", "is_active"]
@@ -125,9 +449,14 @@ class AlertRuleViewSet(viewsets.ModelViewSet):
         super().perform_destroy(instance)
 
 
-class AlertViewSet(viewsets.ModelViewSet):
-    queryset = Alert.objects.select_related("sensor", "measurement", "rule")
+class AlertViewSet(
+    CachedResponseMixin, SparseFieldsViewMixin, viewsets.ModelViewSet
+):
+    queryset = Alert.objects.all()
+    cache_models = (Sensor, Measurement)
     serializer_class = AlertSerializer
+    pagination_class = KeysetPagination
+    cursor_field = "created_at"
     filterset_fields = ["status", "severity", "sensor"]
     search_fields = ["sensor__name", "message"]
 
@@ -160,8 +489,8 @@ class AlertViewSet(viewsets.ModelViewSet):
         return Response(self.get_serializer(alert).data)
 
 
-class TicketViewSet(viewsets.ModelViewSet):
-    queryset = Ticket.objects.select_related("alert", "opened_by", "assigned_to")
+class TicketViewSet(SparseFieldsViewMixin, viewsets.ModelViewSet):
+    queryset = Ticket.objects.all()
     serializer_class = TicketSerializer
     filterset_fields = ["status", "priority"]
     search_fields = ["title", "description"]
@@ -182,15 +511,23 @@ class TicketViewSet(viewsets.ModelViewSet):
         super().perform_destroy(instance)
 
 
-class AuditLogViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet):
-    queryset = AuditLog.objects.select_related("actor")
+class AuditLogViewSet(
+    FastListMixin,
+    SparseFieldsViewMixin,
+    mixins.ListModelMixin,
+    mixins.RetrieveModelMixin,
+    viewsets.GenericViewSet,
+):
+    queryset = AuditLog.objects.all()
     serializer_class = AuditLogSerializer
+    pagination_class = KeysetPagination
+    cursor_field = "created_at"
     permission_classes = [IsAdminOrReadOnly]
     filterset_fields = ["action", "actor"]
     search_fields = ["action", "target_model"]
 
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(SparseFieldsViewMixin, viewsets.ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [IsAdminOrReadOnly]
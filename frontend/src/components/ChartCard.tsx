@@ -15,7 +15,7 @@ const ChartCard = ({ data }: { data: ChartPoint[] }) => (
       height: 320,
     }}
   >
-    <h3 style={{ marginTop: 0 }}>Last Measurements</h3>
+    <h3 style={{ marginTop: 0 }}>Temperature (24h)</h3>
     <ResponsiveContainer width="100%" height="85%">
       <LineChart data={data}>
         <XAxis dataKey="recorded_at" hide />
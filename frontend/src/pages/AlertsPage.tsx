@@ -8,7 +8,12 @@ const AlertsPage = () => {
   const [alerts, setAlerts] = useState<any[]>([]);
 
   const loadAlerts = async () => {
-    const { data } = await apiClient.get("/alerts/");
+    const { data } = await apiClient.get("/alerts/", {
+      params: {
+        expand: "sensor",
+        fields: "id,created_at,sensor,severity,status,occurrences,last_seen_at,message",
+      },
+    });
     setAlerts(data.results ?? data);
   };
 
@@ -33,6 +38,12 @@ const AlertsPage = () => {
           { key: "sensor", label: "Sensor", render: (_value: unknown, row: any) => row.sensor?.name ?? "N/A" },
           { key: "severity", label: "Severity" },
           { key: "status", label: "Status" },
+          { key: "occurrences", label: "Occurrences" },
+          {
+            key: "last_seen_at",
+            label: "Last Seen",
+            render: (value: unknown) => (value ? dayjs(String(value)).format("MMM D HH:mm") : "—"),
+          },
           { key: "message", label: "Message" },
           {
             key: "id",
@@ -9,7 +9,9 @@ const AuditLogsPage = () => {
 
   useEffect(() => {
     const load = async () => {
-      const { data } = await apiClient.get("/audit-logs/");
+      const { data } = await apiClient.get("/audit-logs/", {
+        params: { expand: "actor", fields: "id,created_at,action,actor,target_model" },
+      });
       setLogs(data.results ?? data);
     };
     load();
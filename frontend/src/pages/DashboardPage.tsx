@@ -4,14 +4,14 @@ import dayjs from "dayjs";
 import ChartCard from "../components/ChartCard";
 import DataTable from "../components/DataTable";
 import StatCard from "../components/StatCard";
-import { fetchDashboard } from "../services/api";
+import { DashboardSummary, fetchDashboard, fetchSeries, MeasurementSeries } from "../services/api";
 
 const DashboardPage = () => {
-  const [data, setData] = useState<any>({
+  const [data, setData] = useState<{ summary: DashboardSummary | null; measurements: any[] }>({
+    summary: null,
     measurements: [],
-    alerts: [],
-    tickets: [],
   });
+  const [series, setSeries] = useState<MeasurementSeries | null>(null);
   const [isLoading, setIsLoading] = useState(true);
 
   useEffect(() => {
@@ -20,6 +20,11 @@ const DashboardPage = () => {
       try {
         const dashboard = await fetchDashboard();
         setData(dashboard);
+        const sensor = dashboard.measurements[0]?.sensor;
+        if (sensor) {
+          const sensorId = sensor.id ?? sensor;
+          setSeries(await fetchSeries(sensorId, dayjs().subtract(24, "hour").toISOString(), dayjs().toISOString()));
+        }
       } finally {
         setIsLoading(false);
       }
@@ -27,39 +32,40 @@ const DashboardPage = () => {
     load();
   }, []);
 
-  const chartData = useMemo(
-    () =>
-      data.measurements.slice(0, 20).map((measurement: any) => ({
-        recorded_at: dayjs(measurement.recorded_at).format("HH:mm"),
-        temperature: Number(measurement.temperature),
-      })),
-    [data.measurements],
-  );
+  const chartData = useMemo(() => {
+    if (!series) {
+      return [];
+    }
+    const temperatures = series.temperature ?? series.temperature_avg ?? [];
+    return series.timestamps.map((timestamp, index) => ({
+      recorded_at: dayjs(timestamp).format("HH:mm"),
+      temperature: temperatures[index],
+    }));
+  }, [series]);
 
   if (isLoading) {
     return <p>Loading dashboard...</p>;
   }
 
-  const todayMeasurementCount = data.measurements.filter((measurement: any) =>
-    dayjs(measurement.recorded_at).isSame(dayjs(), "day"),
-  ).length;
-  const todayAlerts = data.alerts.filter((alert: any) =>
-    dayjs(alert.created_at).isSame(dayjs(), "day"),
-  ).length;
-  const openTickets = data.tickets.filter((ticket: any) => ticket.status !== "closed").length;
-  const lastAlert = data.alerts[0];
+  const { summary } = data;
+  const lastAlert = summary?.last_alert;
 
   return (
     <div style={{ display: "flex", flexDirection: "column", gap: "1.5rem" }}>
       <section style={{ display: "flex", gap: "1rem", flexWrap: "wrap" }}>
-        <StatCard label="Today Measurements" value={todayMeasurementCount} />
-        <StatCard label="Alerts (24h)" value={todayAlerts} />
-        <StatCard label="Open Tickets" value={openTickets} />
+        <StatCard label="Today Measurements" value={summary?.measurements_today ?? 0} />
+        <StatCard label="Alerts (24h)" value={summary?.alerts_24h ?? 0} />
+        <StatCard label="Open Tickets" value={summary?.open_tickets ?? 0} />
+        <StatCard
+          label="Sensors Out of Range"
+          value={summary?.sensors_out_of_range ?? 0}
+          sublabel={`of ${summary?.sensors ?? 0} active`}
+        />
         {lastAlert && (
           <StatCard
             label="Last Alert"
             value={dayjs(lastAlert.created_at).format("HH:mm A")}
-            sublabel={lastAlert.sensor?.name}
+            sublabel={lastAlert.sensor_name}
           />
         )}
       </section>
@@ -73,7 +79,7 @@ const DashboardPage = () => {
             { key: "humidity", label: "Humidity (%)" },
             { key: "status", label: "Status" },
           ]}
-          data={data.measurements.slice(0, 8)}
+          data={data.measurements}
           emptyMessage="No measurements yet"
         />
       </section>
@@ -24,16 +24,48 @@ export const login = async (username: string, password: string): Promise<LoginRe
   return data;
 };
 
+export interface DashboardSummary {
+  generated_at: string;
+  measurements_today: number;
+  alerts_24h: number;
+  open_alerts: number;
+  open_tickets: number;
+  sensors: number;
+  sensors_out_of_range: number;
+  last_alert: { created_at: string; sensor_name: string; severity: string } | null;
+}
+
 export const fetchDashboard = async () => {
-  const [measurements, alerts, tickets] = await Promise.all([
-    apiClient.get("/measurements/?page_size=20"),
-    apiClient.get("/alerts/?page_size=5"),
-    apiClient.get("/tickets/?page_size=5"),
+  const [summary, measurements] = await Promise.all([
+    apiClient.get<DashboardSummary>("/dashboard/summary/"),
+    apiClient.get("/measurements/?page_size=8&expand=sensor"),
   ]);
   return {
+    summary: summary.data,
     measurements: measurements.data.results ?? measurements.data,
-    alerts: alerts.data.results ?? alerts.data,
-    tickets: tickets.data.results ?? tickets.data,
   };
 };
 
+export interface MeasurementSeries {
+  sensor: string;
+  from: string;
+  to: string;
+  mode: "raw" | "lttb" | "aggregate";
+  resolution: string | null;
+  bucket_seconds: number | null;
+  timestamps: number[];
+  temperature?: number[];
+  temperature_avg?: number[];
+}
+
+export const fetchSeries = async (
+  sensorId: string,
+  from: string,
+  to: string,
+  points = 300,
+): Promise<MeasurementSeries> => {
+  const { data } = await apiClient.get<MeasurementSeries>("/measurements/series/", {
+    params: { sensor: sensorId, from, to, points },
+  });
+  return data;
+};